@@ -0,0 +1,395 @@
+"""
+Persistent ADB connection pool for the VoicePay UPI Assistant.
+
+Spawning the ``adb`` client for every tool call costs a fork/exec plus a
+fresh server handshake each time. The pool keeps one long-lived connection
+per device instead:
+
+- devices reached through the local adb server use ``pure-python-adb``,
+  which opens a socket to the server per command, so several commands
+  can run on one device at once;
+- devices listed in ``direct_addresses`` are reached over TCP with
+  ``adb-shell``, which holds an RSA-authenticated transport open and
+  carries one command at a time.
+
+Idle connections are health-checked before reuse, broken ones are dropped
+and reopened with exponential backoff, and ``run`` executes commands on
+worker threads of the device's own so callers on the event loop never
+block and a busy device never delays another. A command that times out or
+whose caller is cancelled has its socket closed, which frees the worker
+thread and the device's stream right away.
+"""
+import os
+import time
+import shlex
+import socket
+import random
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Union
+
+try:
+    from ppadb.client import Client as AdbServerClient
+except ImportError:  # pragma: no cover - optional dependency
+    AdbServerClient = None
+
+try:
+    from adb_shell.adb_device import AdbDeviceTcp
+    from adb_shell.auth.sign_pythonrsa import PythonRSASigner
+    from adb_shell.exceptions import TcpTimeoutException
+except ImportError:  # pragma: no cover - optional dependency
+    AdbDeviceTcp = None
+    PythonRSASigner = None
+    TcpTimeoutException = TimeoutError
+
+# What the transports raise when a device does not reply in time
+_TIMEOUT_ERRORS = (TimeoutError, socket.timeout, TcpTimeoutException)
+
+logger = logging.getLogger(__name__)
+
+# Appended to every command so the exit status survives transports that only return output
+_EXIT_MARKER = "__VOICEPAY_EXIT__"
+
+Command = Union[str, Sequence[str]]
+
+
+class AdbError(Exception):
+    """A device command could not be completed."""
+
+
+class AdbUnavailableError(AdbError):
+    """No transport to the device is available (library, server or device missing)."""
+
+
+class AdbTimeoutError(AdbError):
+    """A pooled device command did not finish within its timeout."""
+
+
+@dataclass
+class AdbResult:
+    """Outcome of a device shell command."""
+    returncode: int
+    stdout: str
+    serial: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+
+def build_shell_command(command: Command) -> str:
+    """Return a device shell command line; argument lists are quoted individually."""
+    if isinstance(command, str):
+        return command
+    return " ".join(shlex.quote(arg) for arg in command)
+
+
+def _split_exit_status(output: str) -> tuple:
+    """Strip the exit marker line and return ``(returncode, stdout)``."""
+    head, sep, tail = output.rpartition(_EXIT_MARKER)
+    if not sep:
+        return 0, output
+    try:
+        return int(tail.strip()), head
+    except ValueError:
+        return 0, head
+
+
+class _Call:
+    """A pooled command in flight; ``cancel`` closes its socket from another thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._close = None
+        self.cancelled = threading.Event()
+
+    def attach(self, close):
+        """Register how to interrupt the command; runs ``close`` at once if already cancelled."""
+        with self._lock:
+            self._close = close
+            cancelled = self.cancelled.is_set()
+        if cancelled:
+            close()
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled.set()
+            close = self._close
+        if close is not None:
+            try:
+                close()
+            except Exception as e:
+                logger.debug(f"Error interrupting ADB command: {e}")
+
+
+class _ServerTransport:
+    """Device reached through the local adb server (pure-python-adb)."""
+
+    def __init__(self, device):
+        self._device = device
+
+    def shell(self, command: str, timeout: float, call: Optional[_Call] = None) -> str:
+        output = []
+
+        def read(connection):
+            # The command's own socket to the server; closing it ends only this command
+            if call is not None:
+                call.attach(connection.close)
+            try:
+                output.append(connection.read_all().decode("utf-8", "replace"))
+            finally:
+                connection.close()
+
+        self._device.shell(command, handler=read, timeout=timeout)
+        return output[0] if output else ""
+
+    def close(self):
+        # Each request opens a short-lived socket to the local server; nothing to release
+        pass
+
+
+class _DirectTransport:
+    """Device reached over TCP with an authenticated adb-shell transport."""
+
+    def __init__(self, address: str, signer, timeout: float):
+        host, _, port = address.partition(":")
+        self._device = AdbDeviceTcp(host, int(port or 5555), default_transport_timeout_s=timeout)
+        self._device.connect(rsa_keys=[signer] if signer is not None else None,
+                             auth_timeout_s=timeout)
+
+    def shell(self, command: str, timeout: float, call: Optional[_Call] = None) -> str:
+        if call is not None:
+            # The whole transport has to go; the pool reconnects on the next command
+            call.attach(self._device.close)
+        return self._device.shell(command, timeout_s=timeout)
+
+    def close(self):
+        self._device.close()
+
+
+class _PooledConnection:
+    """A device's transport plus its health and reconnect bookkeeping."""
+
+    def __init__(self, serial: str, streams: int):
+        self.serial = serial
+        self.transport = None
+        self.lock = threading.Lock()  # Guards the transport and its bookkeeping
+        self.streams = threading.BoundedSemaphore(streams)  # Commands running on the device
+        self.executor = ThreadPoolExecutor(max_workers=streams, thread_name_prefix=f"voicepay-adb-{serial}")
+        self.last_used = 0.0
+        self.failures = 0
+        self.retry_at = 0.0
+
+
+class AdbConnectionPool:
+    """Pool of long-lived device connections.
+
+    Args:
+        server_host: Host of the adb server.
+        server_port: Port of the adb server.
+        direct_addresses: ``host:port`` devices reached over TCP with adb-shell.
+        adb_key_path: Private key used to authenticate direct connections.
+        command_timeout: Default per-command timeout in seconds.
+        health_check_interval: Idle seconds after which a connection is probed before reuse.
+        backoff_base: Initial reconnect delay in seconds.
+        backoff_max: Maximum reconnect delay in seconds.
+        streams_per_device: Commands run concurrently on a device reached through
+            the adb server; direct devices run one at a time.
+    """
+
+    def __init__(self, server_host: str = "127.0.0.1", server_port: int = 5037,
+                 direct_addresses: Optional[List[str]] = None,
+                 adb_key_path: Optional[str] = None, command_timeout: float = 10.0,
+                 health_check_interval: float = 30.0, backoff_base: float = 0.5,
+                 backoff_max: float = 30.0, streams_per_device: int = 4):
+        self.server_host = server_host
+        self.server_port = server_port
+        self.direct_addresses = list(direct_addresses or [])
+        self.adb_key_path = adb_key_path or os.path.expanduser("~/.android/adbkey")
+        self.command_timeout = command_timeout
+        self.health_check_interval = health_check_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.streams_per_device = streams_per_device
+        self._lock = threading.Lock()
+        self._connections: Dict[str, _PooledConnection] = {}
+        self._client = None
+        self._signer = None
+        # Device listing only; commands run on their device's executor
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="voicepay-adb")
+
+    @property
+    def available(self) -> bool:
+        """Whether any pooled transport library is installed."""
+        return AdbServerClient is not None or (AdbDeviceTcp is not None and bool(self.direct_addresses))
+
+    def _server_client(self):
+        if AdbServerClient is None:
+            raise AdbUnavailableError("pure-python-adb is not installed")
+        if self._client is None:
+            self._client = AdbServerClient(host=self.server_host, port=self.server_port)
+        return self._client
+
+    def list_devices(self) -> List[str]:
+        """Return serials of authorized devices: direct devices first, then server devices."""
+        serials = list(self.direct_addresses) if AdbDeviceTcp is not None else []
+        if AdbServerClient is not None:
+            try:
+                devices = self._server_client().devices(state="device")
+            except Exception as e:
+                # adb server not running; only direct devices are reachable
+                logger.debug(f"adb server unavailable: {e}")
+            else:
+                serials.extend(d.serial for d in devices if d.serial not in serials)
+        if not serials:
+            raise AdbUnavailableError("No authorized Android device is reachable")
+        return serials
+
+    def _is_direct(self, serial: str) -> bool:
+        return serial in self.direct_addresses and AdbDeviceTcp is not None
+
+    def _open_transport(self, serial: str):
+        """Open a transport to ``serial``. Called with the connection lock held."""
+        if self._is_direct(serial):
+            if self._signer is None and os.path.exists(self.adb_key_path):
+                self._signer = PythonRSASigner.FromRSAKeyPath(self.adb_key_path)
+            return _DirectTransport(serial, self._signer, self.command_timeout)
+        device = self._server_client().device(serial)
+        if device is None:
+            raise AdbUnavailableError(f"Device {serial} is not connected")
+        return _ServerTransport(device)
+
+    def _connection(self, serial: Optional[str]) -> _PooledConnection:
+        if serial is None:
+            serial = self.list_devices()[0]
+        with self._lock:
+            connection = self._connections.get(serial)
+            if connection is None:
+                streams = 1 if self._is_direct(serial) else self.streams_per_device
+                connection = self._connections[serial] = _PooledConnection(serial, streams)
+        return connection
+
+    def _backoff(self, connection: _PooledConnection, failed=None):
+        """Drop a broken transport and delay the next reconnect. Connection lock held.
+
+        ``failed`` is the transport a command failed on; if another command
+        has already replaced it, the new transport is kept.
+        """
+        if failed is not None and connection.transport is not failed:
+            return
+        if connection.transport is not None:
+            try:
+                connection.transport.close()
+            except Exception:
+                pass
+            connection.transport = None
+        connection.failures += 1
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (connection.failures - 1)))
+        # Full jitter keeps sessions from reconnecting to a flapping device in lockstep
+        connection.retry_at = time.monotonic() + random.uniform(0, delay)
+
+    def _ensure_transport(self, connection: _PooledConnection, timeout: float):
+        """Return a healthy transport, reconnecting if needed. Connection lock held.
+
+        A server transport may be running other commands while it is probed;
+        a direct one never is, since the caller holds the device's only stream.
+        """
+        now = time.monotonic()
+        if connection.transport is not None and now - connection.last_used > self.health_check_interval:
+            try:
+                connection.transport.shell("echo", timeout=min(timeout, 5.0))
+            except Exception as e:
+                logger.info(f"ADB connection to {connection.serial} failed health check: {e}")
+                self._backoff(connection)
+
+        if connection.transport is None:
+            if now < connection.retry_at:
+                raise AdbUnavailableError(f"Reconnect to {connection.serial} is backing off")
+            try:
+                connection.transport = self._open_transport(connection.serial)
+            except AdbUnavailableError:
+                self._backoff(connection)
+                raise
+            except Exception as e:
+                self._backoff(connection)
+                raise AdbUnavailableError(f"Cannot connect to {connection.serial}: {e}") from e
+            connection.failures = 0
+        return connection.transport
+
+    def shell(self, command: Command, serial: Optional[str] = None,
+              timeout: Optional[float] = None, call: Optional[_Call] = None) -> AdbResult:
+        """Run a shell command on a device, blocking until it completes.
+
+        ``call`` lets ``run`` interrupt the command from the event loop.
+        """
+        timeout = timeout or self.command_timeout
+        connection = self._connection(serial)
+        line = f"{build_shell_command(command)}; echo {_EXIT_MARKER}$?"
+        with connection.streams:
+            if call is not None and call.cancelled.is_set():
+                raise AdbError(f"Command on {connection.serial} was cancelled")
+            with connection.lock:
+                transport = self._ensure_transport(connection, timeout)
+            try:
+                output = transport.shell(line, timeout, call)
+            except Exception as e:
+                # A server command has a socket of its own; a direct transport is
+                # left mid-stream by a timeout or interruption and must reconnect
+                if self._is_direct(connection.serial) or not (
+                        isinstance(e, _TIMEOUT_ERRORS) or (call is not None and call.cancelled.is_set())):
+                    with connection.lock:
+                        self._backoff(connection, failed=transport)
+                if isinstance(e, _TIMEOUT_ERRORS):
+                    raise AdbTimeoutError(f"Command timed out on {connection.serial} after {timeout}s") from e
+                raise AdbError(f"Command failed on {connection.serial}: {e}") from e
+            connection.last_used = time.monotonic()
+        returncode, stdout = _split_exit_status(output or "")
+        return AdbResult(returncode, stdout, connection.serial)
+
+    async def run(self, command: Command, serial: Optional[str] = None,
+                  timeout: Optional[float] = None) -> AdbResult:
+        """Run a shell command on a worker thread of its device without blocking the event loop.
+
+        The timeout covers waiting for a free stream as well. When it expires
+        or the caller is cancelled, the command is interrupted rather than
+        left holding the device until its socket times out.
+        """
+        loop = asyncio.get_running_loop()
+        timeout = timeout or self.command_timeout
+        if serial is None:
+            serial = (await self.devices())[0]
+        connection = self._connection(serial)
+        call = _Call()
+        command_future = loop.run_in_executor(connection.executor, self.shell, command, serial, timeout, call)
+        try:
+            return await asyncio.wait_for(command_future, timeout)
+        except asyncio.TimeoutError:
+            call.cancel()
+            raise AdbTimeoutError(f"Command timed out on {serial} after {timeout}s") from None
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+
+    async def devices(self) -> List[str]:
+        """Async variant of ``list_devices``."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.list_devices)
+
+    def close(self):
+        """Close every pooled transport and stop the worker threads."""
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections.clear()
+        for connection in connections:
+            with connection.lock:
+                if connection.transport is not None:
+                    try:
+                        connection.transport.close()
+                    except Exception as e:
+                        logger.error(f"Error closing ADB connection: {e}")
+                    connection.transport = None
+            connection.executor.shutdown(wait=False)
+        self._executor.shutdown(wait=False)
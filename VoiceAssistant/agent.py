@@ -16,8 +16,14 @@ from tools import (
     get_transaction_status,
     clear_transaction_data,
     check_device_connection,
-    setup_android_integration
+    setup_android_integration,
+    VoicePaySessionData,
+    release_session_stores,
+    start_metrics_exporters,
+    start_session_prewarm,
+    start_tracing
 )
+from tracing import tracer
 
 load_dotenv()
 
@@ -48,7 +54,29 @@ class VoicePayAssistant(Agent):
         
 
 async def entrypoint(ctx: agents.JobContext):
+    # Local Prometheus endpoint and JSON dump, and span export; started once per process
+    start_metrics_exporters()
+    start_tracing()
+
+    # Memory stores are keyed by the room, one per user conversation
+    identity = ctx.job.room.name
+    # Spans of this session are tagged with its room and job
+    tracer.start_session(identity, **{"livekit.room": identity, "livekit.job_id": ctx.job.id})
+    session_data = VoicePaySessionData(identity=identity)
+
+    # Device checks, app detection and opening the user's stores run
+    # concurrently while the session starts and the greeting is spoken
+    prewarm = start_session_prewarm(session_data)
+
+    async def release_stores():
+        prewarm.cancel()
+        # Persist any queued memory writes and free the user's stores
+        release_session_stores(identity)
+
+    ctx.add_shutdown_callback(release_stores)
+
     session = AgentSession(
+        userdata=session_data,
     )
 
     await session.start(
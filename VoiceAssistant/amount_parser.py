@@ -0,0 +1,244 @@
+"""
+Spoken amount parser for the VoicePay UPI Assistant.
+
+Turns amounts said in words into paise without a round trip to the
+language model: "five hundred rupees", "one and a half lakh", "2 crore",
+"rupees twelve fifty", "paanch sau", "dedh lakh rupaye", "saade teen
+hazaar", "ninety nine rupees and fifty paise".
+
+The utterance is tokenized once and fed through a small accumulator state
+machine. Values are kept as integers scaled by 100, i.e. already in paise,
+so halves, quarters and two decimal places are exact.
+"""
+import re
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+_ENGLISH_UNITS: Dict[str, int] = {
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+    "thirteen": 13, "fourteen": 14, "fifteen": 15, "sixteen": 16, "seventeen": 17,
+    "eighteen": 18, "nineteen": 19, "twenty": 20, "thirty": 30, "forty": 40,
+    "fifty": 50, "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90,
+}
+_HINDI_UNITS: Dict[str, int] = {  # Romanized
+    "ek": 1, "do": 2, "teen": 3, "char": 4, "chaar": 4, "paanch": 5, "panch": 5,
+    "chhe": 6, "chhah": 6, "che": 6, "saat": 7, "aath": 8, "nau": 9, "das": 10,
+    "gyarah": 11, "barah": 12, "baarah": 12, "terah": 13, "chaudah": 14,
+    "pandrah": 15, "solah": 16, "satrah": 17, "atharah": 18, "unnis": 19,
+    "bees": 20, "pachchees": 25, "pachees": 25, "tees": 30, "chalis": 40,
+    "chaalis": 40, "pachas": 50, "pachaas": 50, "saath": 60, "sattar": 70,
+    "pachattar": 75, "assi": 80, "nabbe": 90,
+}
+# Values in paise (rupees x 100)
+_UNITS: Dict[str, int] = {
+    word: value * 100 for word, value in {**_ENGLISH_UNITS, **_HINDI_UNITS}.items()
+}
+
+# Fractions that multiply with what follows, e.g. "dedh lakh", "dhai sau"
+_FRACTIONS: Dict[str, int] = {"dedh": 150, "derh": 150, "dhai": 250, "dhaai": 250}
+# Modifiers applied to the next number, e.g. "saade teen" (3.5), "paune do" (1.75)
+_MODIFIERS: Dict[str, int] = {"saade": 50, "sade": 50, "sava": 25, "sawa": 25, "paune": -25}
+
+_HUNDRED = frozenset({"hundred", "sau"})
+_SCALES: Dict[str, int] = {
+    "thousand": 1000, "hazaar": 1000, "hazar": 1000, "hajar": 1000, "k": 1000,
+    "lakh": 100000, "lakhs": 100000, "lac": 100000, "lacs": 100000,
+    "million": 1000000,
+    "crore": 10000000, "crores": 10000000, "karod": 10000000, "karor": 10000000,
+}
+_HALF = frozenset({"half", "aadha", "adha"})
+_BEFORE_A = _HUNDRED | frozenset(_SCALES) | _HALF  # "a hundred", "a lakh", "a half"
+_FILLERS = frozenset({"and", "a", "an"})
+_RUPEES = frozenset({"rupees", "rupee", "rs", "inr", "rupaye", "rupay", "rupiya", "rupiye", "bucks", "₹"})
+_PAISE = frozenset({"paise", "paisa", "paisay"})
+
+NUMBER_WORDS: FrozenSet[str] = frozenset(
+    set(_UNITS) | set(_FRACTIONS) | set(_MODIFIERS) | _HUNDRED | set(_SCALES) | _HALF
+)
+
+# Words that can only be read by ``spoken_amounts``, including "... and 50 paise"
+SPOKEN_AMOUNT_WORDS: FrozenSet[str] = NUMBER_WORDS | _PAISE
+
+_PHRASE_STARTS = NUMBER_WORDS | {"a", "an"}
+
+# Amount words that end a payee name. Number words that double as names
+# or common words ("Das", "saath" = with) are left out.
+AMOUNT_STOP_WORDS: FrozenSet[str] = frozenset(
+    (NUMBER_WORDS - {"das", "saath", "nau", "che", "do", "k"}) | (_RUPEES - {"₹"}) | _PAISE
+)
+
+_TOKEN = re.compile(r"\d[\d,]*(?:\.\d+)?|[a-z]+|₹")
+
+
+@dataclass
+class SpokenAmount:
+    """An amount found in an utterance."""
+    paise: int
+    confidence: float  # 1.0 with a currency word, lower when inferred from scale words
+    start: int = 0     # Character offset of the amount in the lowercased utterance
+
+
+def _digits_to_paise(token: str) -> int:
+    rupees, _, fraction = token.replace(",", "").partition(".")
+    return int(rupees or 0) * 100 + int(fraction.ljust(2, "0")[:2] or 0)
+
+
+class _Phrase:
+    """Accumulator for one spoken number."""
+
+    __slots__ = ("total", "current", "modifier", "decimals", "words", "has_scale", "after_digits")
+
+    def __init__(self):
+        self.total = 0
+        self.current = 0
+        self.modifier = 0
+        self.decimals = None  # Place value of the next digit after "point"
+        self.words = 0
+        self.has_scale = False
+        self.after_digits = False  # The last token was written in digits
+
+    def value(self) -> int:
+        return self.total + self.current
+
+    def add(self, value: int):
+        if self.decimals is not None:
+            self.current += value // 100 * self.decimals
+            self.decimals //= 10
+            return
+        if self.modifier:
+            # "saade teen" is 3.5, "paune do" is 1.75
+            value += self.modifier
+            self.modifier = 0
+        if 0 < self.current < 10000 and value >= 1000:
+            # Said in pairs: "twelve fifty" is 1250, "one fifty" is 150
+            self.current = self.current * 100 + value
+        else:
+            self.current += value
+
+    def _multiplicand(self) -> int:
+        """Value a scale word multiplies; a bare scale word counts once ("sau", "a lakh")."""
+        if self.current:
+            return self.current
+        value = 100 + self.modifier  # "sava sau" is 125
+        self.modifier = 0
+        return value
+
+    def feed(self, token: str, next_token: Optional[str]) -> bool:
+        """Consume a token; return False if it does not belong to the number."""
+        after_digits, self.after_digits = self.after_digits, False
+        if token in _UNITS:
+            self.add(_UNITS[token])
+        elif token[0].isdigit():
+            if self.current or self.decimals is not None:
+                return False
+            self.current = _digits_to_paise(token)
+            self.after_digits = True
+        elif token in _FRACTIONS:
+            self.current += _FRACTIONS[token]
+        elif token in _MODIFIERS:
+            self.modifier = _MODIFIERS[token]
+        elif token in _HUNDRED:
+            self.current = self._multiplicand() * 100
+            self.has_scale = True
+        elif token in _SCALES:
+            self.total += self._multiplicand() * _SCALES[token]
+            self.current = 0
+            self.has_scale = True
+        elif token in _HALF:
+            # "one and a half", "half a lakh"
+            self.current += 50
+        elif token == "point" and self.words and self.decimals is None:
+            self.decimals = 10
+        elif token in _FILLERS and self.words and not after_digits and next_token is not None and (
+                next_token in NUMBER_WORDS or next_token in _FILLERS or next_token[0].isdigit()):
+            pass
+        elif token in ("a", "an") and next_token in _BEFORE_A:
+            pass
+        else:
+            self.after_digits = after_digits
+            return False
+        self.words += 1
+        return True
+
+
+def _phrases(tokens: List[str]) -> List[Tuple[int, int, _Phrase]]:
+    """Split tokens into number phrases as ``(start, end, phrase)``."""
+    phrases = []
+    i = 0
+    while i < len(tokens):
+        if tokens[i] not in _PHRASE_STARTS and not tokens[i][0].isdigit():
+            i += 1
+            continue
+        phrase = _Phrase()
+        start = i
+        while i < len(tokens) and phrase.feed(tokens[i], tokens[i + 1] if i + 1 < len(tokens) else None):
+            i += 1
+        if phrase.words:
+            phrases.append((start, i, phrase))
+        else:
+            i += 1
+    return phrases
+
+
+def spoken_amounts(utterance: str) -> List[SpokenAmount]:
+    """Return every non-zero amount said in an utterance, in the order said.
+
+    A number counts as an amount if a currency word is next to it, or if it
+    uses a scale word (hundred, thousand, lakh, crore, sau, hazaar). A
+    following "... and fifty paise" is added to the rupee amount before it,
+    whether or not that amount is followed by "rupees".
+    """
+    matches = list(_TOKEN.finditer(utterance.lower()))
+    tokens = [match.group() for match in matches]
+    phrases = _phrases(tokens)
+    amounts = []
+    merged = None  # Index of a paise phrase already added to the amount before it
+    for index, (start, end, phrase) in enumerate(phrases):
+        if index == merged:
+            continue
+        before = tokens[start - 1] if start > 0 else None
+        after = tokens[end] if end < len(tokens) else None
+        if after in _PAISE:
+            paise, confidence = phrase.value() // 100, 1.0
+        else:
+            paise, confidence = phrase.value(), 0.0
+            if after in _RUPEES or before in _RUPEES:
+                confidence = 1.0
+            elif phrase.has_scale:
+                confidence = 0.8
+            # "... rupees and fifty paise", "100 and fifty paise"
+            if index + 1 < len(phrases):
+                next_start, next_end, next_phrase = phrases[index + 1]
+                gap = tokens[end + 1 if after in _RUPEES else end:next_start]
+                if gap in ([], ["and"]) and next_end < len(tokens) and tokens[next_end] in _PAISE:
+                    paise += next_phrase.value() // 100
+                    confidence = 1.0
+                    merged = index + 1
+            if not confidence:
+                continue
+        if paise:
+            amounts.append(SpokenAmount(paise, confidence, matches[start].start()))
+    return amounts
+
+
+def has_spoken_amount(utterance: str) -> bool:
+    """Return True if ``spoken_amounts`` could find an amount the digit patterns miss.
+
+    Tokenizes like ``spoken_amounts``, so a scale word attached to a
+    number ("3k", "2.5k") is seen as well.
+    """
+    return not SPOKEN_AMOUNT_WORDS.isdisjoint(_TOKEN.findall(utterance.lower()))
+
+
+def parse_amount(utterance: str) -> Optional[SpokenAmount]:
+    """Return the payment amount said in an utterance, in paise.
+
+    Of the amounts found by ``spoken_amounts`` the most certain wins, the
+    earliest on a tie.
+    """
+    best: Optional[SpokenAmount] = None
+    for amount in spoken_amounts(utterance):
+        if best is None or amount.confidence > best.confidence:
+            best = amount
+    return best
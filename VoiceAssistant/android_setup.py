@@ -4,109 +4,92 @@ Android Setup Helper for VoicePay Real-time Integration
 This script helps users set up their Android device for real-time UPI functionality.
 """
 
-import subprocess
+import asyncio
 import sys
 import os
-import time
-from typing import Tuple, Optional
+from functools import lru_cache
+from typing import List, Tuple
+from adb_pool import AdbUnavailableError
+from device_commands import DeviceCommands, DeviceCommandTimeout
+from device_registry import DeviceRegistry
+from upi_apps import InstalledAppCache
 
-def check_adb_installation() -> Tuple[bool, str]:
+@lru_cache(maxsize=None)
+def _device_layer() -> Tuple[DeviceCommands, DeviceRegistry, InstalledAppCache]:
+    """Build the command layer, device registry and app cache on first use."""
+    fake_scenario = os.getenv('ADB_FAKE_SCENARIO')
+    if fake_scenario:
+        # Simulated phones; the test harness is only imported when asked for
+        from fake_adb import fake_device_commands
+        adb = fake_device_commands(fake_scenario)
+    else:
+        adb = DeviceCommands()
+    return adb, DeviceRegistry(adb), InstalledAppCache(adb)
+
+async def check_adb_installation() -> Tuple[bool, str]:
     """Check if ADB is installed and accessible."""
+    adb, _, _ = _device_layer()
     try:
-        result = subprocess.run(['adb', 'version'], 
-                              capture_output=True, text=True, timeout=5)
+        result = await adb.host(['version'], timeout=5)
         if result.returncode == 0:
             version_info = result.stdout.split('\n')[0]
             return True, f"✅ ADB is installed: {version_info}"
         else:
             return False, "❌ ADB is installed but not working properly"
-    except FileNotFoundError:
+    except AdbUnavailableError:
         return False, "❌ ADB is not installed"
-    except subprocess.TimeoutExpired:
+    except DeviceCommandTimeout:
         return False, "❌ ADB command timed out"
     except Exception as e:
         return False, f"❌ Error checking ADB: {e}"
 
-def check_device_connection() -> Tuple[bool, str, Optional[str]]:
-    """Check if Android device is connected and authorized."""
+async def check_device_connection() -> Tuple[bool, str, List[str]]:
+    """Check if Android devices are connected and authorized."""
+    _, registry, _ = _device_layer()
     try:
-        result = subprocess.run(['adb', 'devices'], 
-                              capture_output=True, text=True, timeout=5)
-        if result.returncode == 0:
-            lines = result.stdout.strip().split('\n')[1:]  # Skip header
-            
-            if not lines or all(not line.strip() for line in lines):
-                return False, "❌ No devices connected", None
-            
-            devices = []
-            for line in lines:
-                if line.strip():
-                    parts = line.split()
-                    if len(parts) >= 2:
-                        device_id, status = parts[0], parts[1]
-                        devices.append((device_id, status))
-            
-            if not devices:
-                return False, "❌ No devices detected", None
-            
-            # Check if any device is properly authorized
-            authorized_devices = [d for d in devices if d[1] == 'device']
-            unauthorized_devices = [d for d in devices if d[1] == 'unauthorized']
-            
-            if authorized_devices:
-                device_id = authorized_devices[0][0]
-                return True, f"✅ Device connected and authorized: {device_id}", device_id
-            elif unauthorized_devices:
-                device_id = unauthorized_devices[0][0]
-                return False, f"⚠️ Device connected but unauthorized: {device_id}", device_id
-            else:
-                return False, f"❌ Device in unknown state: {devices[0]}", devices[0][0]
+        devices = await registry.devices(refresh=True)
+        
+        if not devices:
+            return False, "❌ No devices connected", []
+        
+        # Check which devices are properly authorized
+        authorized_devices = [d.serial for d in devices if d.authorized]
+        unauthorized_devices = [d.serial for d in devices if d.state == 'unauthorized']
+        
+        if authorized_devices:
+            message = f"✅ {len(authorized_devices)} device(s) connected and authorized: {', '.join(authorized_devices)}"
+            if unauthorized_devices:
+                message += f"\n⚠️ Connected but unauthorized: {', '.join(unauthorized_devices)}"
+            return True, message, authorized_devices
+        elif unauthorized_devices:
+            return False, f"⚠️ Device connected but unauthorized: {', '.join(unauthorized_devices)}", []
         else:
-            return False, "❌ Failed to check devices", None
+            states = ", ".join(f"{d.serial} ({d.state})" for d in devices)
+            return False, f"❌ Device in unknown state: {states}", []
     except Exception as e:
-        return False, f"❌ Error checking devices: {e}", None
+        return False, f"❌ Error checking devices: {e}", []
 
-def get_device_info(device_id: str) -> str:
+async def get_device_info(device_id: str) -> str:
     """Get basic device information."""
+    adb, _, _ = _device_layer()
     try:
-        # Get device model
-        model_result = subprocess.run(['adb', '-s', device_id, 'shell', 'getprop', 'ro.product.model'], 
-                                    capture_output=True, text=True, timeout=5)
+        # Get device model and Android version concurrently
+        model_result, version_result = await asyncio.gather(
+            adb.shell(['getprop', 'ro.product.model'], serial=device_id, timeout=5),
+            adb.shell(['getprop', 'ro.build.version.release'], serial=device_id, timeout=5),
+        )
         model = model_result.stdout.strip() if model_result.returncode == 0 else "Unknown"
-        
-        # Get Android version
-        version_result = subprocess.run(['adb', '-s', device_id, 'shell', 'getprop', 'ro.build.version.release'], 
-                                      capture_output=True, text=True, timeout=5)
         version = version_result.stdout.strip() if version_result.returncode == 0 else "Unknown"
         
         return f"📱 Device: {model}, Android {version}"
     except Exception as e:
         return f"📱 Device info unavailable: {e}"
 
-def check_upi_apps(device_id: str) -> Tuple[bool, str]:
+async def check_upi_apps(device_id: str) -> Tuple[bool, str]:
     """Check for installed UPI apps on the device."""
+    _, _, app_cache = _device_layer()
     try:
-        result = subprocess.run(['adb', '-s', device_id, 'shell', 'pm', 'list', 'packages'], 
-                              capture_output=True, text=True, timeout=10)
-        
-        if result.returncode != 0:
-            return False, "❌ Failed to check installed apps"
-        
-        packages = result.stdout.lower()
-        upi_apps = {
-            "com.phonepe.app": "PhonePe",
-            "com.google.android.apps.nbu.paisa.user": "Google Pay",
-            "net.one97.paytm": "Paytm",
-            "com.amazon.amazonpayments": "Amazon Pay",
-            "in.org.npci.upiapp": "BHIM UPI",
-            "com.mobikwik.mobile": "MobiKwik",
-            "com.freecharge.android": "Freecharge"
-        }
-        
-        found_apps = []
-        for package, name in upi_apps.items():
-            if f"package:{package}" in packages:
-                found_apps.append(name)
+        found_apps = await app_cache.get(device_id)
         
         if found_apps:
             apps_list = ", ".join(found_apps)
@@ -117,6 +100,14 @@ def check_upi_apps(device_id: str) -> Tuple[bool, str]:
     except Exception as e:
         return False, f"❌ Error checking UPI apps: {e}"
 
+async def check_device(device_id: str) -> Tuple[str, bool, str]:
+    """Collect device information and UPI apps for one device."""
+    device_info, (upi_ok, upi_msg) = await asyncio.gather(
+        get_device_info(device_id),
+        check_upi_apps(device_id),
+    )
+    return device_info, upi_ok, upi_msg
+
 def provide_setup_instructions():
     """Provide detailed setup instructions."""
     print("\n" + "="*60)
@@ -147,13 +138,13 @@ def provide_setup_instructions():
     print("   • Run this script again to verify setup")
     print("   • Or run 'adb devices' in command prompt")
 
-def main():
+async def main():
     """Main setup checker and helper."""
     print("🚀 VoicePay Android Setup Checker")
     print("-" * 40)
     
     # Check ADB installation
-    adb_ok, adb_msg = check_adb_installation()
+    adb_ok, adb_msg = await check_adb_installation()
     print(f"\n{adb_msg}")
     
     if not adb_ok:
@@ -162,7 +153,7 @@ def main():
         return
     
     # Check device connection
-    device_ok, device_msg, device_id = check_device_connection()
+    device_ok, device_msg, device_ids = await check_device_connection()
     print(f"{device_msg}")
     
     if not device_ok:
@@ -172,26 +163,32 @@ def main():
             print("   Check 'Always allow from this computer' and tap 'OK'")
             
             print("\n⏳ Waiting 10 seconds for authorization...")
-            time.sleep(10)
+            await asyncio.sleep(10)
             
             # Check again
-            device_ok, device_msg, device_id = check_device_connection()
+            device_ok, device_msg, device_ids = await check_device_connection()
             print(f"\n{device_msg}")
         
         if not device_ok:
             provide_setup_instructions()
             return
     
-    # If device is connected, get more info
-    if device_id:
-        device_info = get_device_info(device_id)
-        print(f"{device_info}")
-        
-        # Check UPI apps
-        upi_ok, upi_msg = check_upi_apps(device_id)
-        print(f"{upi_msg}")
+    # Inspect every connected device concurrently
+    if device_ids:
+        _, registry, _ = _device_layer()
+        results = await registry.fan_out(check_device, device_ids)
+        missing_apps = False
+        for device_id, result in results.items():
+            if isinstance(result, Exception):
+                print(f"\n📱 {device_id}: ❌ Error checking device: {result}")
+                continue
+            device_info, upi_ok, upi_msg = result
+            print(f"\n📱 {device_id}")
+            print(f"{device_info}")
+            print(f"{upi_msg}")
+            missing_apps = missing_apps or not upi_ok
         
-        if not upi_ok:
+        if missing_apps:
             print("\n💡 Consider installing UPI apps like PhonePe, Google Pay, or Paytm")
     
     # Final status
@@ -210,7 +207,7 @@ def main():
 
 if __name__ == "__main__":
     try:
-        main()
+        asyncio.run(main())
     except KeyboardInterrupt:
         print("\n\n👋 Setup cancelled by user")
     except Exception as e:
@@ -0,0 +1,9 @@
+"""
+Performance benchmarks for the VoicePay UPI Assistant.
+
+Each module can be run on its own, e.g. ``python -m benchmarks.bench_memory_records``
+from the VoiceAssistant directory. ``python manage.py bench`` runs the
+suite (``benchmarks.suite``) and compares it with ``baseline.json``.
+``benchmarks.loadgen`` drives concurrent simulated sessions through the
+tools for capacity planning; it is not part of the suite.
+"""
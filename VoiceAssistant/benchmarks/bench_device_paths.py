@@ -0,0 +1,67 @@
+"""
+Device-path latency under concurrency, against simulated phones.
+
+Each session runs the device work of a payment turn through the real
+command layer and connection pool: bind a device, detect its UPI apps,
+read its model and launch a payment intent. The phones are ``FakeAdb``
+simulations, so the numbers show how queueing in the pool's worker
+threads adds to the simulated device time as sessions grow.
+"""
+import time
+import asyncio
+import logging
+from typing import Dict, List
+
+from device_registry import DeviceRegistry
+from fake_adb import FakeAdb, FakeAdbPool, FakeAdbScenario, FakeDeviceCommands
+from upi_apps import InstalledAppCache
+from upi_launcher import UPI_APPS, UpiLauncher
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def _run(sessions: int, devices: int, streams_per_device: int) -> Dict[str, float]:
+    scenario = FakeAdbScenario.lab(devices, payment_delay=None)
+    scenario.seed = 1
+    fake = FakeAdb(scenario)
+    pool = FakeAdbPool(fake, streams_per_device=streams_per_device)
+    commands = FakeDeviceCommands(fake, pool)
+    registry = DeviceRegistry(commands)
+    apps = InstalledAppCache(commands, ttl=0)  # Every session queries its phone
+    launcher = UpiLauncher(commands)
+    by_package = {app.package: app for app in UPI_APPS.values()}
+    first_app = {device.serial: by_package[device.packages[0]] for device in scenario.devices}
+
+    async def session(index: int) -> float:
+        started = time.perf_counter()
+        serial = await registry.acquire(f"session-{index}")
+        await asyncio.gather(
+            apps.get(serial),
+            commands.shell(["getprop", "ro.product.model"], serial=serial),
+        )
+        await launcher.launch(first_app[serial], "ravi@okaxis", 25000, serial=serial)
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(session(i) for i in range(sessions)))
+    elapsed = time.perf_counter() - started
+    pool.close()
+    return {
+        "p50_ms": _percentile(latencies, 0.50),
+        "p95_ms": _percentile(latencies, 0.95),
+        "sessions_per_s": sessions / elapsed,
+    }
+
+
+def run(levels=(1, 8, 32), devices: int = 4, streams_per_device: int = 4) -> Dict[int, Dict[str, float]]:
+    logging.disable(logging.WARNING)
+    return {sessions: asyncio.run(_run(sessions, devices, streams_per_device)) for sessions in levels}
+
+
+if __name__ == "__main__":
+    for sessions, result in run().items():
+        print(f"{sessions:3d} sessions  p50 {result['p50_ms']:7.0f} ms  p95 {result['p95_ms']:7.0f} ms  "
+              f"{result['sessions_per_s']:6.1f} sessions/s")
@@ -0,0 +1,117 @@
+"""
+Latency and accuracy of payment detail extraction.
+
+Runs a corpus of spoken payment commands through ``extract_payment`` and
+through the previous multi-regex loop, reporting microseconds per utterance
+and the share of utterances whose amount and recipient were both right.
+"""
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+from payment_extraction import extract_payment, to_paise
+
+# (utterance, amount in paise, recipient)
+CORPUS: List[Tuple[str, Optional[int], Optional[str]]] = [
+    ("Pay ₹500 to john@paytm", 50000, "john@paytm"),
+    ("Send ₹1000 rupees to Sarah", 100000, "Sarah"),
+    ("send 500 rupees to sarah", 50000, "Sarah"),
+    ("pay john 500", 50000, "John"),
+    ("Pay Rs. 250 to ravi@ybl", 25000, "ravi@ybl"),
+    ("transfer rs 1,00,000 to ravi kumar for rent", 10000000, "Ravi Kumar"),
+    ("pay to mom 250.50 rupees", 25050, "Mom"),
+    ("Send money to priya.s@okaxis", None, "priya.s@okaxis"),
+    ("I want to pay Neha 1200 rupees", 120000, "Neha"),
+    ("send Rs 50 to 9876543210@ybl please", 5000, "9876543210@ybl"),
+    ("rupees 200 to Amit", 20000, "Amit"),
+    ("pay 300", 30000, None),
+    ("pay ravi", None, "Ravi"),
+    ("Transfer ₹ 75.5 to anita.sharma@oksbi", 7550, "anita.sharma@oksbi"),
+    ("please send 1500 to Deepak via phonepe", 150000, "Deepak"),
+    ("pay 2,500 rupees to the milkman", 250000, "The Milkman"),
+    ("send inr 999 to rahul@upi", 99900, "rahul@upi"),
+    ("Pay Suresh 40 rupees for tea", 4000, "Suresh"),
+    # Spoken amounts
+    ("send five hundred rupees to sarah", 50000, "Sarah"),
+    ("pay ravi one and a half lakh rupees", 15000000, "Ravi"),
+    ("transfer 2 crore to acme@icici", 2000000000, "acme@icici"),
+    ("paanch sau rupaye to Amit", 50000, "Amit"),
+    ("pay ninety nine rupees and fifty paise to chai@ybl", 9950, "chai@ybl"),
+    ("send dedh lakh to papa@oksbi", 15000000, "papa@oksbi"),
+    ("pay saade teen hazaar rupaye to Meena", 350000, "Meena"),
+    ("send rupees twelve fifty to the electrician", 125000, "The Electrician"),
+]
+
+_LEGACY_AMOUNT_PATTERNS = [
+    r'(?:pay|send|transfer)\s+(?:rs\.?|rupees?|₹)\s*(\d+(?:,\d{3})*(?:\.\d{2})?)',
+    r'(?:pay|send|transfer)\s+(\d+(?:,\d{3})*(?:\.\d{2})?)\s*(?:rs\.?|rupees?|₹)',
+    r'(\d+(?:,\d{3})*(?:\.\d{2})?)\s*(?:rs\.?|rupees?|₹)',
+    r'₹\s*(\d+(?:,\d{3})*(?:\.\d{2})?)'
+]
+_LEGACY_RECIPIENT_PATTERNS = [
+    r'(?:to|pay)\s+([a-zA-Z0-9._-]+@[a-zA-Z0-9.-]+)',
+    r'(?:to|pay)\s+([a-zA-Z\s]+?)(?:\s+(?:rs\.?|rupees?|₹|\d))',
+    r'(?:to|pay)\s+([a-zA-Z\s]+?)$',
+    r'([a-zA-Z0-9._-]+@[a-zA-Z0-9.-]+)',
+    r'([a-zA-Z\s]+?)\s+(?:rs\.?|rupees?|₹|\d)',
+]
+
+
+def legacy_extract(voice_command: str) -> Tuple[Optional[int], Optional[str]]:
+    """The extraction loop used before the single-pass engine."""
+    amount = recipient = None
+    for pattern in _LEGACY_AMOUNT_PATTERNS:
+        match = re.search(pattern, voice_command.lower())
+        if match:
+            amount = to_paise(match.group(1))
+            break
+    for pattern in _LEGACY_RECIPIENT_PATTERNS:
+        match = re.search(pattern, voice_command, re.IGNORECASE)
+        if match:
+            recipient = match.group(1).strip()
+            if '@' not in recipient:
+                recipient = recipient.title()
+            break
+    return amount, recipient
+
+
+def engine_extract(voice_command: str) -> Tuple[Optional[int], Optional[str]]:
+    details = extract_payment(voice_command)
+    return details.amount_paise, details.recipient
+
+
+def _evaluate(extract, rounds: int) -> Dict[str, float]:
+    correct = sum(extract(u) == (amount, recipient) for u, amount, recipient in CORPUS)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for utterance, _, _ in CORPUS:
+            extract(utterance)
+    elapsed = time.perf_counter() - started
+    return {
+        "us_per_utterance": elapsed / (rounds * len(CORPUS)) * 1e6,
+        "accuracy": correct / len(CORPUS),
+    }
+
+
+def failures() -> List[Tuple[str, tuple, tuple]]:
+    """Corpus entries the engine gets wrong, as (utterance, expected, actual)."""
+    return [
+        (u, (amount, recipient), engine_extract(u))
+        for u, amount, recipient in CORPUS
+        if engine_extract(u) != (amount, recipient)
+    ]
+
+
+def run(rounds: int = 2000) -> Dict[str, Dict[str, float]]:
+    return {
+        "legacy_regex_loop": _evaluate(legacy_extract, rounds),
+        "single_pass_engine": _evaluate(engine_extract, rounds),
+    }
+
+
+if __name__ == "__main__":
+    for name, result in run().items():
+        print(f"{name:20s} {result['us_per_utterance']:8.2f} us/utterance "
+              f"{result['accuracy']:6.1%} accuracy")
+    for utterance, expected, actual in failures():
+        print(f"  miss: {utterance!r}: expected {expected}, got {actual}")
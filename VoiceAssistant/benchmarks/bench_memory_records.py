@@ -0,0 +1,85 @@
+"""
+Per-record memory footprint and load time of VoicePay memory records.
+
+Compares the slotted ``VoicePayMemory`` against the previous dataclass
+layout, which parsed every timestamp and built a record from a dict on load.
+"""
+import gc
+import json
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from memory_manager import VoicePayMemory
+
+
+@dataclass
+class LegacyMemory:
+    """The record layout used before slotted records."""
+    content: str
+    timestamp: datetime
+    type: str
+    metadata: Optional[Dict[str, Any]] = None
+    sensitive: bool = False
+    memory_id: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'LegacyMemory':
+        data['timestamp'] = datetime.fromisoformat(data['timestamp'])
+        return cls(**data)
+
+
+def make_rows(count: int) -> List[tuple]:
+    """Storage rows shaped like the SQLite backend's ``SELECT``."""
+    start = datetime(2025, 1, 1)
+    types = ["app_detection", "transaction_guidance", "security_action", "user_interaction"]
+    return [
+        (f"{i:032x}", (start + timedelta(seconds=i)).isoformat(timespec='microseconds'),
+         types[i % len(types)], 0, f"Guidance provided: step {i}", '{"source": "tool"}')
+        for i in range(count)
+    ]
+
+
+def _measure(build, count: int) -> Dict[str, float]:
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    records = build()
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return {"bytes_per_record": current / count, "load_us_per_record": elapsed / count * 1e6}
+
+
+def run(count: int = 100000) -> Dict[str, Dict[str, float]]:
+    rows = make_rows(count)
+    dicts = [
+        {"memory_id": r[0], "timestamp": r[1], "type": r[2], "sensitive": bool(r[3]),
+         "content": r[4], "metadata": json.loads(r[5])}
+        for r in rows
+    ]
+
+    def legacy():
+        return [LegacyMemory.from_dict(dict(d)) for d in dicts]
+
+    def slotted_from_dict():
+        return [VoicePayMemory.from_dict(d) for d in dicts]
+
+    def slotted_from_row():
+        from_row = VoicePayMemory.from_row
+        return [from_row(*r) for r in rows]
+
+    return {
+        "legacy_dataclass": _measure(legacy, count),
+        "slotted_from_dict": _measure(slotted_from_dict, count),
+        "slotted_from_row": _measure(slotted_from_row, count),
+    }
+
+
+if __name__ == "__main__":
+    for name, result in run().items():
+        print(f"{name:20s} {result['bytes_per_record']:8.1f} B/record "
+              f"{result['load_us_per_record']:8.3f} us/record")
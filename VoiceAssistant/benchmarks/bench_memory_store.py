@@ -0,0 +1,167 @@
+"""
+Latency of ``VoicePayMemoryManager`` operations at increasing store sizes.
+
+Stores are pre-populated through a backend that hands the manager ready
+records on load, the same path as a start-up from disk, and keeps nothing
+afterwards, so the timings cover the in-memory indexes rather than disk
+I/O. ``add_memory`` trims any store above 100 records, so ``add`` is timed
+with the trim disabled and the trim itself is timed as ``cleanup``,
+together with TTL expiry and ``clear_sensitive_data``.
+
+The 1M-record size is only run with ``--full``; it needs about 5 GB of RAM.
+"""
+import gc
+import sys
+import time
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+from memory_backends import MemoryBackend
+from memory_manager import VoicePayMemory, VoicePayMemoryManager
+
+SIZES = (1_000, 100_000)
+FULL_SIZES = (1_000, 100_000, 1_000_000)
+
+_TYPES = ("app_detection", "transaction_guidance", "security_action", "user_interaction")
+_RECIPIENTS = ("Ravi Kumar", "Priya", "john@paytm", "Mom", "Amit", "neha.g@okaxis", "the milkman")
+_APPS = ("PhonePe", "Google Pay", "Paytm", "BHIM")
+_QUERIES = ("phonepe", "priya", "john@paytm", "milkman rent", "okaxis", "zzz-no-match")
+
+
+class _PreloadedBackend(MemoryBackend):
+    """Returns a fixed record list on load and discards writes."""
+
+    def __init__(self, records: List[VoicePayMemory]):
+        self.records = records
+
+    def load(self, record_type: Any) -> List[Any]:
+        return self.records
+
+    def append(self, memories: List[Any]):
+        pass
+
+    def remove(self, memories: List[Any], purge: bool = False):
+        pass
+
+
+def make_records(count: int, sensitive_share: float = 0.1) -> List[VoicePayMemory]:
+    """Records shaped like a long-lived store; the newest ``sensitive_share`` is sensitive."""
+    start = datetime.now() - timedelta(seconds=count)
+    sensitive_from = count - int(count * sensitive_share)
+    records = []
+    for i in range(count):
+        recipient = _RECIPIENTS[i % len(_RECIPIENTS)]
+        if i % 3 == 0:
+            content = f"Guidance provided: pay ₹{i % 5000} to {recipient} using {_APPS[i % len(_APPS)]}"
+        elif i % 3 == 1:
+            content = f"User asked to send {i % 900} rupees to {recipient}"
+        else:
+            content = f"Detected {_APPS[i % len(_APPS)]} on device, step {i}"
+        records.append(VoicePayMemory(
+            content=content,
+            timestamp=start + timedelta(seconds=i),
+            type=_TYPES[i % len(_TYPES)],
+            metadata={"step": i % 7},
+            sensitive=i >= sensitive_from,
+            memory_id=f"{i:032x}",
+        ))
+    return records
+
+
+def _store(records: List[VoicePayMemory], memory_dir: str) -> VoicePayMemoryManager:
+    # Sensitive records get no TTL here so loading does not expire them
+    return VoicePayMemoryManager(memory_dir, backend=_PreloadedBackend(records), sensitive_ttl=None)
+
+
+@contextmanager
+def _gc_paused():
+    """Keep the cyclic collector, which walks the whole store, out of the timings."""
+    gc.collect()
+    gc.disable()
+    try:
+        yield
+    finally:
+        gc.enable()
+
+
+def _per_op(function: Callable[[], Any], operations: int, repeats: int = 5) -> float:
+    """Best-of-``repeats`` microseconds per call."""
+    best = float("inf")
+    for _ in range(repeats):
+        with _gc_paused():
+            started = time.perf_counter()
+            for _ in range(operations):
+                function()
+            best = min(best, time.perf_counter() - started)
+    return best / operations * 1e6
+
+
+def _once(setup: Callable[[], Any], function: Callable[[Any], Any], repeats: int) -> float:
+    """Best-of-``repeats`` microseconds for one call on a freshly set-up argument."""
+    best = float("inf")
+    for _ in range(repeats):
+        argument = setup()
+        with _gc_paused():
+            started = time.perf_counter()
+            function(argument)
+            best = min(best, time.perf_counter() - started)
+        del argument
+    return best * 1e6
+
+
+def run_size(count: int, memory_dir: str) -> Dict[str, float]:
+    records = make_records(count)
+    with _gc_paused():
+        started = time.perf_counter()
+        store = _store(records, memory_dir)
+        load_ms = (time.perf_counter() - started) * 1e3
+    # Big stores are rebuilt once per timed cleanup, so take fewer repeats
+    repeats = 5 if count <= 10_000 else 3 if count <= 100_000 else 1
+
+    store._cleanup_old_memories = lambda: None  # Time the insert, not the trim at 100 records
+    counter = iter(range(sys.maxsize))
+    add_us = _per_op(lambda: store.add_memory(
+        f"User asked to pay {next(counter)} rupees to Priya", "user_interaction"), 200)
+    get_us = _per_op(lambda: store.get_memories(limit=10), 2000)
+    get_by_type_us = _per_op(lambda: store.get_memories("transaction_guidance", limit=10), 2000)
+    search_us = _per_op(lambda: [store.search_memories(query) for query in _QUERIES], 50) / len(_QUERIES)
+    store.close()
+    del store  # At 1M records each store holds several GB
+
+    def fresh_store():
+        return _store(records, memory_dir)
+
+    def fresh_expiring_store():
+        # The sensitive tenth of the store is past its TTL
+        store = _store(records, memory_dir)
+        store.sensitive_ttl = 0.0
+        store._rebuild_indexes()
+        return store
+
+    cleanup_us = _once(fresh_store, lambda store: store._cleanup_old_memories(), repeats)
+    expire_us = _once(fresh_expiring_store, lambda store: store.expire_due(), repeats)
+    clear_us = _once(fresh_store, lambda store: store.clear_sensitive_data(), repeats)
+
+    return {
+        "load_ms": load_ms,
+        "add_us": add_us,
+        "get_us": get_us,
+        "get_by_type_us": get_by_type_us,
+        "search_us": search_us,
+        "cleanup_trim_us": cleanup_us,
+        "cleanup_expire_us": expire_us,
+        "cleanup_clear_sensitive_us": clear_us,
+    }
+
+
+def run(sizes=SIZES) -> Dict[int, Dict[str, float]]:
+    with tempfile.TemporaryDirectory(prefix="voicepay-bench-") as memory_dir:
+        return {count: run_size(count, memory_dir) for count in sizes}
+
+
+if __name__ == "__main__":
+    full = "--full" in sys.argv
+    for count, result in run(FULL_SIZES if full else SIZES).items():
+        print(f"{count:>9,} records: " + "  ".join(f"{name} {value:.2f}" for name, value in result.items()))
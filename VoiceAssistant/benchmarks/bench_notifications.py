@@ -0,0 +1,72 @@
+"""
+Latency of parsing ``dumpsys notification`` output.
+
+Runs the parser over dumps in ``benchmarks/fixtures``: a quiet phone with a
+dozen notifications and a busy one with over a hundred, mostly from
+messaging and system apps. Reports a full parse, the watcher's steady-state
+read (cursor already at the newest record) and a read with one new record,
+which is what each UPI ``notification_enqueue`` event costs.
+"""
+import os
+import time
+from typing import Callable, Dict, List
+
+from notification_parser import NotificationCursor, iter_records
+from notification_watcher import classify_outcome
+from upi_apps import UPI_APP_PACKAGES
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load_fixtures() -> Dict[str, str]:
+    """Fixture name (e.g. ``quiet``) -> dump text."""
+    dumps = {}
+    for filename in sorted(os.listdir(FIXTURES_DIR)):
+        if filename.startswith("dumpsys_notification_") and filename.endswith(".txt"):
+            with open(os.path.join(FIXTURES_DIR, filename), "r", encoding="utf-8") as f:
+                dumps[filename[len("dumpsys_notification_"):-len(".txt")]] = f.read()
+    return dumps
+
+
+def _us_per_call(function: Callable[[], object], rounds: int) -> float:
+    best = float("inf")
+    for _ in range(5):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            function()
+        best = min(best, time.perf_counter() - started)
+    return best / rounds * 1e6
+
+
+def run_dump(dump: str, rounds: int = 200) -> Dict[str, float]:
+    records = list(iter_records(dump))
+    newest = max(r.post_time_ms for r in records)
+    upi_texts: List[str] = [f"{r.title}\n{r.text}" for r in records if r.package in UPI_APP_PACKAGES]
+
+    def advance_idle():
+        cursor = NotificationCursor()
+        cursor._positions[None] = (newest, frozenset(r.key for r in records if r.post_time_ms == newest))
+        return cursor.advance(dump)
+
+    def advance_one_new():
+        cursor = NotificationCursor()
+        cursor._positions[None] = (newest - 1, frozenset())
+        return cursor.advance(dump)
+
+    return {
+        "records": len(records),
+        "full_parse_us": _us_per_call(lambda: list(iter_records(dump)), rounds),
+        "advance_idle_us": _us_per_call(advance_idle, rounds),
+        "advance_one_new_us": _us_per_call(advance_one_new, rounds),
+        "classify_us": _us_per_call(lambda: [classify_outcome(t) for t in upi_texts], rounds)
+                       / max(1, len(upi_texts)),
+    }
+
+
+def run(rounds: int = 200) -> Dict[str, Dict[str, float]]:
+    return {name: run_dump(dump, rounds) for name, dump in load_fixtures().items()}
+
+
+if __name__ == "__main__":
+    for name, result in run().items():
+        print(f"{name:8s} " + "  ".join(f"{key} {value:.2f}" for key, value in result.items()))
@@ -0,0 +1,75 @@
+"""
+Latency of UPI ID validation.
+
+``tools._validate_upi_id`` is a thin async wrapper around
+``UpiHandleRegistry.validate``; the registry is benchmarked directly so the
+suite does not need the LiveKit agent stack. Reports the memoized path
+(a recipient repeated within a session) and the uncached path (normalizing
+and probing the handle and prefix sets) separately.
+"""
+import time
+from typing import Dict, List, Optional, Tuple
+
+from upi_handles import UpiHandleRegistry
+
+# (UPI ID as heard or typed, expected canonical form or None)
+CORPUS: List[Tuple[str, Optional[str]]] = [
+    ("john@paytm", "john@paytm"),
+    ("Ravi.Kumar@okhdfcbank", "ravi.kumar@okhdfcbank"),
+    ("9876543210@ybl", "9876543210@ybl"),
+    ("priya.s@okaxis.", "priya.s@okaxis"),
+    ("neha @ oksbi", "neha@oksbi"),
+    ("acme.payments@icici", "acme.payments@icici"),
+    ("chai@axl", "chai@axl"),
+    ("papa@ibl", "papa@ibl"),
+    ("meena_iyer@upi", "meena_iyer@upi"),
+    ("shop-42@kotak", "shop-42@kotak"),
+    ("someone@examplebank", None),
+    ("x@fakesbi", None),
+    ("x@okfakesbi", None),
+    ("no-at-sign.paytm", None),
+    ("@ybl", None),
+    ("john@", None),
+    ("john@@paytm", None),
+    ("x" * 300 + "@paytm", None),
+]
+
+
+def failures(registry: UpiHandleRegistry) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """Corpus entries the registry gets wrong, as (input, expected, actual)."""
+    return [(vpa, expected, registry.validate(vpa)) for vpa, expected in CORPUS
+            if registry.validate(vpa) != expected]
+
+
+def _us_per_check(validate, rounds: int) -> float:
+    vpas = [vpa for vpa, _ in CORPUS]
+    best = float("inf")
+    for _ in range(5):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for vpa in vpas:
+                validate(vpa)
+        best = min(best, time.perf_counter() - started)
+    return best / (rounds * len(vpas)) * 1e6
+
+
+def run(rounds: int = 20000) -> Dict[str, float]:
+    load_ms = float("inf")
+    for _ in range(5):
+        started = time.perf_counter()
+        registry = UpiHandleRegistry.from_file()
+        load_ms = min(load_ms, (time.perf_counter() - started) * 1e3)
+    return {
+        "load_ms": load_ms,
+        "cached_us": _us_per_check(registry.validate, rounds),
+        "uncached_us": _us_per_check(registry._validate, rounds),
+        "accuracy": 1 - len(failures(registry)) / len(CORPUS),
+    }
+
+
+if __name__ == "__main__":
+    registry = UpiHandleRegistry.from_file()
+    for name, value in run().items():
+        print(f"{name:12s} {value:8.3f}")
+    for vpa, expected, actual in failures(registry):
+        print(f"  miss: {vpa!r}: expected {expected}, got {actual}")
@@ -0,0 +1,364 @@
+"""
+Concurrent session load generator for a VoicePay worker.
+
+Drives N simulated conversations in parallel through the assistant's tool
+set, the way the LiveKit session would: each session gets its
+``VoicePaySessionData``, starts the prewarm, then calls the tools of a
+scripted payment scenario directly with a stub ``RunContext``, pausing
+between calls for the user's speech and the model's turn. Nothing
+connects to LiveKit or Gemini, and the phones are ``FakeAdb`` simulations
+unless ``ADB_FAKE_SCENARIO`` names another scenario, so capacity can be
+planned offline.
+
+Reports session and tool-call throughput, per-tool latency percentiles,
+event-loop lag and process memory growth. Run from the VoiceAssistant
+directory, e.g.::
+
+    python -m benchmarks.loadgen --sessions 100 --duration 120 --json load.json
+"""
+import os
+import sys
+import gc
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import resource
+import tempfile
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - optional dependency
+    psutil = None
+
+
+@dataclass
+class Step:
+    """One tool call in a scripted conversation.
+
+    ``{app}`` in an argument is replaced by a UPI app installed on the
+    session's phone, as a user would name one of the apps they have.
+    """
+    tool: str
+    args: Dict[str, str] = field(default_factory=dict)
+    think: float = 2.0                      # Seconds of speech and model time before the call
+    until: Tuple[str, ...] = ()             # Repeat while the reply contains none of these
+    max_repeats: int = 1
+
+
+_STATUS_KNOWN = ("successful transaction", "failed transaction")
+
+SCENARIOS: Dict[str, List[Step]] = {
+    "vpa_payment": [
+        Step("detect_installed_upi_apps", think=1.0),
+        Step("extract_payment_details", {"voice_command": "Pay ₹500 to john@paytm"}, think=3.0),
+        Step("verify_transaction_safety", {"amount": "500", "recipient": "john@paytm"}, think=1.0),
+        Step("open_upi_app_with_details", {"app_name": "{app}", "recipient": "john@paytm", "amount": "500"}),
+        Step("provide_transaction_guidance", {"step": "pin_entry"}, think=1.0),
+        Step("get_transaction_status", think=3.0, until=_STATUS_KNOWN, max_repeats=4),
+    ],
+    "named_payee": [
+        Step("check_device_connection", think=1.0),
+        Step("extract_payment_details", {"voice_command": "send fifteen thousand rupees to Ravi Kumar"}, think=3.0),
+        Step("verify_transaction_safety", {"amount": "15000", "recipient": "Ravi Kumar"}, think=1.5),
+        Step("open_upi_app_with_details", {"app_name": "{app}", "recipient": "Ravi Kumar", "amount": "15000"}),
+        Step("get_transaction_status", think=4.0, until=_STATUS_KNOWN, max_repeats=4),
+        Step("clear_transaction_data", think=1.0),
+    ],
+    "invalid_vpa": [
+        Step("extract_payment_details", {"voice_command": "pay 200 to someone@examplebank"}, think=3.0),
+        Step("handle_non_upi_requests", {"request": "what is my account balance"}, think=2.0),
+        Step("clear_transaction_data", think=1.0),
+    ],
+    "manual_fallback": [
+        Step("extract_payment_details", {"voice_command": "send 120 rupees to chai@ybl"}, think=2.5),
+        Step("open_upi_app_with_details", {"app_name": "Cred", "recipient": "chai@ybl", "amount": "120"}),
+        Step("get_transaction_status", think=5.0),
+        Step("clear_transaction_data", think=1.0),
+    ],
+}
+DEFAULT_MIX = {"vpa_payment": 5, "named_payee": 3, "invalid_vpa": 1, "manual_fallback": 1}
+GREETING_SECONDS = 3.0  # The prewarm runs while the greeting is spoken
+FALLBACK_APP = "PhonePe"  # Named when the session's phone cannot be queried
+
+
+class StubRunContext:
+    """Stands in for ``livekit.agents.RunContext``; the tools only read ``userdata``."""
+
+    def __init__(self, userdata: Any):
+        self.userdata = userdata
+
+
+def _rss_bytes() -> int:
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # Peak, on Linux in KiB
+
+
+def _percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    """Nearest-rank p50/p95/p99 and max, in milliseconds of the seconds given."""
+    if not values:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    ordered = sorted(values)
+
+    def rank(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+
+    return {"p50_ms": rank(0.50), "p95_ms": rank(0.95), "p99_ms": rank(0.99),
+            "max_ms": round(ordered[-1] * 1000, 2)}
+
+
+class LoadGenerator:
+    """Runs scripted sessions concurrently against the tool set.
+
+    Args:
+        tools: The ``tools`` module, imported once the environment is set up.
+        sessions: Conversations in flight at once.
+        duration: Seconds during which new sessions are started.
+        mix: Scenario name -> relative weight.
+        think_scale: Multiplier for pauses between calls; 0 calls tools back to back.
+        users_per_slot: Returning users per concurrent slot; their stores are reused.
+        ramp_up: Seconds over which the concurrent slots are started.
+        seed: Seed for scenario choice and pause jitter.
+    """
+
+    def __init__(self, tools, sessions: int = 50, duration: float = 60.0,
+                 mix: Optional[Dict[str, float]] = None, think_scale: float = 1.0,
+                 users_per_slot: int = 4, ramp_up: float = 5.0, seed: int = 0):
+        self.tools = tools
+        self.sessions = sessions
+        self.duration = duration
+        self.mix = mix or dict(DEFAULT_MIX)
+        self.think_scale = think_scale
+        self.users_per_slot = max(1, users_per_slot)
+        self.ramp_up = ramp_up
+        self.rng = random.Random(seed)
+        self.tool_latency: Dict[str, List[float]] = {}
+        self.tool_errors: Dict[str, int] = {}
+        self.outcomes: Dict[str, int] = {}
+        self.completed = 0
+        self.failed = 0
+        self.loop_lag: List[float] = []
+        self.rss_samples: List[Tuple[float, int]] = []
+
+    async def _pause(self, seconds: float):
+        if self.think_scale > 0 and seconds > 0:
+            await asyncio.sleep(seconds * self.think_scale * self.rng.uniform(0.7, 1.3))
+
+    async def _installed_app(self, context: StubRunContext) -> str:
+        """Pick one of the UPI apps on the session's phone, usually cached by the prewarm."""
+        tools = self.tools
+        try:
+            apps = await tools.upi_app_cache.get(await tools._session_device(context))
+        except tools.AdbError:
+            apps = []
+        return self.rng.choice(apps) if apps else FALLBACK_APP
+
+    async def _call(self, step: Step, context: StubRunContext) -> str:
+        tool = getattr(self.tools, step.tool)
+        args = step.args
+        if any("{app}" in value for value in args.values()):
+            app = await self._installed_app(context)
+            args = {name: value.replace("{app}", app) for name, value in args.items()}
+        started = time.perf_counter()
+        try:
+            return await tool(context=context, **args)
+        except Exception:
+            self.tool_errors[step.tool] = self.tool_errors.get(step.tool, 0) + 1
+            raise
+        finally:
+            self.tool_latency.setdefault(step.tool, []).append(time.perf_counter() - started)
+
+    async def _session(self, identity: str, scenario: str):
+        tools = self.tools
+        tools.tracer.start_session(identity, **{"loadgen.scenario": scenario})
+        session_data = tools.VoicePaySessionData(identity=identity)
+        context = StubRunContext(session_data)
+        prewarm = tools.start_session_prewarm(session_data)
+        outcome = "none"
+        try:
+            await self._pause(GREETING_SECONDS)
+            for step in SCENARIOS[scenario]:
+                for _ in range(step.max_repeats):
+                    await self._pause(step.think)
+                    reply = await self._call(step, context)
+                    if not step.until:
+                        break
+                    known = next((marker for marker in step.until if marker in reply), None)
+                    if known is not None:
+                        outcome = known.split()[0]
+                        break
+            self.completed += 1
+        except Exception as e:
+            self.failed += 1
+            logging.getLogger(__name__).warning(f"Session {identity} ({scenario}) failed: {e}")
+        finally:
+            prewarm.cancel()
+            tools.release_session_stores(identity)
+            tools.tracer.end_session(identity)
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+    async def _slot(self, index: int, deadline: float):
+        await asyncio.sleep(self.ramp_up * index / max(1, self.sessions))
+        names, weights = list(self.mix), list(self.mix.values())
+        count = 0
+        while time.monotonic() < deadline:
+            identity = f"loadgen-{index}-{count % self.users_per_slot}"
+            await self._session(identity, self.rng.choices(names, weights)[0])
+            count += 1
+
+    async def _monitor(self, stop: asyncio.Event, interval: float = 0.05):
+        """Sample event-loop lag continuously and resident memory every second."""
+        loop = asyncio.get_running_loop()
+        next_rss = 0.0
+        while not stop.is_set():
+            started = loop.time()
+            await asyncio.sleep(interval)
+            self.loop_lag.append(max(0.0, loop.time() - started - interval))
+            if started >= next_rss:
+                self.rss_samples.append((time.monotonic(), _rss_bytes()))
+                next_rss = started + 1.0
+
+    async def run(self) -> Dict[str, Any]:
+        gc.collect()
+        rss_start = _rss_bytes()
+        started = time.monotonic()
+        stop = asyncio.Event()
+        monitor = asyncio.ensure_future(self._monitor(stop))
+        await asyncio.gather(*(self._slot(i, started + self.duration) for i in range(self.sessions)))
+        elapsed = time.monotonic() - started
+        stop.set()
+        await monitor
+        gc.collect()
+        rss_end = _rss_bytes()
+        return self._report(elapsed, rss_start, rss_end)
+
+    def _report(self, elapsed: float, rss_start: int, rss_end: int) -> Dict[str, Any]:
+        calls = sum(len(samples) for samples in self.tool_latency.values())
+        sessions = self.completed + self.failed
+        rss_peak = max([rss for _, rss in self.rss_samples] + [rss_start, rss_end])
+        snapshot = self.tools.metrics.snapshot()
+        fake = getattr(self.tools.adb, "fake", None)
+        mb = 1024 * 1024
+        return {
+            "config": {
+                "sessions": self.sessions, "duration_s": self.duration, "mix": self.mix,
+                "think_scale": self.think_scale, "users_per_slot": self.users_per_slot,
+                "adb_fake_scenario": os.getenv("ADB_FAKE_SCENARIO", ""),
+            },
+            "elapsed_s": round(elapsed, 2),
+            "sessions": {"completed": self.completed, "failed": self.failed,
+                         "per_s": round(sessions / elapsed, 3), "payment_outcomes": self.outcomes},
+            "tool_calls": {"total": calls, "per_s": round(calls / elapsed, 2),
+                           "errors": sum(self.tool_errors.values())},
+            "tools": {
+                name: {"count": len(samples), "errors": self.tool_errors.get(name, 0), **_percentiles(samples)}
+                for name, samples in sorted(self.tool_latency.items())
+            },
+            "loop_lag": _percentiles(self.loop_lag),
+            "memory": {
+                "rss_start_mb": round(rss_start / mb, 1),
+                "rss_end_mb": round(rss_end / mb, 1),
+                "rss_peak_mb": round(rss_peak / mb, 1),
+                "growth_mb": round((rss_end - rss_start) / mb, 1),
+                "growth_kb_per_session": round((rss_end - rss_start) / 1024 / sessions, 1) if sessions else None,
+                "resident_user_stores": len(self.tools.memory_pool),
+            },
+            "manual_fallbacks": {
+                entry["labels"].get("reason", ""): entry["value"]
+                for entry in snapshot["counters"].get("voicepay_manual_fallbacks_total", [])
+            },
+            "adb_commands": dict(fake.command_counts) if fake is not None else {},
+        }
+
+
+def print_report(report: Dict[str, Any]):
+    sessions, calls = report["sessions"], report["tool_calls"]
+    print(f"{report['config']['sessions']} concurrent sessions for {report['elapsed_s']:.0f} s")
+    print(f"  sessions:   {sessions['completed']} completed, {sessions['failed']} failed, "
+          f"{sessions['per_s']:.2f}/s  outcomes {sessions['payment_outcomes']}")
+    print(f"  tool calls: {calls['total']} ({calls['per_s']:.1f}/s), {calls['errors']} raised")
+    print(f"  {'tool':32s} {'count':>7s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'max ms':>9s}")
+    for name, row in report["tools"].items():
+        print(f"  {name:32s} {row['count']:7d} {row['p50_ms']:9.1f} {row['p95_ms']:9.1f} "
+              f"{row['p99_ms']:9.1f} {row['max_ms']:9.1f}")
+    lag = report["loop_lag"]
+    if lag["p50_ms"] is not None:
+        print(f"  loop lag:   p50 {lag['p50_ms']:.1f} ms  p95 {lag['p95_ms']:.1f} ms  "
+              f"p99 {lag['p99_ms']:.1f} ms  max {lag['max_ms']:.1f} ms")
+    memory = report["memory"]
+    print(f"  memory:     RSS {memory['rss_start_mb']} -> {memory['rss_end_mb']} MB "
+          f"(peak {memory['rss_peak_mb']} MB, {memory['growth_kb_per_session']} KB/session), "
+          f"{memory['resident_user_stores']} user stores resident")
+    if report["manual_fallbacks"]:
+        print(f"  manual fallbacks: {report['manual_fallbacks']}")
+    if report["adb_commands"]:
+        counts = ", ".join(f"{kind} {count}" for kind, count in sorted(report["adb_commands"].items()))
+        print(f"  fake adb commands: {counts}")
+
+
+def _parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="VoicePay concurrent session load generator")
+    parser.add_argument("--sessions", type=int, default=50, help="Concurrent sessions")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds during which sessions are started")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="Seconds over which sessions are started")
+    parser.add_argument("--mix", type=_parse_mix, help="Scenario weights, e.g. vpa_payment=3,invalid_vpa=1")
+    parser.add_argument("--think-scale", type=float, default=1.0,
+                        help="Multiplier for pauses between tool calls (0 for back to back)")
+    parser.add_argument("--users-per-session", type=int, default=4,
+                        help="Returning users cycled through by each concurrent session")
+    parser.add_argument("--devices", type=int, default=4, help="Simulated phones when ADB_FAKE_SCENARIO is unset")
+    parser.add_argument("--workdir", help="Directory for the memory stores (default: a temporary one)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    # Configuration is read when tools is imported, so prepare the environment first
+    os.environ.setdefault("ADB_FAKE_SCENARIO", f"lab:{args.devices}")
+    workdir = args.workdir or tempfile.mkdtemp(prefix="voicepay-loadgen-")
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)  # Stores live under ./voicepay_memory
+    import tools
+    logging.getLogger().setLevel(logging.WARNING)
+    tools.start_tracing()  # Spans cost time too when an exporter is configured
+
+    generator = LoadGenerator(
+        tools,
+        sessions=args.sessions,
+        duration=args.duration,
+        mix=args.mix,
+        think_scale=args.think_scale,
+        users_per_slot=args.users_per_session,
+        ramp_up=args.ramp_up,
+        seed=args.seed,
+    )
+    report = asyncio.run(generator.run())
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0 if report["sessions"]["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    # Imports of top-level modules resolve from the VoiceAssistant directory
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    sys.exit(main())
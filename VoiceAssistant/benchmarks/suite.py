@@ -0,0 +1,159 @@
+"""
+Benchmark suite for the VoicePay UPI Assistant.
+
+Runs the memory-store, extraction, UPI validation and notification parsing
+benchmarks, flattens their numbers into named metrics and compares them
+with a stored baseline (``benchmarks/baseline.json``). Run it with
+``python manage.py bench`` or ``python -m benchmarks.suite``.
+
+Timings are the best of several runs and machine dependent: record the baseline on
+the machine that runs the comparison. A timing regresses when it is more
+than ``threshold`` slower than the baseline; an accuracy regresses on any
+drop.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import platform
+import argparse
+from typing import Any, Dict, List, Optional
+
+from benchmarks import bench_extraction, bench_memory_store, bench_notifications, bench_upi_validation
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_THRESHOLD = 0.5  # Run-to-run noise on a shared VM reaches about 40%
+
+Metrics = Dict[str, Dict[str, Any]]
+
+
+def _size_label(count: int) -> str:
+    return f"{count // 1_000_000}m" if count >= 1_000_000 else f"{count // 1_000}k"
+
+
+def _metric(value: float, unit: str, better: str = "lower") -> Dict[str, Any]:
+    return {"value": round(value, 3), "unit": unit, "better": better}
+
+
+def _timing(name: str, value: float) -> Dict[str, Any]:
+    return _metric(value, name.rsplit("_", 1)[-1])
+
+
+def run_suite(full: bool = False) -> Dict[str, Any]:
+    """Run every benchmark and return the results document."""
+    metrics: Metrics = {}
+    started = time.perf_counter()
+
+    sizes = bench_memory_store.FULL_SIZES if full else bench_memory_store.SIZES
+    for count, result in bench_memory_store.run(sizes).items():
+        for name, value in result.items():
+            metrics[f"memory.{_size_label(count)}.{name}"] = _timing(name, value)
+
+    extraction = bench_extraction.run()["single_pass_engine"]
+    metrics["extraction.us_per_utterance"] = _metric(extraction["us_per_utterance"], "us")
+    metrics["extraction.accuracy"] = _metric(extraction["accuracy"], "ratio", "higher")
+
+    for name, value in bench_upi_validation.run().items():
+        if name == "accuracy":
+            metrics["upi_validation.accuracy"] = _metric(value, "ratio", "higher")
+        else:
+            metrics[f"upi_validation.{name}"] = _timing(name, value)
+
+    for fixture, result in bench_notifications.run().items():
+        for name, value in result.items():
+            if name != "records":
+                metrics[f"notifications.{fixture}.{name}"] = _timing(name, value)
+
+    return {
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}",
+        "full": full,
+        "duration_s": round(time.perf_counter() - started, 1),
+        "metrics": metrics,
+    }
+
+
+def load_baseline(path: str = BASELINE_PATH) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(metrics: Metrics, baseline: Metrics, threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """Return one row per metric present in both runs, flagging regressions."""
+    rows = []
+    for name, current in metrics.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        before, after = reference["value"], current["value"]
+        change = (after - before) / before if before else 0.0
+        if current["better"] == "higher":
+            regressed = after < before
+        else:
+            regressed = change > threshold
+        rows.append({"name": name, "baseline": before, "current": after,
+                     "change": change, "regressed": regressed})
+    return rows
+
+
+def write_results(results: Dict[str, Any], path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def report(results: Dict[str, Any], baseline: Optional[Dict[str, Any]],
+           threshold: float = DEFAULT_THRESHOLD) -> bool:
+    """Print the results against the baseline; returns False on a regression."""
+    metrics = results["metrics"]
+    rows = {row["name"]: row for row in compare(metrics, baseline["metrics"], threshold)} if baseline else {}
+    regressions = 0
+    for name, metric in metrics.items():
+        line = f"{name:48s} {metric['value']:>14,.3f} {metric['unit']:5s}"
+        row = rows.get(name)
+        if row is not None:
+            line += f" {row['change']:+8.1%}"
+            if row["regressed"]:
+                line += "  REGRESSION"
+                regressions += 1
+        print(line)
+    if baseline is None:
+        print("No baseline stored; run with --save-baseline to record one.")
+    elif regressions:
+        print(f"{regressions} metric(s) regressed beyond {threshold:.0%} of the baseline.")
+    return regressions == 0
+
+
+def run_and_report(full: bool = False, output: Optional[str] = None, baseline_path: str = BASELINE_PATH,
+                   save_baseline: bool = False, threshold: float = DEFAULT_THRESHOLD) -> int:
+    """Run the suite, compare with the baseline and return a process exit status."""
+    logging.disable(logging.INFO)  # The store logs every add
+    results = run_suite(full)
+    ok = report(results, load_baseline(baseline_path), threshold)
+    if output:
+        write_results(results, output)
+    if save_baseline:
+        write_results(results, baseline_path)
+        print(f"Baseline saved to {baseline_path}")
+        return 0
+    return 0 if ok else 1
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="VoicePay benchmark suite")
+    parser.add_argument("--full", action="store_true", help="Include the 1M-record memory store (needs ~5 GB RAM)")
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative slowdown that counts as a regression")
+    args = parser.parse_args(argv)
+    return run_and_report(args.full, args.output, args.baseline, args.save_baseline, args.threshold)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
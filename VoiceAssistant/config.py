@@ -2,8 +2,8 @@
 Configuration management for the VoicePay UPI Assistant.
 """
 import os
-from dataclasses import dataclass
-from typing import Optional, Dict, Any
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -35,7 +35,43 @@ class VoicePayConfig:
     
     # Memory settings
     memory_retention_days: int = 0  # Don't retain sensitive data
+    memory_type_ttls: Dict[str, float] = field(default_factory=dict)  # Per-type TTLs in seconds
     max_payment_memories: int = 0   # For security, don't store payment details
+    memory_backend: str = "sqlite"        # "sqlite" (multi-process safe) or "journal"
+    memory_write_behind: bool = True      # Persist memories from a background thread
+    memory_flush_interval: float = 0.5    # Seconds before queued memory writes are flushed
+    memory_max_batch_size: int = 64       # Maximum memory writes batched per flush
+    memory_max_resident_users: int = 256  # Per-user stores kept open by a worker
+    memory_max_resident_bytes: int = 0    # Estimated byte budget for open stores (0 = unbounded)
+    payee_bloom_filter: bool = False      # Bloom filter in front of the known-payee registry
+    
+    # Android device connections
+    adb_server_host: str = "127.0.0.1"
+    adb_server_port: int = 5037
+    adb_direct_addresses: List[str] = field(default_factory=list)  # host:port devices reached over TCP
+    adb_key_path: str = ""                # Defaults to ~/.android/adbkey
+    adb_command_timeout: float = 10.0     # Default per-command timeout in seconds
+    adb_health_check_interval: float = 30.0  # Idle seconds before a connection is probed
+    adb_streams_per_device: int = 4       # Pooled commands run at once on each device behind the adb server
+    adb_device_serial: str = ""           # Pins every session to one device; empty binds the least busy one
+    device_refresh_interval: float = 5.0  # Seconds a connected-device listing is reused
+    adb_fake_scenario: str = ""           # Simulated phones instead of adb: scenario JSON path or "lab:N"
+    session_prewarm_ttl: float = 60.0     # Seconds a session's startup device probes answer tool calls
+    upi_app_cache_ttl: float = 300.0      # Seconds detected UPI apps are cached per device
+    
+    # UPI ID validation
+    upi_handles_path: str = ""            # Known UPI handles list; defaults to upi_handles.txt
+    
+    # Metrics
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int = 9464              # Prometheus endpoint; 0 disables it
+    metrics_json_path: str = ""           # Periodic JSON snapshot; empty disables it
+    metrics_json_interval: float = 60.0   # Seconds between JSON snapshots
+    
+    # Tracing
+    tracing_exporter: str = ""            # "file", "otlp" or empty to disable tracing
+    tracing_file_path: str = "voicepay_traces.jsonl"
+    tracing_otlp_endpoint: str = "http://127.0.0.1:4318/v1/traces"
     
     # Accessibility features
     slow_speech_mode: bool = False
@@ -64,9 +100,64 @@ class VoicePayConfig:
         self.enable_amount_confirmation = os.getenv('ENABLE_AMOUNT_CONFIRMATION', 'true').lower() == 'true'
         self.enable_recipient_verification = os.getenv('ENABLE_RECIPIENT_VERIFICATION', 'true').lower() == 'true'
         
+        # Memory retention
+        self.memory_retention_days = int(os.getenv('MEMORY_RETENTION_DAYS', self.memory_retention_days))
+        # e.g. MEMORY_TYPE_TTLS="payment_details=900,active_transaction=1800"
+        for item in os.getenv('MEMORY_TYPE_TTLS', '').split(','):
+            if '=' in item:
+                memory_type, ttl = item.split('=', 1)
+                self.memory_type_ttls[memory_type.strip()] = float(ttl)
+        
+        # Memory persistence
+        self.memory_backend = os.getenv('MEMORY_BACKEND', self.memory_backend).lower()
+        self.memory_write_behind = os.getenv('MEMORY_WRITE_BEHIND', 'true').lower() == 'true'
+        self.memory_flush_interval = float(os.getenv('MEMORY_FLUSH_INTERVAL', self.memory_flush_interval))
+        self.memory_max_batch_size = int(os.getenv('MEMORY_MAX_BATCH_SIZE', self.memory_max_batch_size))
+        self.memory_max_resident_users = int(os.getenv('MEMORY_MAX_RESIDENT_USERS', self.memory_max_resident_users))
+        self.memory_max_resident_bytes = int(os.getenv('MEMORY_MAX_RESIDENT_BYTES', self.memory_max_resident_bytes))
+        self.payee_bloom_filter = os.getenv('PAYEE_BLOOM_FILTER', 'false').lower() == 'true'
+        
+        # Android device connections
+        self.adb_server_host = os.getenv('ADB_SERVER_HOST', self.adb_server_host)
+        self.adb_server_port = int(os.getenv('ADB_SERVER_PORT', self.adb_server_port))
+        # e.g. ADB_DIRECT_ADDRESSES="192.168.1.20:5555"
+        self.adb_direct_addresses.extend(
+            address.strip() for address in os.getenv('ADB_DIRECT_ADDRESSES', '').split(',') if address.strip()
+        )
+        self.adb_key_path = os.getenv('ADB_KEY_PATH', self.adb_key_path)
+        self.adb_command_timeout = float(os.getenv('ADB_COMMAND_TIMEOUT', self.adb_command_timeout))
+        self.adb_health_check_interval = float(os.getenv('ADB_HEALTH_CHECK_INTERVAL', self.adb_health_check_interval))
+        self.adb_streams_per_device = int(os.getenv('ADB_STREAMS_PER_DEVICE', self.adb_streams_per_device))
+        self.adb_device_serial = os.getenv('ADB_DEVICE_SERIAL', self.adb_device_serial)
+        self.device_refresh_interval = float(os.getenv('DEVICE_REFRESH_INTERVAL', self.device_refresh_interval))
+        self.adb_fake_scenario = os.getenv('ADB_FAKE_SCENARIO', self.adb_fake_scenario)
+        self.session_prewarm_ttl = float(os.getenv('SESSION_PREWARM_TTL', self.session_prewarm_ttl))
+        self.upi_app_cache_ttl = float(os.getenv('UPI_APP_CACHE_TTL', self.upi_app_cache_ttl))
+        
+        # UPI ID validation
+        self.upi_handles_path = os.getenv('UPI_HANDLES_PATH', self.upi_handles_path)
+        
+        # Metrics
+        self.metrics_host = os.getenv('METRICS_HOST', self.metrics_host)
+        self.metrics_port = int(os.getenv('METRICS_PORT', self.metrics_port))
+        self.metrics_json_path = os.getenv('METRICS_JSON_PATH', self.metrics_json_path)
+        self.metrics_json_interval = float(os.getenv('METRICS_JSON_INTERVAL', self.metrics_json_interval))
+        
+        # Tracing
+        self.tracing_exporter = os.getenv('TRACING_EXPORTER', self.tracing_exporter).lower()
+        self.tracing_file_path = os.getenv('TRACING_FILE_PATH', self.tracing_file_path)
+        self.tracing_otlp_endpoint = os.getenv('TRACING_OTLP_ENDPOINT', self.tracing_otlp_endpoint)
+        
         # Logging
         self.log_level = os.getenv('LOG_LEVEL', 'INFO')
         self.log_transactions = os.getenv('LOG_TRANSACTIONS', 'true').lower() == 'true'
 
+    @property
+    def sensitive_memory_ttl(self) -> float:
+        """Seconds sensitive memories are kept: the retention period, or one hour."""
+        if self.memory_retention_days > 0:
+            return self.memory_retention_days * 86400.0
+        return 3600.0
+
 # Global configuration instance
 config = VoicePayConfig()
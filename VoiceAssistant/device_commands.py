@@ -0,0 +1,180 @@
+"""
+Asynchronous device command layer for the VoicePay UPI Assistant.
+
+Tool functions run on the agent's event loop next to the realtime audio
+pipeline, so no ADB interaction may block it. ``DeviceCommands`` runs
+device shell commands over the persistent connection pool when one is
+available and otherwise through ``asyncio.create_subprocess_exec``. Every
+command has a timeout, and a timed-out or cancelled command kills its adb
+process, or closes its pooled socket, rather than leaving it running.
+"""
+import asyncio
+import logging
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Sequence, Tuple
+
+from adb_pool import (
+    AdbConnectionPool,
+    AdbError,
+    AdbResult,
+    AdbTimeoutError,
+    AdbUnavailableError,
+    Command,
+    build_shell_command,
+)
+from metrics import metrics, phase
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceCommandTimeout(AdbError):
+    """A device command did not finish within its timeout."""
+
+
+class DeviceCommands:
+    """Async runner for adb host and device shell commands.
+
+    Args:
+        pool: Connection pool preferred for shell commands, if any.
+        adb_path: adb client executable used without a pooled transport.
+        default_timeout: Timeout in seconds for commands that do not pass one.
+    """
+
+    def __init__(self, pool: Optional[AdbConnectionPool] = None, adb_path: str = "adb",
+                 default_timeout: float = 10.0):
+        self.pool = pool
+        self.adb_path = adb_path
+        self.default_timeout = default_timeout
+        self._error_listeners: List[Callable[[Optional[str]], None]] = []
+
+    def add_error_listener(self, listener: Callable[[Optional[str]], None]):
+        """Call ``listener(serial)`` whenever a command fails with an ``AdbError``.
+
+        Lets the device registry re-list devices only once one has failed.
+        """
+        self._error_listeners.append(listener)
+
+    def _argv(self, serial: Optional[str], args: Sequence[str]) -> List[str]:
+        argv = [self.adb_path]
+        if serial:
+            argv += ["-s", serial]
+        return argv + list(args)
+
+    async def _spawn(self, argv: List[str]) -> asyncio.subprocess.Process:
+        try:
+            return await asyncio.create_subprocess_exec(
+                *argv, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+            )
+        except FileNotFoundError as e:
+            raise AdbUnavailableError(f"{self.adb_path} is not installed") from e
+
+    @staticmethod
+    async def _kill(process: asyncio.subprocess.Process):
+        """Kill an adb process that is still running and reap it."""
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+            await process.wait()
+
+    async def _exec(self, argv: List[str], timeout: Optional[float], serial: str = "") -> AdbResult:
+        timeout = timeout or self.default_timeout
+        process = await self._spawn(argv)
+        try:
+            stdout, _ = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            await self._kill(process)
+            raise DeviceCommandTimeout(f"{' '.join(argv[1:])} timed out after {timeout}s")
+        except asyncio.CancelledError:
+            await self._kill(process)
+            raise
+        return AdbResult(process.returncode, stdout.decode("utf-8", "replace"), serial)
+
+    async def _observed(self, operation: str, command: Awaitable[AdbResult], program: str,
+                        serial: Optional[str] = None) -> AdbResult:
+        """Await a command, recording its latency and outcome.
+
+        Only the program name is traced; arguments can carry payment details.
+        """
+        outcome = "ok"
+        try:
+            with phase("adb", operation, **{"adb.program": program, "adb.serial": serial or "default"}):
+                result = await command
+            if not result.ok:
+                outcome = "failed"
+            return result
+        except DeviceCommandTimeout:
+            outcome = "timeout"
+            raise
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        except AdbUnavailableError:
+            outcome = "unavailable"
+            raise
+        except AdbError:
+            outcome = "error"
+            raise
+        finally:
+            metrics.inc("voicepay_adb_commands_total", operation=operation, outcome=outcome)
+            if outcome not in ("ok", "failed", "cancelled"):
+                for listener in self._error_listeners:
+                    listener(serial)
+
+    async def host(self, args: Sequence[str], timeout: Optional[float] = None) -> AdbResult:
+        """Run an adb host command such as ``version`` or ``devices``."""
+        return await self._observed("host", self._exec(self._argv(None, args), timeout), args[0])
+
+    async def shell(self, command: Command, serial: Optional[str] = None,
+                    timeout: Optional[float] = None) -> AdbResult:
+        """Run a device shell command, preferring the connection pool."""
+        program = command.split(" ", 1)[0] if isinstance(command, str) else command[0]
+        return await self._observed("shell", self._shell(command, serial, timeout), program, serial)
+
+    async def _shell(self, command: Command, serial: Optional[str], timeout: Optional[float]) -> AdbResult:
+        if self.pool is not None and self.pool.available:
+            try:
+                return await self.pool.run(command, serial=serial, timeout=timeout)
+            except AdbTimeoutError as e:
+                raise DeviceCommandTimeout(str(e)) from e
+            except AdbUnavailableError as e:
+                # e.g. the adb server is not up yet; the adb client starts it
+                logger.debug(f"ADB pool unavailable, using adb client: {e}")
+        argv = self._argv(serial, ["shell", build_shell_command(command)])
+        return await self._exec(argv, timeout, serial or "")
+
+    async def stream(self, command: Command, serial: Optional[str] = None,
+                     timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Yield a long-running shell command's stdout line by line.
+
+        ``timeout`` bounds the whole stream (None for unbounded). The adb
+        process is killed when the stream ends, times out, is cancelled or
+        is closed early with ``aclose()``.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout else None
+        process = await self._spawn(self._argv(serial, ["shell", build_shell_command(command)]))
+        try:
+            while True:
+                remaining = None if deadline is None else max(0.0, deadline - loop.time())
+                try:
+                    line = await asyncio.wait_for(process.stdout.readline(), remaining)
+                except asyncio.TimeoutError:
+                    raise DeviceCommandTimeout(f"Stream timed out after {timeout}s") from None
+                if not line:
+                    return
+                yield line.decode("utf-8", "replace").rstrip("\r\n")
+        finally:
+            await self._kill(process)
+
+    async def list_devices(self, timeout: Optional[float] = None) -> List[Tuple[str, str]]:
+        """Return ``(serial, state)`` pairs reported by ``adb devices``."""
+        result = await self.host(["devices"], timeout=timeout)
+        if not result.ok:
+            raise AdbError("adb devices failed")
+        devices = []
+        for line in result.stdout.strip().split("\n")[1:]:  # Skip header
+            parts = line.split()
+            if len(parts) >= 2:
+                devices.append((parts[0], parts[1]))
+        return devices
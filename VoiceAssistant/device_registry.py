@@ -0,0 +1,166 @@
+"""
+Connected-device registry for the VoicePay UPI Assistant.
+
+One host may serve several phones (a test lab or a row of kiosks). The
+registry tracks every connected serial and its state, binds each session
+to one authorized device so all of the session's commands are sent with
+that serial, and runs per-device work on all devices concurrently.
+
+A bound session keeps its device without listing devices again until a
+command fails with an ``AdbError``, so a tool call costs no ``adb devices``
+round trip however far apart the calls are.
+"""
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, TypeVar, Union
+
+from adb_pool import AdbError
+from device_commands import DeviceCommands
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class DeviceInfo:
+    """A device seen by the adb server or reached directly over TCP."""
+    serial: str
+    state: str          # "device" when authorized, else e.g. "unauthorized" or "offline"
+    transport: str      # "server" or "direct"
+    last_seen: float    # Monotonic seconds
+
+    @property
+    def authorized(self) -> bool:
+        return self.state == "device"
+
+
+class DeviceRegistry:
+    """Known devices, refreshed on demand, and the sessions bound to them.
+
+    Args:
+        commands: Device command layer; its pool, if any, contributes direct devices.
+        refresh_interval: Seconds a device listing is reused by ``devices`` before
+            asking adb again. ``acquire`` reuses it until a command fails.
+        timeout: Timeout for a device listing.
+    """
+
+    def __init__(self, commands: DeviceCommands, refresh_interval: float = 5.0,
+                 timeout: float = 5.0):
+        self.commands = commands
+        self.refresh_interval = refresh_interval
+        self.timeout = timeout
+        self._devices: Dict[str, DeviceInfo] = {}
+        self._refreshed_at = float("-inf")
+        self._stale = True  # A command failed since the last listing
+        self._pending: Optional[asyncio.Future] = None
+        self._bindings: Dict[str, str] = {}  # session -> serial
+        commands.add_error_listener(self.invalidate)
+
+    def invalidate(self, serial: Optional[str] = None):
+        """Have the next lookup list devices again, e.g. after a command failed."""
+        self._stale = True
+
+    async def devices(self, refresh: bool = False) -> List[DeviceInfo]:
+        """Return every known device, listing them again if the snapshot is stale.
+
+        Raises ``AdbError`` if no device source can be queried.
+        """
+        if refresh or self._stale or time.monotonic() - self._refreshed_at > self.refresh_interval:
+            # Concurrent refreshes share one listing
+            if self._pending is None:
+                self._pending = asyncio.ensure_future(self._refresh())
+                self._pending.add_done_callback(lambda _: setattr(self, "_pending", None))
+            await asyncio.shield(self._pending)
+        return list(self._devices.values())
+
+    async def authorized(self, refresh: bool = False) -> List[str]:
+        """Return serials of authorized devices."""
+        return [device.serial for device in await self.devices(refresh) if device.authorized]
+
+    async def _refresh(self):
+        sources = [self.commands.list_devices(timeout=self.timeout)]
+        pool = self.commands.pool
+        if pool is not None and pool.available:
+            # Also covers direct TCP devices, which the adb server does not list
+            sources.append(pool.devices())
+        listings = await asyncio.gather(*sources, return_exceptions=True)
+        if all(isinstance(listing, BaseException) for listing in listings):
+            error = listings[0]
+            raise error if isinstance(error, AdbError) else AdbError(f"Cannot list devices: {error}")
+
+        now = time.monotonic()
+        devices: Dict[str, DeviceInfo] = {}
+        if not isinstance(listings[0], BaseException):
+            for serial, state in listings[0]:
+                devices[serial] = DeviceInfo(serial, state, "server", now)
+        if len(listings) > 1 and not isinstance(listings[1], BaseException):
+            for serial in listings[1]:
+                transport = "direct" if serial in pool.direct_addresses else "server"
+                devices.setdefault(serial, DeviceInfo(serial, "device", transport, now))
+
+        for serial in devices.keys() - self._devices.keys():
+            logger.info(f"Android device {serial} connected ({devices[serial].state})")
+        for serial in self._devices.keys() - devices.keys():
+            logger.info(f"Android device {serial} disconnected")
+        self._devices = devices
+        self._refreshed_at = now
+        self._stale = False
+
+    async def acquire(self, identity: str, preferred: Optional[str] = None) -> Optional[str]:
+        """Return the device a session's commands go to, binding one if needed.
+
+        A session keeps its device while it stays authorized; devices are
+        only listed again once a command has failed. ``preferred`` pins the
+        session to a serial, e.g. the phone at a kiosk; otherwise the
+        authorized device serving the fewest sessions is chosen. Returns
+        None when no device is available, leaving adb to pick its default.
+        """
+        if preferred:
+            self._bindings[identity] = preferred
+            return preferred
+        bound = self._bindings.get(identity)
+        if bound is not None and not self._stale:
+            device = self._devices.get(bound)
+            if device is not None and device.authorized:
+                return bound
+        try:
+            serials = await self.authorized()
+        except AdbError as e:
+            logger.debug(f"No device for session {identity}: {e}")
+            return bound
+        if bound in serials:
+            return bound
+        if not serials:
+            self._bindings.pop(identity, None)
+            return None
+
+        load = {serial: 0 for serial in serials}
+        for serial in self._bindings.values():
+            if serial in load:
+                load[serial] += 1
+        serial = min(serials, key=load.__getitem__)
+        self._bindings[identity] = serial
+        logger.info(f"Session {identity} bound to device {serial}")
+        return serial
+
+    def bound_device(self, identity: str) -> Optional[str]:
+        """Return the device a session is bound to, if any."""
+        return self._bindings.get(identity)
+
+    def release(self, identity: str):
+        """Unbind a session from its device."""
+        self._bindings.pop(identity, None)
+
+    async def fan_out(self, operation: Callable[[str], Awaitable[T]],
+                      serials: Optional[List[str]] = None) -> Dict[str, Union[T, BaseException]]:
+        """Run ``operation(serial)`` on every authorized device concurrently.
+
+        Per-device failures are returned in place of that device's result.
+        """
+        if serials is None:
+            serials = await self.authorized()
+        results = await asyncio.gather(*(operation(serial) for serial in serials), return_exceptions=True)
+        return dict(zip(serials, results))
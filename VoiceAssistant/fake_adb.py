@@ -0,0 +1,613 @@
+"""
+Simulated Android devices for the VoicePay UPI Assistant.
+
+``FakeAdb`` answers everything the assistant asks a phone for: ``adb
+devices``, ``pm list packages``, ``getprop``, ``am start -W``, ``dumpsys
+notification`` and the ``logcat`` notification event stream. Its answers
+come from a scenario that sets:
+
+- the phones and the apps installed on them;
+- the latency of each command;
+- how often commands fail or time out;
+- when payment notifications are posted.
+
+Device paths can then be load-tested and stress-tested reproducibly
+without phones or an adb installation.
+
+Two drop-in transports use it:
+
+- ``FakeDeviceCommands`` runs the commands in-process on the event loop,
+  instead of in adb client processes;
+- ``FakeAdbPool`` replaces the pooled device connections, so device
+  commands run on the pool's worker threads as they do with real phones.
+
+Set ``ADB_FAKE_SCENARIO`` to a scenario JSON file, or to ``lab:N`` for N
+default phones, to run the assistant against simulated devices.
+"""
+import json
+import math
+import time
+import zlib
+import shlex
+import random
+import asyncio
+import bisect
+import logging
+import threading
+from dataclasses import dataclass, field, fields
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from adb_pool import AdbConnectionPool, AdbResult, AdbUnavailableError, Command, build_shell_command
+from device_commands import DeviceCommands, DeviceCommandTimeout
+from upi_apps import UPI_APP_PACKAGES
+from upi_launcher import UPI_APPS
+
+logger = logging.getLogger(__name__)
+
+# Deep-link scheme -> package, e.g. "phonepe" -> "com.phonepe.app"
+_SCHEME_PACKAGES: Dict[str, str] = {app.uri_prefix.split("://", 1)[0]: app.package for app in UPI_APPS.values()}
+_LAUNCHABLE = [app.package for app in UPI_APPS.values()]
+_FILLER_PACKAGES = (
+    "com.android.chrome", "com.google.android.gm", "com.whatsapp", "com.instagram.android",
+    "com.google.android.youtube", "com.spotify.music", "in.swiggy.android", "com.application.zomato",
+    "com.flipkart.android", "com.truecaller", "com.google.android.apps.maps", "com.android.vending",
+)
+_BACKGROUND_NOTIFICATIONS = (
+    ("com.whatsapp", "Amma", "Call me when free"),
+    ("com.google.android.gm", "Swiggy", "Your order is on the way"),
+    ("com.android.systemui", "Battery saver", "Battery saver is on"),
+    ("com.google.android.apps.messaging", "AX-HDFCBK", "Rs.250 debited from a/c XX1234"),
+    ("com.truecaller", "Missed call", "+91 98765 43210"),
+)
+
+
+@dataclass
+class Latency:
+    """Simulated duration of a command in seconds.
+
+    ``base`` plus a uniform ``jitter``, plus ``per_kb`` for each KiB of
+    output, which models large dumps crossing the USB link.
+    """
+    base: float = 0.02
+    jitter: float = 0.01
+    per_kb: float = 0.0
+
+    def sample(self, rng: random.Random, output_bytes: int = 0) -> float:
+        return self.base + rng.uniform(0.0, self.jitter) + self.per_kb * output_bytes / 1024
+
+
+# Command kind (the program run on the device, or "devices") -> latency
+DEFAULT_LATENCY: Dict[str, Latency] = {
+    "devices": Latency(0.005, 0.005),
+    "echo": Latency(0.005, 0.003),
+    "getprop": Latency(0.015, 0.01),
+    "pm": Latency(0.25, 0.1),
+    "am": Latency(0.05, 0.02),  # Plus the app's start-up time with -W
+    "dumpsys": Latency(0.08, 0.04, per_kb=0.002),
+    "default": Latency(0.02, 0.01),
+}
+
+
+@dataclass
+class FakeNotification:
+    """A notification posted ``at`` seconds after the scenario starts (<= 0: already posted)."""
+    package: str
+    title: str
+    text: str
+    at: float = 0.0
+
+
+@dataclass
+class FakeDevice:
+    """A simulated phone.
+
+    Launching a UPI app with a payment link posts its outcome notification
+    ``payment_delay`` seconds later (None: never), failed with probability
+    ``payment_failure_rate``.
+    """
+    serial: str
+    state: str = "device"  # Or "unauthorized", "offline"
+    model: str = "Pixel 7"
+    android_version: str = "14"
+    packages: List[str] = field(default_factory=lambda: ["com.phonepe.app", "com.google.android.apps.nbu.paisa.user"])
+    extra_packages: int = 120           # Non-UPI packages listed by pm, for output size
+    background_notifications: int = 20  # Non-UPI notifications already in the shade
+    cold_start_ms: int = 1400
+    warm_start_ms: int = 350
+    payment_delay: Optional[float] = 4.0
+    payment_failure_rate: float = 0.0
+    notifications: List[FakeNotification] = field(default_factory=list)
+
+
+@dataclass
+class FakeAdbScenario:
+    """Phones and adb behaviour for a simulation run.
+
+    ``failure_rate`` and ``timeout_rate`` apply to each device command:
+    a failed command reports a broken connection, and a timed-out one
+    never answers. A scenario file is the JSON form of this class, e.g.::
+
+        {"seed": 7, "failure_rate": 0.01,
+         "latency": {"pm": {"base": 0.4, "jitter": 0.2}},
+         "devices": [{"serial": "kiosk-1", "packages": ["net.one97.paytm"],
+                      "payment_delay": 6.0}]}
+    """
+    devices: List[FakeDevice] = field(default_factory=list)
+    latency: Dict[str, Latency] = field(default_factory=dict)  # Overrides DEFAULT_LATENCY per kind
+    failure_rate: float = 0.0
+    timeout_rate: float = 0.0
+    seed: int = 0
+
+    @classmethod
+    def lab(cls, count: int = 1, **device_fields) -> 'FakeAdbScenario':
+        """``count`` emulator-style phones, each with two of the launchable UPI apps."""
+        devices = []
+        for index in range(count):
+            packages = [_LAUNCHABLE[index % len(_LAUNCHABLE)], _LAUNCHABLE[(index + 1) % len(_LAUNCHABLE)]]
+            settings = {"packages": packages, **device_fields}
+            devices.append(FakeDevice(serial=f"emulator-{5554 + 2 * index}", **settings))
+        return cls(devices=devices)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'FakeAdbScenario':
+        devices = []
+        for device in data.get("devices", []):
+            device = dict(device)
+            device["notifications"] = [FakeNotification(**n) for n in device.get("notifications", [])]
+            devices.append(FakeDevice(**device))
+        latency = {kind: Latency(**value) for kind, value in data.get("latency", {}).items()}
+        rest = {f.name: data[f.name] for f in fields(cls) if f.name in data and f.name not in ("devices", "latency")}
+        return cls(devices=devices, latency=latency, **rest)
+
+    @classmethod
+    def from_file(cls, path: str) -> 'FakeAdbScenario':
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def load_scenario(spec: str) -> FakeAdbScenario:
+    """Return the scenario for ``lab:N`` or a scenario file path."""
+    if spec == "lab" or spec.startswith("lab:"):
+        _, _, count = spec.partition(":")
+        return FakeAdbScenario.lab(int(count or 1))
+    return FakeAdbScenario.from_file(spec)
+
+
+@dataclass
+class FakeReply:
+    """What adb would print for a command, and how long it would take."""
+    returncode: int
+    stdout: str
+    delay: float = 0.0              # Seconds; infinite when the command never answers
+    transport_error: bool = False   # The connection broke rather than the command failing
+
+
+class _PostedNotification:
+    """A notification in a simulated shade, with its ``dumpsys`` block rendered once."""
+
+    __slots__ = ("post_ms", "key", "package", "uid", "notification_id", "block")
+
+    def __init__(self, post_ms: int, package: str, notification_id: int, title: str, text: str):
+        self.post_ms = post_ms
+        self.package = package
+        self.uid = 10000 + zlib.crc32(package.encode()) % 900
+        self.notification_id = notification_id
+        self.key = f"0|{package}|{notification_id}|null|{self.uid}"
+        self.block = (
+            f"    NotificationRecord(0x{zlib.crc32(self.key.encode()):08x}: pkg={package} user=UserHandle{{0}} "
+            f"id={notification_id} tag=null importance=4 key={self.key}: Notification(channel=default "
+            f"shortcut=null contentView=null vibrate=null sound=null defaults=0x0 flags=0x10 vis=PRIVATE))\n"
+            f"      uid={self.uid} userId=0\n"
+            f"      opPkg={package}\n"
+            f"      key={self.key}\n"
+            f"      seen=false\n"
+            f"      groupKey=0|{package}|g:default\n"
+            f"      when={post_ms}\n"
+            f"      extras={{\n"
+            f"        android.title=String ({title})\n"
+            f"        android.text=String ({text})\n"
+            f"        android.showWhen=Boolean (true)\n"
+            f"      }}\n"
+            f"      mCreationTimeMs={post_ms}\n"
+            f"      mUpdateTimeMs={post_ms}\n"
+        )
+
+    def __lt__(self, other: "_PostedNotification") -> bool:
+        return self.post_ms < other.post_ms
+
+
+class _DeviceState:
+    """Mutable state of one simulated phone. Guarded by the FakeAdb lock."""
+
+    def __init__(self, device: FakeDevice, rng: random.Random):
+        self.device = device
+        self.rng = rng
+        self.running: set = set()  # Packages started since the scenario began
+        self.posted: List[_PostedNotification] = []  # Including scheduled ones, by post time
+        self.next_id = 1000
+        self.packages_output = "".join(
+            f"package:{package}\n" for package in
+            sorted(set(device.packages) | set(_filler_packages(device.extra_packages)))
+        )
+
+    def post(self, post_ms: int, package: str, title: str, text: str):
+        self.next_id += 1
+        bisect.insort(self.posted, _PostedNotification(post_ms, package, self.next_id, title, text))
+
+    def visible(self, now_ms: int) -> List[_PostedNotification]:
+        """Notifications posted by ``now_ms``, oldest first."""
+        return self.posted[:bisect.bisect_right([n.post_ms for n in self.posted], now_ms)]
+
+
+def _filler_packages(count: int) -> List[str]:
+    named = list(_FILLER_PACKAGES[:count])
+    return named + [f"com.example.app{index:04d}" for index in range(count - len(named))]
+
+
+def _now_ms() -> int:
+    return time.time_ns() // 1_000_000
+
+
+class FakeAdb:
+    """In-process adb server and phones driven by a ``FakeAdbScenario``.
+
+    Thread-safe: the pool transport calls it from worker threads while
+    streams read it on the event loop. ``command_counts`` tallies device
+    commands by kind, and device listings as ``"devices"``.
+    """
+
+    def __init__(self, scenario: FakeAdbScenario):
+        self.scenario = scenario
+        self.latency = {**DEFAULT_LATENCY, **scenario.latency}
+        self.started_ms = _now_ms()
+        self.command_counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._rng = random.Random(scenario.seed)
+        self._devices: Dict[str, _DeviceState] = {}
+        for device in scenario.devices:
+            # A generator per device keeps each phone's draws independent of the others' traffic
+            state = _DeviceState(device, random.Random(f"{scenario.seed}:{device.serial}"))
+            for index in range(device.background_notifications):
+                package, title, text = _BACKGROUND_NOTIFICATIONS[index % len(_BACKGROUND_NOTIFICATIONS)]
+                state.post(self.started_ms - (device.background_notifications - index) * 60_000, package, title, text)
+            for notification in device.notifications:
+                state.post(self.started_ms + int(notification.at * 1000), notification.package,
+                           notification.title, notification.text)
+            self._devices[device.serial] = state
+
+    def serials(self, authorized_only: bool = True) -> List[str]:
+        return [serial for serial, state in self._devices.items()
+                if not authorized_only or state.device.state == "device"]
+
+    def execute(self, args: Sequence[str], serial: Optional[str] = None) -> FakeReply:
+        """Answer an adb client invocation, e.g. ``["devices"]`` or ``["shell", "getprop"]``."""
+        if not args:
+            return FakeReply(1, "adb: no command given\n")
+        if args[0] == "version":
+            return FakeReply(0, "Android Debug Bridge version 1.0.41\nVersion 35.0.1-fake\n",
+                             self._sample("devices"))
+        if args[0] == "devices":
+            self.tally("devices")
+            lines = [f"{serial}\t{state.device.state}" for serial, state in self._devices.items()]
+            return FakeReply(0, "List of devices attached\n" + "".join(f"{line}\n" for line in lines) + "\n",
+                             self._sample("devices"))
+        if args[0] == "shell":
+            return self.shell(serial, " ".join(args[1:]))
+        return FakeReply(1, f"adb: unknown command {args[0]}\n")
+
+    def tally(self, kind: str):
+        """Count a command of ``kind`` in ``command_counts``."""
+        with self._lock:
+            self.command_counts[kind] = self.command_counts.get(kind, 0) + 1
+
+    def _sample(self, kind: str, output_bytes: int = 0, rng: Optional[random.Random] = None) -> float:
+        latency = self.latency.get(kind, self.latency["default"])
+        with self._lock:
+            return latency.sample(rng or self._rng, output_bytes)
+
+    def resolve(self, serial: Optional[str]) -> Tuple[Optional[_DeviceState], Optional[str]]:
+        """Return the device a command targets, or the error adb prints instead."""
+        if serial is None:
+            connected = list(self._devices.values())
+            if not connected:
+                return None, "error: no devices/emulators found\n"
+            if len(connected) > 1:
+                return None, "error: more than one device/emulator\n"
+            state = connected[0]
+        else:
+            state = self._devices.get(serial)
+            if state is None:
+                return None, f"error: device '{serial}' not found\n"
+        if state.device.state != "device":
+            return None, f"error: device {state.device.state}\n"
+        return state, None
+
+    def shell(self, serial: Optional[str], line: str) -> FakeReply:
+        """Run a device shell command line."""
+        state, error = self.resolve(serial)
+        if state is None:
+            return FakeReply(1, error, self._sample("devices"))
+        with self._lock:
+            draw = state.rng.random()
+            if draw < self.scenario.timeout_rate:
+                return FakeReply(1, "", math.inf)
+            if draw < self.scenario.timeout_rate + self.scenario.failure_rate:
+                return FakeReply(1, "error: closed\n", state.rng.uniform(0.0, 0.05), transport_error=True)
+            returncode, stdout, kind, busy = self._run_line(state, line)
+            self.command_counts[kind] = self.command_counts.get(kind, 0) + 1
+        return FakeReply(returncode, stdout, self._sample(kind, len(stdout), state.rng) + busy)
+
+    def _run_line(self, state: _DeviceState, line: str) -> Tuple[int, str, str, float]:
+        """Interpret ``a | b; c`` lines. Returns (status, stdout, kind, extra seconds). Lock held."""
+        lexer = shlex.shlex(line, posix=True, punctuation_chars=";|")
+        lexer.whitespace_split = True
+        tokens = list(lexer)
+        kind = tokens[0] if tokens else "default"
+        returncode, stdout, busy = 0, "", 0.0
+        for sequence in _split(tokens, ";"):
+            piped, output = "", ""
+            for argv in _split(sequence, "|"):
+                argv = [arg.replace("$?", str(returncode)) for arg in argv]
+                returncode, output, extra = self._program(state, argv, piped)
+                busy += extra
+                piped = output
+            stdout += output
+        return returncode, stdout, kind, busy
+
+    def _program(self, state: _DeviceState, argv: List[str], stdin: str) -> Tuple[int, str, float]:
+        program, args = argv[0], argv[1:]
+        device = state.device
+        if program == "echo":
+            return 0, " ".join(args) + "\n", 0.0
+        if program == "true":
+            return 0, "", 0.0
+        if program == "getprop":
+            props = {
+                "ro.product.model": device.model,
+                "ro.build.version.release": device.android_version,
+                "ro.serialno": device.serial,
+            }
+            if not args:
+                return 0, "".join(f"[{key}]: [{value}]\n" for key, value in props.items()), 0.0
+            return 0, props.get(args[0], "") + "\n", 0.0
+        if program == "pm" and args[:2] == ["list", "packages"]:
+            return 0, state.packages_output, 0.0
+        if program == "grep":
+            return _grep(args, stdin)
+        if program == "am" and args[:1] == ["start"]:
+            return self._am_start(state, args[1:])
+        if program == "dumpsys":
+            if args[:1] != ["notification"]:
+                return 0, "", 0.0
+            # "p <package>" limits the dump to one app's notifications
+            package = args[args.index("p") + 1] if "p" in args[:-1] else None
+            shade = "".join(n.block for n in reversed(state.visible(_now_ms()))
+                            if package is None or n.package == package)
+            return 0, f"Current Notification Manager state:\n  Notification List:\n{shade}", 0.0
+        if program == "logcat":
+            return 0, "", 0.0  # Streams are served by events()
+        return 127, f"/system/bin/sh: {program}: inaccessible or not found\n", 0.0
+
+    def _am_start(self, state: _DeviceState, args: List[str]) -> Tuple[int, str, float]:
+        wait = "-W" in args
+        uri = args[args.index("-d") + 1] if "-d" in args[:-1] else ""
+        intent = f"Intent {{ act=android.intent.action.VIEW dat={uri.split('?', 1)[0]}?... }}"
+        scheme = uri.split("://", 1)[0]
+        package = _SCHEME_PACKAGES.get(scheme)
+        if scheme == "upi":
+            # Generic UPI links open the first capable app; the chooser is not modelled
+            package = next((p for p in _LAUNCHABLE if p in state.device.packages), None)
+        if package is None or package not in state.device.packages:
+            return 0, f"Starting: {intent}\nError: Activity not started, unable to resolve {intent}\n", 0.0
+
+        device = state.device
+        cold = package not in state.running
+        state.running.add(package)
+        start_ms = device.cold_start_ms if cold else device.warm_start_ms
+        total_ms = int(start_ms * state.rng.uniform(0.85, 1.15))
+        wait_ms = total_ms + state.rng.randint(5, 30)
+        self._schedule_outcome(state, package, uri)
+        report = (
+            f"Starting: {intent}\nStatus: ok\nLaunchState: {'COLD' if cold else 'WARM'}\n"
+            f"Activity: {package}/.PaymentActivity\nTotalTime: {total_ms}\nWaitTime: {wait_ms}\nComplete\n"
+        )
+        return 0, report, wait_ms / 1000 if wait else 0.0
+
+    def _schedule_outcome(self, state: _DeviceState, package: str, uri: str):
+        device = state.device
+        if device.payment_delay is None:
+            return
+        query = parse_qs(urlsplit(uri).query)
+        payee = query.get("pa", ["the payee"])[0]
+        amount = query.get("am", ["0"])[0]
+        app = UPI_APP_PACKAGES.get(package, package)
+        if state.rng.random() < device.payment_failure_rate:
+            title, text = "Payment failed", f"Payment of ₹{amount} to {payee} failed. Any amount debited will be refunded"
+        else:
+            title, text = "Payment successful", f"₹{amount} paid to {payee} using {app}"
+        state.post(_now_ms() + int(device.payment_delay * 1000), package, title, text)
+
+    def events(self, serial: Optional[str], after_ms: int, until_ms: int) -> Tuple[List[str], Optional[int]]:
+        """Return ``notification_enqueue`` event-log lines posted in (after_ms, until_ms].
+
+        Also returns the post time of the next scheduled notification, if any.
+        """
+        state, _ = self.resolve(serial)
+        if state is None:
+            return [], None
+        with self._lock:
+            lines, upcoming = [], None
+            for notification in state.posted:
+                if notification.post_ms <= after_ms:
+                    continue
+                if notification.post_ms > until_ms:
+                    upcoming = notification.post_ms
+                    break
+                seconds, millis = divmod(notification.post_ms, 1000)
+                lines.append(
+                    f"{seconds}.{millis:03d}  1000  1521  1600 I notification_enqueue: "
+                    f"[{notification.uid},2113,{notification.package},{notification.notification_id},"
+                    f"NULL,0,Notification(channel=default),0]"
+                )
+        return lines, upcoming
+
+
+def _split(tokens: List[str], separator: str) -> List[List[str]]:
+    parts, current = [], []
+    for token in tokens:
+        if token == separator:
+            if current:
+                parts.append(current)
+            current = []
+        else:
+            current.append(token)
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _grep(args: List[str], stdin: str) -> Tuple[int, str, float]:
+    """The ``grep -F -x -e PATTERN`` subset used on devices."""
+    patterns, whole_line, index = [], False, 0
+    while index < len(args):
+        arg = args[index]
+        if arg == "-e" and index + 1 < len(args):
+            patterns.append(args[index + 1])
+            index += 1
+        elif arg == "-x":
+            whole_line = True
+        elif not arg.startswith("-"):
+            patterns.append(arg)
+        index += 1
+    matched = [
+        line for line in stdin.splitlines()
+        if any(line == p if whole_line else p in line for p in patterns)
+    ]
+    return (0 if matched else 1), "".join(f"{line}\n" for line in matched), 0.0
+
+
+class FakeDeviceCommands(DeviceCommands):
+    """``DeviceCommands`` answered by a ``FakeAdb`` instead of adb processes.
+
+    Commands still go through the real timeout, metrics and tracing
+    wrappers; simulated latency is slept on the event loop. With a
+    ``FakeAdbPool`` shell commands take the pooled path instead.
+    """
+
+    def __init__(self, fake: FakeAdb, pool: Optional[AdbConnectionPool] = None,
+                 default_timeout: float = 10.0, stream_poll_interval: float = 0.25):
+        super().__init__(pool, default_timeout=default_timeout)
+        self.fake = fake
+        self.stream_poll_interval = stream_poll_interval
+
+    @staticmethod
+    def _split_argv(argv: List[str]) -> Tuple[Optional[str], List[str]]:
+        args = argv[1:]
+        if args[:1] == ["-s"]:
+            return args[1], args[2:]
+        return None, args
+
+    async def _exec(self, argv: List[str], timeout: Optional[float], serial: str = "") -> AdbResult:
+        timeout = timeout or self.default_timeout
+        target, args = self._split_argv(argv)
+        reply = self.fake.execute(args, target)
+        if reply.delay > timeout:
+            await asyncio.sleep(timeout)
+            raise DeviceCommandTimeout(f"{' '.join(argv[1:])} timed out after {timeout}s")
+        await asyncio.sleep(reply.delay)
+        return AdbResult(reply.returncode, reply.stdout, serial)
+
+    async def stream(self, command: Command, serial: Optional[str] = None,
+                     timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Yield the device's notification events from now on, as ``logcat`` would."""
+        line = build_shell_command(command)
+        state, error = self.fake.resolve(serial)
+        if state is None or not line.startswith("logcat"):
+            # adb prints the error and exits; other programs are not streamed
+            if error:
+                yield error.rstrip("\n")
+            return
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout else None
+        after_ms = _now_ms()
+        while True:
+            now_ms = _now_ms()
+            lines, upcoming = self.fake.events(serial, after_ms, now_ms)
+            after_ms = now_ms
+            for event in lines:
+                yield event
+            # Wake for the next scheduled post, or poll for ones a launch adds meanwhile
+            wait = self.stream_poll_interval
+            if upcoming is not None:
+                wait = min(wait, max(0.0, (upcoming - now_ms) / 1000))
+            if deadline is not None:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise DeviceCommandTimeout(f"Stream timed out after {timeout}s")
+                wait = min(wait, remaining)
+            await asyncio.sleep(wait)
+
+
+class _FakeTransport:
+    """Pooled transport to a simulated phone; blocks its worker thread like a real one."""
+
+    def __init__(self, fake: FakeAdb, serial: str):
+        self._fake = fake
+        self._serial = serial
+
+    def shell(self, command: str, timeout: float, call=None) -> str:
+        reply = self._fake.shell(self._serial, command)
+        # An interrupted command returns as soon as its socket is closed
+        interrupted = call.cancelled if call is not None else threading.Event()
+        if reply.delay > timeout:
+            if not interrupted.wait(timeout):
+                raise TimeoutError(f"No reply from {self._serial} within {timeout}s")
+        else:
+            interrupted.wait(reply.delay)
+        if interrupted.is_set():
+            raise ConnectionResetError(f"Connection to {self._serial} closed")
+        if reply.transport_error:
+            raise ConnectionResetError(reply.stdout.strip())
+        return reply.stdout
+
+    def close(self):
+        pass
+
+
+class FakeAdbPool(AdbConnectionPool):
+    """``AdbConnectionPool`` whose connections lead to ``FakeAdb`` phones.
+
+    Connection reuse, health checks, reconnect backoff and the worker
+    threads are the real pool's.
+    """
+
+    def __init__(self, fake: FakeAdb, **kwargs):
+        super().__init__(**kwargs)
+        self.fake = fake
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    def list_devices(self) -> List[str]:
+        self.fake.tally("devices")
+        serials = self.fake.serials()
+        if not serials:
+            raise AdbUnavailableError("No authorized Android device is reachable")
+        return serials
+
+    def _open_transport(self, serial: str):
+        if serial not in self.fake.serials():
+            raise AdbUnavailableError(f"Device {serial} is not connected")
+        return _FakeTransport(self.fake, serial)
+
+
+def fake_device_commands(spec: str, pooled: bool = True, streams_per_device: int = 4,
+                         default_timeout: float = 10.0) -> FakeDeviceCommands:
+    """Build a command layer for the scenario ``spec`` (``lab:N`` or a JSON file)."""
+    fake = FakeAdb(load_scenario(spec))
+    pool = (FakeAdbPool(fake, command_timeout=default_timeout, streams_per_device=streams_per_device)
+            if pooled else None)
+    logger.info(f"Simulating {len(fake.scenario.devices)} Android device(s) from {spec}")
+    return FakeDeviceCommands(fake, pool, default_timeout=default_timeout)
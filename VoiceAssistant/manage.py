@@ -111,10 +111,14 @@ def clear_sensitive_data():
     """Clear all sensitive data from VoicePay memory."""
     print("Clearing sensitive data from VoicePay memory...")
     try:
-        from memory_manager import VoicePayMemoryManager
-        memory_manager = VoicePayMemoryManager()
-        result = memory_manager.clear_sensitive_data()
-        print(f"✅ {result}")
+        from memory_manager import open_configured_store
+        from user_stores import iter_store_dirs
+        # The shared store plus every per-user store
+        for store_dir in iter_store_dirs('voicepay_memory'):
+            memory_manager = open_configured_store(store_dir)
+            result = memory_manager.clear_sensitive_data()
+            memory_manager.close()
+            print(f"✅ {store_dir}: {result}")
     except Exception as e:
         print(f"❌ Error clearing sensitive data: {e}")
 
@@ -123,7 +127,7 @@ def run_security_audit():
     print("Running VoicePay security audit...")
     
     # Check file permissions
-    sensitive_files = ['.env', 'voicepay_memory/memories.json']
+    sensitive_files = ['.env', 'voicepay_memory/memories.db', 'voicepay_memory/memories.json']
     for file_path in sensitive_files:
         if os.path.exists(file_path):
             # On Windows, this is a basic check
@@ -131,10 +135,14 @@ def run_security_audit():
     
     # Check memory manager
     try:
-        from memory_manager import VoicePayMemoryManager
-        memory_manager = VoicePayMemoryManager()
-        memories = memory_manager.get_memories(include_sensitive=True)
-        sensitive_count = sum(1 for m in memories if m.sensitive)
+        from memory_manager import open_configured_store
+        from user_stores import iter_store_dirs
+        sensitive_count = 0
+        for store_dir in iter_store_dirs('voicepay_memory'):
+            memory_manager = open_configured_store(store_dir)
+            memories = memory_manager.get_memories(include_sensitive=True)
+            sensitive_count += sum(1 for m in memories if m.sensitive)
+            memory_manager.close()
         print(f"ℹ️  Found {sensitive_count} sensitive items in memory")
         
         if sensitive_count > 10:
@@ -154,12 +162,30 @@ def start_voicepay():
     except KeyboardInterrupt:
         print("\n👋 VoicePay stopped by user.")
 
+def run_benchmarks(full=False, output=None, save_baseline=False, threshold=None):
+    """Run the benchmark suite and compare it with the stored baseline."""
+    print("Running VoicePay benchmarks...")
+    from benchmarks import suite
+    return suite.run_and_report(
+        full=full,
+        output=output,
+        save_baseline=save_baseline,
+        threshold=suite.DEFAULT_THRESHOLD if threshold is None else threshold,
+    )
+
 def main():
     """Main entry point for the management script."""
     parser = argparse.ArgumentParser(description='VoicePay UPI Assistant Management')
     parser.add_argument('command', choices=[
-        'check', 'setup', 'start', 'clear-data', 'security-audit'
+        'check', 'setup', 'start', 'clear-data', 'security-audit', 'bench'
     ], help='Command to execute')
+    parser.add_argument('--full', action='store_true',
+                        help='bench: include the 1M-record memory store (needs ~5 GB RAM)')
+    parser.add_argument('--output', help='bench: write the results as JSON to this path')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='bench: store the results as the new baseline')
+    parser.add_argument('--threshold', type=float,
+                        help='bench: relative slowdown that counts as a regression (default 0.5)')
     
     args = parser.parse_args()
     
@@ -194,6 +220,13 @@ def main():
             
     elif args.command == 'security-audit':
         run_security_audit()
+        
+    elif args.command == 'bench':
+        status = run_benchmarks(args.full, args.output, args.save_baseline, args.threshold)
+        if status:
+            print("❌ Benchmarks regressed against the baseline.")
+            sys.exit(status)
+        print("\n✅ Benchmarks completed!")
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,425 @@
+"""
+Storage backends for the VoicePay memory manager.
+
+A backend persists memory records and replays them on start-up. The memory
+manager keeps its own in-memory indexes for reads, so backends only need to
+apply appends and targeted removals durably:
+
+- ``JournalBackend``: snapshot file plus append-only JSONL journal. Fast
+  and dependency-free, but meant for a single process.
+- ``SQLiteBackend``: SQLite database in WAL mode. Several worker processes
+  and the management CLI can share one store; readers never block writers
+  and removals only touch the rows they name. A journal store left in the
+  same directory is imported on first open and its files removed.
+"""
+import os
+import json
+import sqlite3
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend(ABC):
+    """Interface implemented by memory storage backends.
+
+    Records passed to ``append``/``remove`` are ``VoicePayMemory`` objects;
+    ``load`` builds them with the record type's ``from_dict`` or its
+    ``from_row`` fast path.
+    """
+
+    @abstractmethod
+    def load(self, record_type: Any) -> List[Any]:
+        """Return all stored records, oldest first."""
+
+    @abstractmethod
+    def append(self, memories: List[Any]):
+        """Durably add a batch of records."""
+
+    @abstractmethod
+    def remove(self, memories: List[Any], purge: bool = False):
+        """Remove records; ``purge`` also scrubs them from on-disk logs."""
+
+    def changed_elsewhere(self) -> bool:
+        """True if another process changed the store since the last check or load."""
+        return False
+
+    def changes(self, record_type: Any) -> Optional[Tuple[List[Any], List[str]]]:
+        """Records added and ids removed since the last load or call.
+
+        ``None`` means the changes are not known and the caller must
+        ``load`` the whole store again.
+        """
+        return None
+
+    def close(self):
+        """Release files and connections."""
+
+
+class JournalBackend(MemoryBackend):
+    """Snapshot (``memories.json``) plus append-only journal backend.
+
+    Each mutation is a single journal line; the journal is folded into the
+    snapshot by a background compaction once it grows past
+    ``compact_every`` entries. Replay is idempotent (adds are keyed by
+    memory id), and a partially written trailing line is skipped.
+    """
+
+    SNAPSHOT_FILE = "memories.json"
+    JOURNAL_FILE = "memories.journal.jsonl"
+
+    def __init__(self, memory_dir: str, compact_every: int = 500):
+        self.memory_dir = memory_dir
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self._compaction_lock = threading.Lock()
+        self._records: Dict[str, Any] = {}  # memory_id -> record, in insertion order
+        self._journal = None
+        self._journal_entries = 0
+        self._compaction_thread: Optional[threading.Thread] = None
+        self._compaction_pending = False
+
+    @property
+    def _snapshot_path(self) -> str:
+        return os.path.join(self.memory_dir, self.SNAPSHOT_FILE)
+
+    @property
+    def _journal_path(self) -> str:
+        return os.path.join(self.memory_dir, self.JOURNAL_FILE)
+
+    @property
+    def _compacting_path(self) -> str:
+        # Journal segment being folded into the snapshot by a compaction
+        return self._journal_path + ".compacting"
+
+    @property
+    def paths(self) -> List[str]:
+        """Every file the backend may have written."""
+        return [self._snapshot_path, self._journal_path, self._compacting_path, self._snapshot_path + ".tmp"]
+
+    def load(self, record_type: Any) -> List[Any]:
+        """Load the snapshot and replay journal entries written after it."""
+        records: Dict[str, Any] = {}
+        if os.path.exists(self._snapshot_path):
+            with open(self._snapshot_path, 'r') as f:
+                data = json.load(f)
+            # Snapshots wrap the records in an object; older releases stored a bare list
+            if isinstance(data, dict):
+                data = data.get("memories", [])
+            for item in data:
+                memory = record_type.from_dict(item)
+                records[memory.memory_id] = memory
+
+        # A crash mid-compaction leaves the rotated segment behind; replay it first
+        for path in (self._compacting_path, self._journal_path):
+            self._replay_journal(path, records, record_type)
+
+        with self._lock:
+            self._records = records
+        return list(records.values())
+
+    def _replay_journal(self, path: str, records: Dict[str, Any], record_type: Any):
+        """Apply journal entries to ``records``, skipping a torn tail."""
+        if not os.path.exists(path):
+            return
+        with open(path, 'r') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Only the last line can be partially written by a crash
+                    logger.warning(f"Skipping corrupt journal entry at {path}:{line_number}")
+                    continue
+                if entry.get("op") == "add":
+                    memory = record_type.from_dict(entry["memory"])
+                    records.setdefault(memory.memory_id, memory)
+                elif entry.get("op") == "remove":
+                    for memory_id in entry.get("ids", []):
+                        records.pop(memory_id, None)
+                self._journal_entries += 1
+
+    def _write_entries(self, entries: List[Dict[str, Any]]):
+        """Append journal entries with a single write and flush. Lock held."""
+        if self._journal is None:
+            self._journal = open(self._journal_path, 'a')
+        self._journal.write("".join(
+            json.dumps(entry, separators=(',', ':')) + "\n" for entry in entries
+        ))
+        self._journal.flush()
+        self._journal_entries += len(entries)
+
+    def append(self, memories: List[Any]):
+        with self._lock:
+            for memory in memories:
+                self._records[memory.memory_id] = memory
+            self._write_entries([{"op": "add", "memory": m.to_dict()} for m in memories])
+            needs_compaction = self._journal_entries >= self.compact_every
+        if needs_compaction:
+            self._schedule_compaction()
+
+    def remove(self, memories: List[Any], purge: bool = False):
+        with self._lock:
+            ids = [m.memory_id for m in memories if self._records.pop(m.memory_id, None) is not None]
+            if ids:
+                self._write_entries([{"op": "remove", "ids": ids}])
+            needs_compaction = self._journal_entries >= self.compact_every
+        if purge:
+            # Removed content must not survive in the journal or old snapshot
+            self.compact()
+        elif needs_compaction:
+            self._schedule_compaction()
+
+    def _schedule_compaction(self):
+        """Fold the journal into the snapshot on a background thread."""
+        with self._lock:
+            # A request arriving mid-compaction is picked up by the running thread
+            self._compaction_pending = True
+            if self._compaction_thread is not None:
+                return
+            self._compaction_thread = threading.Thread(
+                target=self._compaction_loop, name="voicepay-memory-compaction", daemon=True
+            )
+            self._compaction_thread.start()
+
+    def _compaction_loop(self):
+        """Run compactions until no further request is pending."""
+        while True:
+            with self._lock:
+                if not self._compaction_pending:
+                    self._compaction_thread = None
+                    return
+                self._compaction_pending = False
+            self.compact()
+
+    def compact(self):
+        """Write a snapshot of all records and truncate the journal.
+
+        The live journal is rotated aside and the records copied under the
+        same lock, so the rotated segment is fully covered by the snapshot.
+        The segment is only removed once the snapshot is atomically in
+        place, so a crash at any point replays to the same state.
+        """
+        try:
+            with self._compaction_lock:
+                with self._lock:
+                    if self._journal is not None:
+                        self._journal.close()
+                        self._journal = None
+                    if os.path.exists(self._journal_path):
+                        os.replace(self._journal_path, self._compacting_path)
+                    self._journal_entries = 0
+                    records = list(self._records.values())
+
+                tmp_path = self._snapshot_path + ".tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump({"memories": [m.to_dict() for m in records]}, f, separators=(',', ':'))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self._snapshot_path)
+
+                if os.path.exists(self._compacting_path):
+                    os.remove(self._compacting_path)
+        except Exception as e:
+            logger.error(f"Error compacting memory journal: {e}")
+
+    def close(self):
+        compaction_thread = self._compaction_thread
+        if compaction_thread is not None:
+            compaction_thread.join()
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+
+class SQLiteBackend(MemoryBackend):
+    """SQLite (WAL mode) backend shared safely across processes.
+
+    Statements are fixed SQL strings, so the ``sqlite3`` statement cache
+    prepares each of them once per connection.
+
+    Records of a ``JournalBackend`` store in the same directory are imported
+    by the first ``load`` and the journal files deleted, so sensitive data
+    in them is expired and cleared like any other record. The import is
+    marked done in the same transaction as the rows, so a crash before the
+    files are deleted cannot import them twice.
+
+    Triggers log the id of every inserted and deleted row to a ``changes``
+    table, so a store that sees another process's commit reads only what
+    changed since its last check. The log keeps the latest
+    ``CHANGE_LOG_SIZE`` entries; a reader that fell further behind loads
+    the whole store again.
+    """
+
+    DATABASE_FILE = "memories.db"
+    CHANGE_LOG_SIZE = 10000
+
+    _SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS memories (
+            memory_id TEXT PRIMARY KEY,
+            timestamp TEXT NOT NULL,
+            type TEXT NOT NULL,
+            sensitive INTEGER NOT NULL DEFAULT 0,
+            content TEXT NOT NULL,
+            metadata TEXT
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_memories_type_timestamp ON memories (type, timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_memories_timestamp ON memories (timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_memories_sensitive_timestamp ON memories (sensitive, timestamp)",
+        "CREATE TABLE IF NOT EXISTS imports (source TEXT PRIMARY KEY)",
+        # Ids only: cleared content must not survive in the change log
+        """CREATE TABLE IF NOT EXISTS changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            memory_id TEXT NOT NULL,
+            removed INTEGER NOT NULL
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS memories_added AFTER INSERT ON memories BEGIN
+            INSERT INTO changes (memory_id, removed) VALUES (NEW.memory_id, 0);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS memories_removed AFTER DELETE ON memories BEGIN
+            INSERT INTO changes (memory_id, removed) VALUES (OLD.memory_id, 1);
+        END""",
+    )
+    _INSERT = ("INSERT OR IGNORE INTO memories (memory_id, timestamp, type, sensitive, content, metadata) "
+               "VALUES (?, ?, ?, ?, ?, ?)")
+    _DELETE = "DELETE FROM memories WHERE memory_id = ?"
+    _SELECT_ALL = ("SELECT memory_id, timestamp, type, sensitive, content, metadata "
+                   "FROM memories ORDER BY timestamp")
+    _SELECT_ONE = ("SELECT memory_id, timestamp, type, sensitive, content, metadata "
+                   "FROM memories WHERE memory_id = ?")
+    _LAST_CHANGE = "SELECT COALESCE(MAX(seq), 0) FROM changes"
+    _SELECT_CHANGES = "SELECT seq, memory_id, removed FROM changes WHERE seq > ? ORDER BY seq"
+    _TRIM_CHANGES = "DELETE FROM changes WHERE seq <= (SELECT MAX(seq) FROM changes) - ?"
+
+    def __init__(self, memory_dir: str, timeout: float = 5.0):
+        self.memory_dir = memory_dir
+        self.path = os.path.join(memory_dir, self.DATABASE_FILE)
+        self._lock = threading.Lock()
+        self._data_version: Optional[int] = None  # Changes when another connection commits
+        self._change_seq: Optional[int] = None  # Last change-log entry this backend has read
+        # The write-behind thread and the caller may both use the connection
+        self._conn = sqlite3.connect(self.path, timeout=timeout, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA secure_delete=ON")
+        with self._conn:
+            for statement in self._SCHEMA:
+                self._conn.execute(statement)
+
+    def load(self, record_type: Any) -> List[Any]:
+        self._import_journal(record_type)
+        with self._lock:
+            # One read transaction, so the rows and the change-log position agree
+            self._conn.execute("BEGIN")
+            try:
+                rows = self._conn.execute(self._SELECT_ALL).fetchall()
+                self._change_seq = self._conn.execute(self._LAST_CHANGE).fetchone()[0]
+                self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            finally:
+                self._conn.commit()
+        from_row = record_type.from_row
+        return [from_row(*row) for row in rows]
+
+    def _import_journal(self, record_type: Any):
+        """Move the records of a journal store in this directory into the database."""
+        journal = JournalBackend(self.memory_dir)
+        if not any(os.path.exists(path) for path in journal.paths):
+            return
+        with self._lock:
+            # Taking the write lock up front makes concurrent importers queue here
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                imported = self._conn.execute(
+                    "SELECT 1 FROM imports WHERE source = 'journal'").fetchone() is not None
+                if not imported:
+                    records = journal.load(record_type)
+                    self._conn.executemany(self._INSERT, [self._row(m) for m in records])
+                    self._conn.execute("INSERT INTO imports (source) VALUES ('journal')")
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+        if not imported:
+            logger.info(f"Imported {len(records)} memories from the journal store in {self.memory_dir}")
+        for path in journal.paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Already removed by another store importing concurrently
+                pass
+        with self._lock, self._conn:
+            # A journal store written later, e.g. after switching back, is imported again
+            self._conn.execute("DELETE FROM imports WHERE source = 'journal'")
+
+    def changed_elsewhere(self) -> bool:
+        # Commits on this connection, including the write-behind thread's, leave it unchanged
+        with self._lock:
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        changed = self._data_version is not None and version != self._data_version
+        self._data_version = version
+        return changed
+
+    def changes(self, record_type: Any) -> Optional[Tuple[List[Any], List[str]]]:
+        """Read the change log past this backend's last position."""
+        if self._change_seq is None:
+            return None
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                entries = self._conn.execute(self._SELECT_CHANGES, (self._change_seq,)).fetchall()
+                if entries and entries[0][0] != self._change_seq + 1:
+                    # Entries this backend has not read were trimmed
+                    self._change_seq = None
+                    return None
+                latest: Dict[str, bool] = {}
+                for _, memory_id, removed in entries:
+                    latest.pop(memory_id, None)
+                    latest[memory_id] = bool(removed)
+                rows = [self._conn.execute(self._SELECT_ONE, (memory_id,)).fetchone()
+                        for memory_id, removed in latest.items() if not removed]
+                if entries:
+                    self._change_seq = entries[-1][0]
+            finally:
+                self._conn.commit()
+        from_row = record_type.from_row
+        added = [from_row(*row) for row in rows if row is not None]
+        return added, [memory_id for memory_id, removed in latest.items() if removed]
+
+    @staticmethod
+    def _row(memory: Any) -> tuple:
+        return (memory.memory_id, memory.sort_key, memory.type, int(memory.sensitive),
+                memory.content, memory.metadata_json)
+
+    def append(self, memories: List[Any]):
+        rows = [self._row(m) for m in memories]
+        with self._lock, self._conn:
+            self._conn.executemany(self._INSERT, rows)
+            self._conn.execute(self._TRIM_CHANGES, (self.CHANGE_LOG_SIZE,))
+
+    def remove(self, memories: List[Any], purge: bool = False):
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(self._DELETE, [(m.memory_id,) for m in memories])
+                self._conn.execute(self._TRIM_CHANGES, (self.CHANGE_LOG_SIZE,))
+            if purge:
+                # Fold the WAL back into the database so deleted pages are overwritten
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_backend(name: str, memory_dir: str, compact_every: int = 500) -> MemoryBackend:
+    """Build a backend by name (``"journal"`` or ``"sqlite"``)."""
+    if name == "journal":
+        return JournalBackend(memory_dir, compact_every=compact_every)
+    if name == "sqlite":
+        return SQLiteBackend(memory_dir)
+    raise ValueError(f"Unknown memory backend: {name}")
@@ -2,91 +2,696 @@
 Memory management for the VoicePay UPI Assistant with enhanced security.
 """
 import os
+import re
+import asyncio
 import json
+import heapq
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, asdict
+import queue
+import atexit
+import threading
+import sys
+import time
+import uuid
+import itertools
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Any, Tuple, Union
+from memory_backends import MemoryBackend, create_backend
+from metrics import timed
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Control markers for the write-behind queue
+_FLUSH = object()
+_STOP = object()
+
+@lru_cache(maxsize=4096)
+def _hour_epoch(hour: str) -> float:
+    return datetime.fromisoformat(hour + ":00").timestamp()
+
+def _sort_key_epoch(sort_key: str) -> float:
+    """Epoch seconds of a ``sort_key`` without building a ``datetime`` per record.
+    
+    Keys written by ``isoformat`` share their hour prefix with many others,
+    so only the hour is converted (and cached); minutes and seconds are
+    added arithmetically. Other ISO-8601 forms fall back to a full parse.
+    """
+    try:
+        if sort_key[13] == ":" and sort_key[16] == ":":
+            return _hour_epoch(sort_key[:13]) + int(sort_key[14:16]) * 60 + float(sort_key[17:])
+    except (IndexError, ValueError):
+        pass
+    return datetime.fromisoformat(sort_key).timestamp()
+
 class VoicePayMemory:
-    """Represents a memory item for VoicePay with security considerations."""
-    content: str
-    timestamp: datetime
-    type: str  # 'app_detection', 'transaction_guidance', 'security_action', 'user_interaction'
-    metadata: Optional[Dict[str, Any]] = None
-    sensitive: bool = False  # Flag for sensitive data that should be cleared
+    """Represents a memory item for VoicePay with security considerations.
+    
+    Records are slotted to keep per-record overhead low, and type names are
+    interned. The timestamp is held as its ISO-8601 string (``sort_key``),
+    which orders chronologically, and is only parsed into a ``datetime``
+    when first read; metadata loaded from storage stays JSON-encoded until
+    accessed.
+    """
+    
+    __slots__ = ("content", "type", "sensitive", "memory_id", "sort_key",
+                 "_timestamp", "_metadata", "_metadata_json")
+    
+    def __init__(self, content: str, timestamp: Union[datetime, str], type: str,
+                 metadata: Optional[Dict[str, Any]] = None, sensitive: bool = False,
+                 memory_id: Optional[str] = None):
+        self.content = content
+        self.type = sys.intern(type)  # 'app_detection', 'transaction_guidance', 'security_action', 'user_interaction'
+        self.sensitive = sensitive  # Flag for sensitive data that should be cleared
+        self.memory_id = memory_id or uuid.uuid4().hex
+        if isinstance(timestamp, datetime):
+            self._timestamp = timestamp
+            self.sort_key = timestamp.isoformat(timespec='microseconds')
+        else:
+            self._timestamp = None
+            self.sort_key = timestamp
+        self._metadata = metadata
+        self._metadata_json = None
+    
+    @property
+    def timestamp(self) -> datetime:
+        if self._timestamp is None:
+            self._timestamp = datetime.fromisoformat(self.sort_key)
+        return self._timestamp
+    
+    @property
+    def metadata(self) -> Optional[Dict[str, Any]]:
+        if self._metadata_json is not None:
+            self._metadata = json.loads(self._metadata_json)
+            self._metadata_json = None
+        return self._metadata
+    
+    @metadata.setter
+    def metadata(self, value: Optional[Dict[str, Any]]):
+        self._metadata = value
+        self._metadata_json = None
+    
+    @property
+    def metadata_json(self) -> str:
+        """Metadata encoded as JSON, without decoding it if still encoded."""
+        if self._metadata_json is not None:
+            return self._metadata_json
+        return json.dumps(self._metadata or {})
+    
+    def __repr__(self) -> str:
+        return (f"VoicePayMemory(content={self.content!r}, timestamp={self.sort_key!r}, "
+                f"type={self.type!r}, sensitive={self.sensitive!r})")
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert memory to dictionary."""
-        data = asdict(self)
-        data['timestamp'] = self.timestamp.isoformat()
-        return data
+        return {
+            'content': self.content,
+            'timestamp': self.sort_key,
+            'type': self.type,
+            'metadata': self.metadata,
+            'sensitive': self.sensitive,
+            'memory_id': self.memory_id,
+        }
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'VoicePayMemory':
         """Create memory from dictionary."""
-        data['timestamp'] = datetime.fromisoformat(data['timestamp'])
-        return cls(**data)
+        return cls(data['content'], data['timestamp'], data['type'], data.get('metadata'),
+                   data.get('sensitive', False), data.get('memory_id'))
+    
+    @classmethod
+    def from_row(cls, memory_id: str, timestamp: str, memory_type: str, sensitive: int,
+                 content: str, metadata_json: Optional[str]) -> 'VoicePayMemory':
+        """Fast path for storage rows: no parsing, metadata left encoded."""
+        memory = cls.__new__(cls)
+        memory.content = content
+        memory.type = sys.intern(memory_type)
+        memory.sensitive = bool(sensitive)
+        memory.memory_id = memory_id
+        memory.sort_key = timestamp
+        memory._timestamp = None
+        memory._metadata = None
+        memory._metadata_json = metadata_json or None
+        return memory
+
+class _TimeIndex:
+    """Timestamp-ordered list of memories supporting O(N) "latest N" reads.
+    
+    Memories almost always arrive in timestamp order, so inserts are
+    amortised O(1) appends with a bisect fallback for out-of-order records.
+    """
+    
+    __slots__ = ("_keys", "_items")
+    
+    def __init__(self):
+        self._keys: List[str] = []
+        self._items: List[VoicePayMemory] = []
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    def insert(self, memory: VoicePayMemory):
+        key = memory.sort_key
+        if not self._keys or key >= self._keys[-1]:
+            self._keys.append(key)
+            self._items.append(memory)
+        else:
+            position = bisect_right(self._keys, key)
+            self._keys.insert(position, key)
+            self._items.insert(position, memory)
+    
+    def remove(self, memory: VoicePayMemory) -> bool:
+        key = memory.sort_key
+        position = bisect_left(self._keys, key)
+        while position < len(self._keys) and self._keys[position] == key:
+            if self._items[position] is memory:
+                del self._keys[position]
+                del self._items[position]
+                return True
+            position += 1
+        return False
+    
+    def discard_all(self, doomed: set):
+        """Remove every memory whose ``id()`` is in ``doomed``, in one pass."""
+        kept = [(key, memory) for key, memory in zip(self._keys, self._items) if id(memory) not in doomed]
+        self._keys = [key for key, _ in kept]
+        self._items = [memory for _, memory in kept]
+    
+    def latest(self, limit: int) -> List[VoicePayMemory]:
+        """Return up to ``limit`` memories, most recent first."""
+        if limit <= 0:
+            return []
+        return self._items[:-limit - 1:-1]
+
+
+class _SearchIndex:
+    """Incrementally maintained inverted index over memory content.
+    
+    Every memory gets a document id in insertion (and therefore timestamp)
+    order. Token postings support whole-word ranking; optional character
+    n-gram postings narrow substring queries to a handful of candidates,
+    which are then verified, preserving the original substring semantics.
+    Without n-grams, queries match on whole words only.
+    """
+    
+    _TOKEN_PATTERN = re.compile(r"\w+")
+    
+    def __init__(self, ngram_size: int = 3, use_ngrams: bool = True):
+        self.ngram_size = ngram_size
+        self.use_ngrams = use_ngrams
+        self._next_doc_id = 0
+        self._doc_ids: Dict[int, int] = {}  # id(memory) -> document id
+        self._docs: Dict[int, Tuple[VoicePayMemory, str, frozenset]] = {}
+        self._token_postings: Dict[str, Dict[int, None]] = {}
+        self._ngram_postings: Dict[str, Dict[int, None]] = {}
+    
+    def _tokens(self, text: str) -> frozenset:
+        return frozenset(self._TOKEN_PATTERN.findall(text))
+    
+    def _ngrams(self, text: str) -> set:
+        n = self.ngram_size
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+    
+    def add(self, memory: VoicePayMemory):
+        doc_id = self._next_doc_id
+        self._next_doc_id += 1
+        content = memory.content.lower()
+        tokens = self._tokens(content)
+        self._doc_ids[id(memory)] = doc_id
+        self._docs[doc_id] = (memory, content, tokens)
+        for token in tokens:
+            self._token_postings.setdefault(token, {})[doc_id] = None
+        if self.use_ngrams:
+            for gram in self._ngrams(content):
+                self._ngram_postings.setdefault(gram, {})[doc_id] = None
+    
+    def remove(self, memory: VoicePayMemory):
+        doc_id = self._doc_ids.pop(id(memory), None)
+        if doc_id is None:
+            return
+        _, content, tokens = self._docs.pop(doc_id)
+        self._discard(self._token_postings, tokens, doc_id)
+        if self.use_ngrams:
+            self._discard(self._ngram_postings, self._ngrams(content), doc_id)
+    
+    @staticmethod
+    def _discard(postings: Dict[str, Dict[int, None]], keys, doc_id: int):
+        for key in keys:
+            posting = postings.get(key)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del postings[key]
+    
+    @staticmethod
+    def _iter_intersection(postings: List[Dict[int, None]]):
+        """Yield document ids present in every posting, most recent first."""
+        postings = sorted(postings, key=len)
+        smallest, rest = postings[0], postings[1:]
+        for doc_id in reversed(smallest):
+            if all(doc_id in posting for posting in rest):
+                yield doc_id
+    
+    def search(self, query: str, limit: int, include_sensitive: bool = False) -> List[VoicePayMemory]:
+        """Return up to ``limit`` matches, most recent first.
+        
+        Memories containing every query word as a whole word rank ahead of
+        plain substring matches, so "Sam" prefers "Sam" over "Samantha".
+        Candidates are consumed lazily, stopping as soon as ``limit`` is met.
+        """
+        query = query.lower()
+        query_tokens = self._tokens(query)
+        verify = self.use_ngrams
+        results: List[VoicePayMemory] = []
+        seen = set()
+        
+        def collect(doc_ids):
+            for doc_id in doc_ids:
+                if len(results) >= limit:
+                    return
+                if doc_id in seen:
+                    continue
+                memory, content, _ = self._docs[doc_id]
+                if not include_sensitive and memory.sensitive:
+                    continue
+                if verify and query not in content:
+                    continue
+                seen.add(doc_id)
+                results.append(memory)
+        
+        token_postings = [self._token_postings.get(token) for token in query_tokens]
+        if token_postings and all(p is not None for p in token_postings):
+            collect(self._iter_intersection(token_postings))
+        
+        if self.use_ngrams:
+            if len(query) >= self.ngram_size:
+                ngram_postings = [self._ngram_postings.get(gram) for gram in self._ngrams(query)]
+                if all(p is not None for p in ngram_postings):
+                    collect(self._iter_intersection(ngram_postings))
+            else:
+                # Too short for n-grams: fall back to a recency-ordered scan
+                collect(reversed(self._docs))
+        
+        return results
+
+
+class MemoryWriter:
+    """Write-behind thread applying queued store mutations in batches.
+    
+    One writer can serve many stores, e.g. every per-user store of a worker,
+    so resident users do not each cost a thread. A batch is collected for
+    up to ``flush_interval`` seconds or ``max_batch_size`` entries; each
+    store's mutations are applied in the order they were queued. The thread
+    starts with the first mutation.
+    """
+    
+    def __init__(self, flush_interval: float = 0.5, max_batch_size: int = 64):
+        self.flush_interval = flush_interval
+        self.max_batch_size = max(1, max_batch_size)
+        self._queue: "queue.Queue[Tuple[Any, Any, Any, bool]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+    
+    def submit(self, store: "VoicePayMemoryManager", op: str, memories: List[VoicePayMemory], purge: bool):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="voicepay-memory-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+        self._queue.put((store, op, memories, purge))
+    
+    def flush(self):
+        """Block until every mutation queued so far has been applied."""
+        if not self.running:
+            return
+        done = threading.Event()
+        self._queue.put((None, _FLUSH, done, False))
+        done.wait()
+    
+    def close(self):
+        """Apply queued mutations and stop the thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put((None, _STOP, None, False))
+            thread.join()
+            atexit.unregister(self.close)
+    
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while batch[-1][1] not in (_FLUSH, _STOP) and len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            ops_by_store: Dict[int, Tuple[Any, list]] = {}
+            for store, op, memories, purge in batch:
+                if store is not None:
+                    ops_by_store.setdefault(id(store), (store, []))[1].append((op, memories, purge))
+            for store, ops in ops_by_store.values():
+                store._apply_ops(ops)
+            
+            marker, argument = batch[-1][1], batch[-1][2]
+            if marker is _FLUSH:
+                argument.set()
+            elif marker is _STOP:
+                return
+
 
 class VoicePayMemoryManager:
-    """Enhanced memory management for VoicePay with security focus."""
+    """Enhanced memory management for VoicePay with security focus.
+    
+    Reads are served from in-memory indexes; persistence is delegated to a
+    ``MemoryBackend`` (``"sqlite"`` by default, or ``"journal"``, or a
+    backend instance), see ``memory_backends``. Before each read the
+    backend is asked whether another process changed the store, e.g.
+    ``manage.py clear-data`` or a second worker, and the indexes are then
+    brought in line with the stored records.
+    
+    With ``write_behind`` enabled, mutations are queued and applied by a
+    background ``MemoryWriter`` in batches of up to ``max_batch_size``
+    entries, at most ``flush_interval`` seconds after they were queued.
+    Pass ``writer`` to share one writer thread between stores. Call
+    ``flush()`` to force pending writes to disk and ``close()`` on shutdown.
     
-    def __init__(self, memory_dir: str = "voicepay_memory"):
+    Sensitive memories expire ``sensitive_ttl`` seconds after creation, and
+    any type listed in ``type_ttls`` after its own TTL. Deadlines live in a
+    min-heap, so each expiry costs O(log n); ``start_expiry_task()`` removes
+    records at their deadlines from an asyncio task.
+    """
+    
+    def __init__(self, memory_dir: str = "voicepay_memory", compact_every: int = 500,
+                 write_behind: bool = False, flush_interval: float = 0.5,
+                 max_batch_size: int = 64, ngram_search: bool = True,
+                 backend: Union[str, MemoryBackend] = "sqlite",
+                 sensitive_ttl: Optional[float] = 3600.0,
+                 type_ttls: Optional[Dict[str, float]] = None,
+                 writer: Optional[MemoryWriter] = None):
         self.memory_dir = memory_dir
-        self.memories: List[VoicePayMemory] = []
+        self._records: Dict[str, VoicePayMemory] = {}  # memory_id -> memory, insertion ordered
         self.session_start = datetime.now()
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
+        self.max_batch_size = max(1, max_batch_size)
+        self._lock = threading.RLock()  # Guards in-memory state and indexes
+        self._writer: Optional[MemoryWriter] = None
+        self._owns_writer = False
+        self._closed = False
+        # Timestamp-ordered indexes: all memories, non-sensitive only, and per type
+        self._index_all = _TimeIndex()
+        self._index_public = _TimeIndex()
+        self._index_by_type: Dict[str, _TimeIndex] = {}
+        self._index_public_by_type: Dict[str, _TimeIndex] = {}
+        self.ngram_search = ngram_search
+        self._search_index = _SearchIndex(use_ngrams=ngram_search)
+        self._resident_bytes = 0  # Running total behind estimated_bytes
+        # Expiry deadlines as a min-heap of (deadline, tie-breaker, memory)
+        self.sensitive_ttl = sensitive_ttl
+        self.type_ttls = dict(type_ttls or {})
+        self._expiry_heap: List[Tuple[float, int, VoicePayMemory]] = []
+        self._expiry_counter = itertools.count()
+        self._expiry_task: Optional["asyncio.Task[None]"] = None
+        self._expiry_wakeup: Optional[asyncio.Event] = None
+        self._expiry_loop: Optional[asyncio.AbstractEventLoop] = None
         self._ensure_memory_dir()
+        if isinstance(backend, str):
+            backend = create_backend(backend, memory_dir, compact_every=compact_every)
+        self.backend = backend
         self._load_memories()
         self._cleanup_old_sensitive_data()
+        
+        if self.write_behind:
+            self._owns_writer = writer is None
+            self._writer = writer or MemoryWriter(flush_interval, self.max_batch_size)
+            if self._owns_writer:
+                atexit.register(self.close)
+    
+    @property
+    def memories(self) -> List[VoicePayMemory]:
+        """All resident memories, in insertion order."""
+        with self._lock:
+            self._sync_with_backend()
+            return list(self._records.values())
     
     def _ensure_memory_dir(self):
         """Create memory directory if it doesn't exist."""
         os.makedirs(self.memory_dir, exist_ok=True)
     
     def _load_memories(self):
-        """Load existing memories from files."""
+        """Load existing memories from the storage backend."""
         try:
-            memory_file = os.path.join(self.memory_dir, "memories.json")
-            if os.path.exists(memory_file):
-                with open(memory_file, 'r') as f:
-                    data = json.load(f)
-                    self.memories = [VoicePayMemory.from_dict(mem) for mem in data]
-                logger.info(f"Loaded {len(self.memories)} VoicePay memories")
+            self._records = {m.memory_id: m for m in self.backend.load(VoicePayMemory)}
+            self._rebuild_indexes()
+            logger.info(f"Loaded {len(self._records)} VoicePay memories")
         except Exception as e:
             logger.error(f"Error loading memories: {e}")
-            self.memories = []
+            self._records = {}
+            self._rebuild_indexes()
     
-    def _save_memories(self):
-        """Save memories to file."""
+    def _sync_with_backend(self):
+        """Apply records added or removed by other processes. Lock held."""
         try:
-            memory_file = os.path.join(self.memory_dir, "memories.json")
-            with open(memory_file, 'w') as f:
-                json.dump([mem.to_dict() for mem in self.memories], f, indent=2)
+            if not self.backend.changed_elsewhere():
+                return
+            # Queued writes of this process must reach the store before it is re-read
+            self.flush()
+            changes = self.backend.changes(VoicePayMemory)
+            if changes is None:
+                # Changes unknown: re-read the whole store, O(records)
+                stored = {m.memory_id: m for m in self.backend.load(VoicePayMemory)}
+                removed = [m for memory_id, m in self._records.items() if memory_id not in stored]
+                added = [m for memory_id, m in stored.items() if memory_id not in self._records]
+            else:
+                added, removed_ids = changes
+                removed = [self._records[memory_id] for memory_id in removed_ids if memory_id in self._records]
+                added = [m for m in added if m.memory_id not in self._records]
         except Exception as e:
-            logger.error(f"Error saving memories: {e}")
+            logger.error(f"Error checking the memory store for changes: {e}")
+            return
+        for memory in removed:
+            del self._records[memory.memory_id]
+            self._unindex_memory(memory)
+        for memory in sorted(added, key=lambda m: m.sort_key):
+            self._records[memory.memory_id] = memory
+            self._index_memory(memory)
+        logger.info(f"Synced memory store: {len(added)} added and {len(removed)} removed elsewhere")
+    
+    def _index_memory(self, memory: VoicePayMemory):
+        """Add a memory to the timestamp-ordered indexes."""
+        self._index_all.insert(memory)
+        self._search_index.add(memory)
+        self._resident_bytes += self._record_bytes(memory)
+        self._index_by_type.setdefault(memory.type, _TimeIndex()).insert(memory)
+        if not memory.sensitive:
+            self._index_public.insert(memory)
+            self._index_public_by_type.setdefault(memory.type, _TimeIndex()).insert(memory)
+        self._schedule_expiry(memory)
+    
+    def _unindex_memory(self, memory: VoicePayMemory):
+        """Remove a single evicted memory from the indexes."""
+        self._index_all.remove(memory)
+        self._search_index.remove(memory)
+        self._resident_bytes -= self._record_bytes(memory)
+        type_index = self._index_by_type.get(memory.type)
+        if type_index is not None:
+            type_index.remove(memory)
+        if not memory.sensitive:
+            self._index_public.remove(memory)
+            public_type_index = self._index_public_by_type.get(memory.type)
+            if public_type_index is not None:
+                public_type_index.remove(memory)
+    
+    def _evict(self, evicted: List[VoicePayMemory]):
+        """Drop a batch of memories from the records and indexes. Lock held.
+        
+        Each time index is filtered once for the whole batch and only the
+        evicted documents leave the search index; stale expiry entries are
+        filtered out of the heap. When most of the store goes, indexing the
+        survivors afresh is cheaper, so the indexes are rebuilt instead.
+        """
+        for memory in evicted:
+            del self._records[memory.memory_id]
+        if not evicted:
+            return
+        if len(evicted) > len(self._records):
+            self._rebuild_indexes()
+            return
+        self._resident_bytes -= sum(self._record_bytes(memory) for memory in evicted)
+        doomed = {id(memory) for memory in evicted}
+        self._index_all.discard_all(doomed)
+        public = [memory for memory in evicted if not memory.sensitive]
+        if public:
+            self._index_public.discard_all(doomed)
+        for memory_type in {memory.type for memory in evicted}:
+            self._index_by_type[memory_type].discard_all(doomed)
+        for memory_type in {memory.type for memory in public}:
+            self._index_public_by_type[memory_type].discard_all(doomed)
+        for memory in evicted:
+            self._search_index.remove(memory)
+        if self._expiry_heap:
+            self._expiry_heap = [entry for entry in self._expiry_heap if id(entry[2]) not in doomed]
+            heapq.heapify(self._expiry_heap)
+    
+    def _rebuild_indexes(self):
+        """Rebuild all indexes from the resident records."""
+        with self._lock:
+            self._index_all = _TimeIndex()
+            self._index_public = _TimeIndex()
+            self._index_by_type = {}
+            self._index_public_by_type = {}
+            self._search_index = _SearchIndex(use_ngrams=self.ngram_search)
+            self._expiry_heap = []
+            self._resident_bytes = 0
+            for memory in sorted(self._records.values(), key=lambda m: m.sort_key):
+                self._index_memory(memory)
+    
+    def _persist(self, op: str, memories: List[VoicePayMemory], purge: bool = False):
+        """Hand a mutation to the backend, or queue it in write-behind mode."""
+        if self._writer is not None and not self._closed:
+            self._writer.submit(self, op, memories, purge)
+        else:
+            self._apply_ops([(op, memories, purge)])
+    
+    def _apply_ops(self, ops: List[Tuple[str, List[VoicePayMemory], bool]]):
+        """Apply queued mutations in order, coalescing consecutive adds."""
+        pending_adds: List[VoicePayMemory] = []
+        try:
+            for op, memories, purge in ops:
+                if op == "add":
+                    pending_adds.extend(memories)
+                    continue
+                if pending_adds:
+                    self.backend.append(pending_adds)
+                    pending_adds = []
+                self.backend.remove(memories, purge=purge)
+            if pending_adds:
+                self.backend.append(pending_adds)
+        except Exception as e:
+            logger.error(f"Error persisting memories: {e}")
+    
+    def flush(self):
+        """Block until every queued mutation has been written to the backend."""
+        if self._writer is not None:
+            self._writer.flush()
+    
+    def close(self):
+        """Flush pending writes, stop a private writer thread and close the backend."""
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        if self._expiry_task is not None:
+            try:
+                self._expiry_loop.call_soon_threadsafe(self._expiry_task.cancel)
+            except RuntimeError:
+                pass  # Event loop already closed
+        if self._owns_writer:
+            self._writer.close()
+            atexit.unregister(self.close)
+        self.backend.close()
+    
+    @staticmethod
+    def _record_bytes(memory: VoicePayMemory) -> int:
+        # ~600 bytes per record covers the object, its dict and index postings
+        return len(memory.content) * 4 + 600
+    
+    def estimated_bytes(self) -> int:
+        """Rough resident size of this store, including its indexes.
+        
+        Kept up to date as records are indexed and evicted, so the store
+        pool can check its byte budget on every access.
+        """
+        return self._resident_bytes
+    
+    def _ttl_for(self, memory: VoicePayMemory) -> Optional[float]:
+        """Return the memory's time-to-live in seconds, or None to keep it."""
+        ttl = self.type_ttls.get(memory.type)
+        if ttl is None and memory.sensitive:
+            ttl = self.sensitive_ttl
+        return ttl
+    
+    def _schedule_expiry(self, memory: VoicePayMemory):
+        """Push the memory's deadline onto the expiry heap. Lock held."""
+        ttl = self._ttl_for(memory)
+        if ttl is None:
+            return
+        # From the string key, so loading a store does not parse every sensitive timestamp
+        entry = (_sort_key_epoch(memory.sort_key) + ttl, next(self._expiry_counter), memory)
+        heapq.heappush(self._expiry_heap, entry)
+        if self._expiry_wakeup is not None and self._expiry_heap[0] is entry:
+            # New earliest deadline: wake the expiry task to re-arm its timer
+            try:
+                self._expiry_loop.call_soon_threadsafe(self._expiry_wakeup.set)
+            except RuntimeError:
+                pass  # Event loop already closed
+    
+    def expire_due(self, now: Optional[float] = None) -> int:
+        """Remove every memory whose deadline has passed; returns the count."""
+        now = time.time() if now is None else now
+        expired = []
+        with self._lock:
+            heap = self._expiry_heap
+            while heap and heap[0][0] <= now:
+                _, _, memory = heapq.heappop(heap)
+                # Entries for memories evicted by other paths are skipped lazily
+                if self._records.get(memory.memory_id) is memory:
+                    del self._records[memory.memory_id]
+                    self._unindex_memory(memory)
+                    expired.append(memory)
+            if expired:
+                self._persist("remove", expired, purge=True)
+        if expired:
+            logger.info(f"Expired {len(expired)} memory items past their retention")
+        return len(expired)
+    
+    def start_expiry_task(self) -> Optional["asyncio.Task[None]"]:
+        """Run expiry on the current event loop; no-op outside a running loop."""
+        if self._expiry_task is not None:
+            return self._expiry_task
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+        self._expiry_loop = loop
+        self._expiry_wakeup = asyncio.Event()
+        self._expiry_task = loop.create_task(self._run_expiry())
+        return self._expiry_task
+    
+    async def _run_expiry(self):
+        """Sleep until the earliest deadline (or an earlier one is added), then expire."""
+        while True:
+            self._expiry_wakeup.clear()
+            with self._lock:
+                next_deadline = self._expiry_heap[0][0] if self._expiry_heap else None
+            timeout = None if next_deadline is None else max(0.0, next_deadline - time.time())
+            try:
+                await asyncio.wait_for(self._expiry_wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                self.expire_due()
+            except Exception as e:
+                logger.error(f"Error expiring memories: {e}")
     
     def _cleanup_old_sensitive_data(self):
-        """Remove old sensitive data for security."""
+        """Remove sensitive data past its retention for security."""
         try:
-            cutoff_time = datetime.now() - timedelta(hours=1)  # Remove sensitive data older than 1 hour
-            original_count = len(self.memories)
-            
-            self.memories = [
-                mem for mem in self.memories 
-                if not (mem.sensitive and mem.timestamp < cutoff_time)
-            ]
-            
-            removed_count = original_count - len(self.memories)
-            if removed_count > 0:
-                logger.info(f"Cleaned up {removed_count} old sensitive memory items")
-                self._save_memories()
-                
+            self.expire_due()
         except Exception as e:
             logger.error(f"Error during sensitive data cleanup: {e}")
     
+    @timed("memory")
     def add_memory(self, content: str, memory_type: str = "user_interaction", 
                    metadata: Optional[Dict[str, Any]] = None, sensitive: bool = False):
         """Add a new memory with security considerations."""
@@ -109,12 +714,14 @@ class VoicePayMemoryManager:
             sensitive=sensitive
         )
         
-        self.memories.append(memory)
-        self._save_memories()
+        with self._lock:
+            self._records[memory.memory_id] = memory
+            self._index_memory(memory)
+            self._persist("add", [memory])
         logger.info(f"Added {memory_type} memory: {content[:50]}...")
         
         # Auto-cleanup if too many memories
-        if len(self.memories) > 100:
+        if len(self._records) > 100:
             self._cleanup_old_memories()
     
     def _cleanup_old_memories(self):
@@ -123,59 +730,64 @@ class VoicePayMemoryManager:
             # Keep only the most recent 50 memories, prioritizing important types
             important_types = ['security_action', 'transaction_guidance']
             
-            important_memories = [m for m in self.memories if m.type in important_types]
-            other_memories = [m for m in self.memories if m.type not in important_types]
-            
-            # Sort by timestamp (most recent first)
-            important_memories.sort(key=lambda m: m.timestamp, reverse=True)
-            other_memories.sort(key=lambda m: m.timestamp, reverse=True)
-            
-            # Keep recent important memories and some other memories
-            self.memories = important_memories[:30] + other_memories[:20]
-            self._save_memories()
+            with self._lock:
+                important_memories = [m for m in self._records.values() if m.type in important_types]
+                other_memories = [m for m in self._records.values() if m.type not in important_types]
+                
+                # Sort by timestamp (most recent first)
+                important_memories.sort(key=lambda m: m.sort_key, reverse=True)
+                other_memories.sort(key=lambda m: m.sort_key, reverse=True)
+                
+                # Keep recent important memories and some other memories
+                evicted = important_memories[30:] + other_memories[20:]
+                self._evict(evicted)
+                self._persist("remove", evicted)
             
         except Exception as e:
             logger.error(f"Error during memory cleanup: {e}")
     
+    @timed("memory")
     def get_memories(self, memory_type: Optional[str] = None, limit: int = 10, 
                      include_sensitive: bool = False) -> List[VoicePayMemory]:
         """Get recent memories, optionally filtered by type."""
-        filtered_memories = self.memories
-        
-        if memory_type:
-            filtered_memories = [m for m in self.memories if m.type == memory_type]
-        
-        if not include_sensitive:
-            filtered_memories = [m for m in filtered_memories if not m.sensitive]
-        
-        # Sort by timestamp (most recent first) and limit
-        sorted_memories = sorted(filtered_memories, key=lambda m: m.timestamp, reverse=True)
-        return sorted_memories[:limit]
+        with self._lock:
+            self._sync_with_backend()
+            if memory_type:
+                indexes = self._index_by_type if include_sensitive else self._index_public_by_type
+                index = indexes.get(memory_type)
+                if index is None:
+                    return []
+            else:
+                index = self._index_all if include_sensitive else self._index_public
+            
+            # Indexes are kept in timestamp order, so this is O(limit)
+            return index.latest(limit)
     
+    @timed("memory")
     def search_memories(self, query: str, limit: int = 5, 
                        include_sensitive: bool = False) -> List[VoicePayMemory]:
-        """Search memories by content with security filtering."""
-        query_lower = query.lower()
-        matching_memories = []
+        """Search memories by content with security filtering.
         
-        for m in self.memories:
-            if not include_sensitive and m.sensitive:
-                continue
-            if query_lower in m.content.lower():
-                matching_memories.append(m)
-        
-        # Sort by timestamp (most recent first) and limit
-        sorted_memories = sorted(matching_memories, key=lambda m: m.timestamp, reverse=True)
-        return sorted_memories[:limit]
+        Whole-word matches are returned ahead of substring matches, each
+        most recent first.
+        """
+        with self._lock:
+            self._sync_with_backend()
+            return self._search_index.search(query, limit, include_sensitive)
     
+    @timed("memory")
     def clear_sensitive_data(self):
         """Clear all sensitive data from memory for security."""
         try:
-            original_count = len(self.memories)
-            self.memories = [m for m in self.memories if not m.sensitive]
-            removed_count = original_count - len(self.memories)
+            with self._lock:
+                self._sync_with_backend()
+                cleared = [m for m in self._records.values() if m.sensitive]
+                removed_count = len(cleared)
+                self._evict(cleared)
+                self._persist("remove", cleared, purge=True)
             
-            self._save_memories()
+            # Wait until the purge has reached disk before reporting success
+            self.flush()
             logger.info(f"Cleared {removed_count} sensitive memory items for security")
             
             return f"Cleared {removed_count} sensitive items from memory"
@@ -187,7 +799,8 @@ class VoicePayMemoryManager:
     def get_session_summary(self) -> str:
         """Get a summary of the current session."""
         try:
-            session_memories = [m for m in self.memories if m.timestamp >= self.session_start]
+            session_start_key = self.session_start.isoformat(timespec='microseconds')
+            session_memories = [m for m in self.memories if m.sort_key >= session_start_key]
             
             summary = {
                 "session_duration": str(datetime.now() - self.session_start),
@@ -210,5 +823,21 @@ class VoicePayMemoryManager:
 # Create alias for backward compatibility
 MemoryManager = VoicePayMemoryManager
 
-# Global memory manager instance
-memory_manager = VoicePayMemoryManager()
+def open_configured_store(memory_dir: str = "voicepay_memory", **kwargs) -> VoicePayMemoryManager:
+    """Open a store with the configured backend and expiry TTLs.
+    
+    Opening a store drops expired records, so every caller must use the
+    configured retention rather than the constructor defaults.
+    """
+    from config import config
+    kwargs.setdefault("backend", config.memory_backend)
+    kwargs.setdefault("sensitive_ttl", config.sensitive_memory_ttl)
+    kwargs.setdefault("type_ttls", config.memory_type_ttls)
+    return VoicePayMemoryManager(memory_dir, **kwargs)
+
+def __getattr__(name: str) -> Any:
+    # Global memory manager instance, opened on first use with the configured TTLs
+    if name == "memory_manager":
+        store = globals()["memory_manager"] = open_configured_store()
+        return store
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,340 @@
+"""
+In-process metrics for the VoicePay UPI Assistant.
+
+Tool calls, adb commands and memory-store operations record counters and
+latency histograms into a process-wide registry. The registry is exposed
+in the Prometheus text format over a local HTTP endpoint and can be dumped
+to a JSON file periodically, with p50/p95/p99 estimated from the buckets.
+
+Time spent inside a tool call is also attributed to phases ("adb",
+"memory"), so a slow turn shows whether the phone or the store was slow.
+Phases are traced as spans as well when tracing is enabled.
+"""
+import os
+import json
+import time
+import asyncio
+import bisect
+import logging
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers in-memory lookups up to a slow device command
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# Phase durations accumulated by the tool call running in the current task
+_tool_phases: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "voicepay_tool_phases", default=None
+)
+# Errors the tool call running in the current task handled itself
+_tool_errors: contextvars.ContextVar[Optional[List[str]]] = contextvars.ContextVar(
+    "voicepay_tool_errors", default=None
+)
+
+
+class Histogram:
+    """Cumulative-bucket histogram as used by Prometheus."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by interpolating within its bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]  # Beyond the largest bucket
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{key}="{value}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class MetricsRegistry:
+    """Thread-safe store of labelled counters and histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._dump_stop: Optional[threading.Event] = None
+
+    def describe(self, name: str, help_text: str):
+        """Set the HELP text exported for a metric."""
+        self._help[name] = help_text
+
+    def inc(self, name: str, amount: float = 1.0, **labels):
+        """Add to a counter."""
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+
+    def observe(self, name: str, value: float, **labels):
+        """Record a value, normally a duration in seconds, in a histogram."""
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """Record the duration of a block in a histogram."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def render_prometheus(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in series.items():
+                    lines.append(f"{name}{_format_labels(labels)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in series.items():
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        bucket_label = f'le="{le}"'
+                        lines.append(f"{name}_bucket{_format_labels(labels, bucket_label)} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return counters and histogram summaries as plain data."""
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(labels), "value": value} for labels, value in series.items()]
+                for name, series in self._counters.items()
+            }
+            histograms = {
+                name: [{
+                    "labels": dict(labels),
+                    "count": histogram.count,
+                    "sum": histogram.sum,
+                    "p50": histogram.quantile(0.50),
+                    "p95": histogram.quantile(0.95),
+                    "p99": histogram.quantile(0.99),
+                } for labels, histogram in series.items()]
+                for name, series in self._histograms.items()
+            }
+        return {"timestamp": time.time(), "counters": counters, "histograms": histograms}
+
+    def serve(self, host: str = "127.0.0.1", port: int = 9464) -> bool:
+        """Serve ``/metrics`` from a background thread.
+
+        Returns False if the port is taken, e.g. by another worker process
+        on the same host.
+        """
+        if self._server is not None:
+            return True
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes are not worth a log line each
+
+        try:
+            self._server = ThreadingHTTPServer((host, port), Handler)
+        except OSError as e:
+            logger.warning(f"Metrics endpoint not started on {host}:{port}: {e}")
+            return False
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="voicepay-metrics", daemon=True).start()
+        logger.info(f"Serving metrics on http://{host}:{self._server.server_address[1]}/metrics")
+        return True
+
+    def dump_json(self, path: str):
+        """Write a snapshot to ``path`` atomically."""
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(temporary, path)
+
+    def start_json_dump(self, path: str, interval: float = 60.0):
+        """Dump a snapshot to ``path`` every ``interval`` seconds from a background thread."""
+        if self._dump_stop is not None:
+            return
+        self._dump_stop = stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                try:
+                    self.dump_json(path)
+                except OSError as e:
+                    logger.warning(f"Could not write metrics to {path}: {e}")
+
+        threading.Thread(target=run, name="voicepay-metrics-dump", daemon=True).start()
+
+    def close(self):
+        """Stop the HTTP endpoint and the JSON dump."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._dump_stop is not None:
+            self._dump_stop.set()
+            self._dump_stop = None
+
+
+metrics = MetricsRegistry()
+metrics.describe("voicepay_tool_seconds", "Tool call latency")
+metrics.describe("voicepay_tool_calls_total", "Tool calls by outcome")
+metrics.describe("voicepay_tool_errors_total", "Tool errors by type, including those answered with an apology")
+metrics.describe("voicepay_tool_phase_seconds", "Time a tool call spent in adb commands or memory-store operations")
+metrics.describe("voicepay_phase_seconds", "Latency of individual adb commands and memory-store operations")
+metrics.describe("voicepay_adb_commands_total", "adb commands by outcome")
+metrics.describe("voicepay_manual_fallbacks_total", "Payments handed to manual instructions")
+metrics.describe("voicepay_app_launches_total", "UPI app launches by outcome")
+metrics.describe("voicepay_app_launch_seconds", "UPI app start-up time reported by the activity manager")
+
+
+@contextmanager
+def phase(name: str, operation: str = "", **attributes) -> Iterator[None]:
+    """Time a block as part of the current tool call's ``name`` phase.
+
+    The block is also traced as a span; ``attributes`` only go to the span.
+    """
+    started = time.perf_counter()
+    try:
+        with tracer.span(f"{name}.{operation}" if operation else name, **attributes):
+            yield
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.observe("voicepay_phase_seconds", elapsed, phase=name, operation=operation)
+        phases = _tool_phases.get()
+        if phases is not None:
+            phases[name] = phases.get(name, 0.0) + elapsed
+
+
+def tool_error(error: BaseException):
+    """Record an error the current tool call handled itself.
+
+    Tools answer failures with a spoken reply instead of raising, so they
+    call this from their ``except`` blocks; the call then counts as an
+    error. Outside a tool call only the error counter is updated.
+    """
+    errors = _tool_errors.get()
+    if errors is not None:
+        errors.append(type(error).__name__)
+    else:
+        metrics.inc("voicepay_tool_errors_total", tool="", error=type(error).__name__)
+
+
+def instrument_tool(tool: Callable) -> Callable:
+    """Wrap an async tool function to record its latency, outcome and phases.
+
+    A call that raises, or that reported a handled error through
+    ``tool_error``, counts as an error. The wrapper keeps the function's
+    name, docstring and signature, so it can be registered as a tool in
+    place of the original.
+    """
+    name = tool.__name__
+
+    @functools.wraps(tool)
+    async def wrapper(*args, **kwargs):
+        phases: Dict[str, float] = {}
+        errors: List[str] = []
+        token = _tool_phases.set(phases)
+        errors_token = _tool_errors.set(errors)
+        outcome = "ok"
+        started = time.perf_counter()
+        try:
+            return await tool(*args, **kwargs)
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        except Exception as e:
+            errors.append(type(e).__name__)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            _tool_phases.reset(token)
+            _tool_errors.reset(errors_token)
+            if errors and outcome == "ok":
+                outcome = "error"
+            metrics.observe("voicepay_tool_seconds", elapsed, tool=name)
+            metrics.inc("voicepay_tool_calls_total", tool=name, outcome=outcome)
+            for error in errors:
+                metrics.inc("voicepay_tool_errors_total", tool=name, error=error)
+            for phase_name, seconds in phases.items():
+                metrics.observe("voicepay_tool_phase_seconds", seconds, tool=name, phase=phase_name)
+
+    return wrapper
+
+
+def timed(phase_name: str) -> Callable:
+    """Decorator timing a synchronous function as a ``phase_name`` phase."""
+    def decorator(function: Callable) -> Callable:
+        operation = function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with phase(phase_name, operation):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
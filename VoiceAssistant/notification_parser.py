@@ -0,0 +1,110 @@
+"""
+Structured parser for ``dumpsys notification`` output.
+
+The dump is a flat text listing of ``NotificationRecord(...)`` blocks. The
+parser walks the buffer by offset, reading each block's post time in place
+and only slicing out the fields of records newer than the caller's cursor,
+so a repeated check costs string scans over the buffer plus work
+proportional to the new notifications only.
+"""
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+_RECORD_START = "NotificationRecord("
+# Most precise first: last update, creation, then the app-supplied timestamp
+_TIME_FIELDS = ("mUpdateTimeMs=", "mCreationTimeMs=", "when=")
+_HEADER = re.compile(r"pkg=(?P<pkg>\S+).*?\bkey=(?P<key>[^:\s]+)")
+_DIGITS = re.compile(r"\d+")
+_EXTRA = {
+    "title": re.compile(r"android\.title=\w+ \((?P<value>[^\n]*)\)"),
+    "text": re.compile(r"android\.text=\w+ \((?P<value>[^\n]*)\)"),
+}
+
+
+@dataclass
+class NotificationRecord:
+    """A single posted notification."""
+    key: str
+    package: str
+    post_time_ms: int
+    title: str = ""
+    text: str = ""
+
+
+def _post_time(dump: str, start: int, end: int) -> int:
+    """Read a block's post time without copying the block."""
+    for field in _TIME_FIELDS:
+        position = dump.find(field, start, end)
+        if position >= 0:
+            match = _DIGITS.match(dump, position + len(field), end)
+            if match:
+                return int(match.group())
+    return 0
+
+
+def _extra(name: str, dump: str, start: int, end: int) -> str:
+    match = _EXTRA[name].search(dump, start, end)
+    return match.group("value") if match else ""
+
+
+def iter_records(dump: str, since_ms: int = 0) -> Iterator[NotificationRecord]:
+    """Yield records posted after ``since_ms``, skipping older blocks unparsed.
+
+    Records listed in several sections of the dump are yielded once.
+    """
+    seen = set()
+    start = dump.find(_RECORD_START)
+    while start >= 0:
+        end = dump.find(_RECORD_START, start + len(_RECORD_START))
+        block_end = end if end >= 0 else len(dump)
+        post_time = _post_time(dump, start, block_end)
+        if post_time > since_ms:
+            header_end = dump.find("\n", start, block_end)
+            header = _HEADER.search(dump, start, header_end if header_end >= 0 else block_end)
+            if header and header.group("key") not in seen:
+                seen.add(header.group("key"))
+                yield NotificationRecord(
+                    key=header.group("key"),
+                    package=header.group("pkg"),
+                    post_time_ms=post_time,
+                    title=_extra("title", dump, start, block_end),
+                    text=_extra("text", dump, start, block_end),
+                )
+        start = end
+
+
+class NotificationCursor:
+    """Per-device position in the notification stream.
+
+    ``advance`` returns only records posted after the previous call for the
+    same device, so an old notification is never reported twice or treated
+    as the outcome of a later payment.
+    """
+
+    def __init__(self):
+        self._positions: Dict[Optional[str], Tuple[int, frozenset]] = {}
+
+    def advance(self, dump: str, serial: Optional[str] = None,
+                not_before_ms: int = 0) -> List[NotificationRecord]:
+        """Return new records in ``dump`` and move the device's cursor past them.
+
+        ``not_before_ms`` additionally ignores records posted before that
+        time, e.g. on the first check for a device.
+        """
+        position, keys_at_position = self._positions.get(serial, (0, frozenset()))
+        since = max(position, not_before_ms)
+        # Records sharing the cursor's millisecond are re-read and filtered by key
+        records = [r for r in iter_records(dump, since - 1)
+                   if r.post_time_ms > position or r.key not in keys_at_position]
+        if records:
+            latest = max(r.post_time_ms for r in records)
+            if latest > position:
+                keys_at_position = frozenset()
+            keys_at_position |= {r.key for r in records if r.post_time_ms == latest}
+            self._positions[serial] = (max(latest, position), keys_at_position)
+        return sorted(records, key=lambda r: r.post_time_ms)
+
+    def reset(self, serial: Optional[str] = None):
+        """Forget a device's position."""
+        self._positions.pop(serial, None)
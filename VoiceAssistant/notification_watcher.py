@@ -0,0 +1,222 @@
+"""
+Streaming transaction-notification watcher for the VoicePay UPI Assistant.
+
+Instead of snapshotting ``dumpsys notification`` whenever the user asks
+about a payment, one background task per device follows the system event
+log for ``notification_enqueue`` events. Only events posted by a known UPI
+app trigger a read, limited to that app's notifications, of the record the
+event names. The record is classified as a success or failure and routed
+to the one session whose pending payment it matches: same app, same
+amount when the notification states one, oldest payment first. Reading a
+session's latest status is then a dictionary lookup.
+"""
+import re
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Optional, Set
+
+from adb_pool import AdbError, AdbUnavailableError
+from device_commands import DeviceCommands
+from notification_parser import NotificationRecord, iter_records
+from payment_extraction import to_paise
+from upi_apps import UPI_APP_PACKAGES
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# <epoch> ... notification_enqueue: [uid,pid,pkg,id,tag,userid,notification,status]
+# The id, tag and user are skipped if a tag containing commas hides them
+_ENQUEUE_EVENT = re.compile(
+    r"^\s*(?P<time>\d+)(?:\.(?P<ms>\d{1,3}))?\s.*?notification_enqueue: "
+    r"\[(?P<uid>\d+),\d+,(?P<pkg>[\w.]+),(?:(?P<id>-?\d+),(?P<tag>[^,\]]*),(?P<user>-?\d+),)?"
+)
+_SUCCESS_WORDS = re.compile(r"\b(?:success(?:ful(?:ly)?)?|paid|sent|transferred|debited|completed)\b")
+_FAILURE_WORDS = re.compile(r"\b(?:fail(?:ed|ure)?|declined|error|unsuccessful|rejected)\b")
+_STATED_AMOUNT = re.compile(r"(?:₹|\brs\.?|\binr)\s*(?P<amount>\d[\d,]*(?:\.\d{1,2})?)", re.IGNORECASE)
+
+# Follow the events buffer from the device's current time, notification events only
+_EVENT_STREAM = "logcat -b events -v epoch -T \"$(date +%s).000\" notification_enqueue:I '*:S'"
+
+
+def classify_outcome(text: str) -> Optional[str]:
+    """Return ``"failed"``, ``"success"`` or None for a notification's text."""
+    text = text.lower()
+    # Failure wins: "payment failed, amount will not be debited"
+    if _FAILURE_WORDS.search(text):
+        return "failed"
+    if _SUCCESS_WORDS.search(text):
+        return "success"
+    return None
+
+
+def event_key(event: re.Match) -> Optional[str]:
+    """The notification key (``user|pkg|id|tag|uid``) an enqueue event names, if readable."""
+    if event.group("id") is None:
+        return None
+    # The event log writes a null tag as NULL, the dump as null
+    tag = "null" if event.group("tag") == "NULL" else event.group("tag")
+    return f"{event.group('user')}|{event.group('pkg')}|{event.group('id')}|{tag}|{event.group('uid')}"
+
+
+def stated_amounts(text: str) -> Set[int]:
+    """Amounts in paise a notification states with a currency marker."""
+    return {to_paise(match.group("amount")) for match in _STATED_AMOUNT.finditer(text)}
+
+
+@dataclass
+class TransactionStatus:
+    """Latest UPI transaction outcome seen on a device."""
+    outcome: str        # "success" or "failed"
+    package: str
+    detected_at: float  # Epoch seconds
+
+
+@dataclass
+class _PendingPayment:
+    """A payment a session started and awaits the outcome of."""
+    identity: str
+    package: Optional[str]       # None if the app is unknown, e.g. a manual payment
+    amount_paise: Optional[int]
+
+
+class TransactionWatcher:
+    """Per-device notification watchers feeding per-session transaction status.
+
+    Sessions call ``expect`` when a payment is started; the device's watcher
+    is started on first use and stopped when no session awaits a result, or
+    while adb itself is unavailable.
+
+    Args:
+        commands: Device command layer used to stream events and read notifications.
+        packages: UPI package names whose notifications are classified.
+        restart_delay_max: Maximum delay before a dropped event stream is restarted.
+        on_outcome: Called with the session identity and status of each detected outcome.
+    """
+
+    def __init__(self, commands: DeviceCommands, packages: Optional[Iterable[str]] = None,
+                 restart_delay_max: float = 30.0,
+                 on_outcome: Optional[Callable[[str, "TransactionStatus"], None]] = None):
+        self.commands = commands
+        self.packages = frozenset(packages or UPI_APP_PACKAGES)
+        self.restart_delay_max = restart_delay_max
+        self.on_outcome = on_outcome
+        self._watchers: Dict[Optional[str], asyncio.Task] = {}
+        # device -> session -> its pending payment, oldest first
+        self._sessions: Dict[Optional[str], Dict[str, _PendingPayment]] = {}
+        self._status: Dict[str, TransactionStatus] = {}  # session -> latest outcome
+
+    def expect(self, identity: str, serial: Optional[str] = None, package: Optional[str] = None,
+               amount_paise: Optional[int] = None):
+        """Await the outcome of a payment a session started on a device.
+
+        ``package`` and ``amount_paise`` tell the payment's notification from
+        those of other sessions' payments on the same device.
+        """
+        self._status.pop(identity, None)
+        self._forget(identity)
+        self._sessions.setdefault(serial, {})[identity] = _PendingPayment(identity, package, amount_paise)
+        task = self._watchers.get(serial)
+        if task is None or task.done():
+            self._watchers[serial] = asyncio.ensure_future(self._watch(serial))
+
+    def status(self, identity: str) -> Optional[TransactionStatus]:
+        """Return the latest outcome detected for a session, if any."""
+        return self._status.get(identity)
+
+    def _forget(self, identity: str):
+        """Drop a session's pending payment."""
+        for serial, pending in list(self._sessions.items()):
+            if pending.pop(identity, None) is not None and not pending:
+                del self._sessions[serial]
+
+    def release(self, identity: str):
+        """Forget a session, stopping device watchers nobody awaits anymore."""
+        self._status.pop(identity, None)
+        self._forget(identity)
+        for serial in [serial for serial in self._watchers if not self._sessions.get(serial)]:
+            self._watchers.pop(serial).cancel()
+
+    def close(self):
+        """Stop every device watcher."""
+        for task in self._watchers.values():
+            task.cancel()
+        self._watchers.clear()
+        self._sessions.clear()
+
+    async def _watch(self, serial: Optional[str]):
+        """Follow a device's notification events, restarting the stream if it drops."""
+        failures = 0
+        while self._sessions.get(serial):
+            lines = self.commands.stream(_EVENT_STREAM, serial=serial)
+            try:
+                async for line in lines:
+                    failures = 0
+                    match = _ENQUEUE_EVENT.search(line)
+                    if match and match.group("pkg") in self.packages:
+                        await self._on_enqueue(serial, match)
+                        if not self._sessions.get(serial):
+                            return
+            except AdbUnavailableError as e:
+                # No adb client to restart; the next expect() tries again
+                logger.info(f"Notification watcher on {serial or 'default device'} stopped: {e}")
+                return
+            except AdbError as e:
+                logger.info(f"Notification stream on {serial or 'default device'} unavailable: {e}")
+            finally:
+                # Kills the logcat process when the watcher is cancelled
+                await lines.aclose()
+            failures += 1
+            await asyncio.sleep(min(self.restart_delay_max, 2 ** failures))
+
+    def _route(self, serial: Optional[str], record: NotificationRecord) -> Optional[_PendingPayment]:
+        """The pending payment on a device a notification reports, if any."""
+        amounts = stated_amounts(f"{record.title}\n{record.text}")
+        for payment in self._sessions.get(serial, {}).values():
+            if payment.package not in (None, record.package):
+                continue
+            if amounts and payment.amount_paise is not None and payment.amount_paise not in amounts:
+                continue
+            return payment
+        return None
+
+    async def _on_enqueue(self, serial: Optional[str], event: re.Match):
+        """Classify the notification an enqueue event names and settle its payment."""
+        # Device-clock time of the event; older records can't be its outcome
+        posted_ms = int(event.group("time")) * 1000 + int((event.group("ms") or "0").ljust(3, "0"))
+        package, key = event.group("pkg"), event_key(event)
+        try:
+            # "p <package>" limits the dump to the app that posted
+            result = await self.commands.shell(["dumpsys", "notification", "--noredact", "p", package],
+                                               serial=serial, timeout=15)
+        except AdbError as e:
+            logger.warning(f"Could not read notifications from {package}: {e}")
+            return
+        records = [r for r in iter_records(result.stdout, posted_ms - 1000)
+                   if r.package == package and (key is None or r.key == key)]
+        if not records:
+            return
+        record = max(records, key=lambda r: r.post_time_ms)
+        outcome = classify_outcome(f"{record.title}\n{record.text}")
+        if outcome is None:
+            return
+        payment = self._route(serial, record)
+        if payment is None:
+            logger.info(f"Ignored {outcome} UPI notification from {package} matching no pending payment")
+            return
+        identity = payment.identity
+        self._forget(identity)
+        status = TransactionStatus(outcome, record.package, time.time())
+        self._status[identity] = status
+        tracer.span("notification.outcome", identity, **{
+            "notification.package": record.package,
+            "payment.outcome": outcome,
+        }).end()
+        tracer.end_payment(identity, outcome)
+        if self.on_outcome is not None:
+            try:
+                self.on_outcome(identity, status)
+            except Exception as e:
+                logger.error(f"Error handling transaction outcome: {e}")
+        logger.info(f"Detected {outcome} UPI transaction notification from {status.package}")
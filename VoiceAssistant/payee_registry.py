@@ -0,0 +1,173 @@
+"""
+Known-payee registry for the VoicePay UPI Assistant.
+
+Payees are stored as salted HMAC-SHA256 digests of a normalized key, so no
+raw UPI IDs or names are ever persisted. Lookups are a single set probe,
+optionally fronted by a Bloom filter for very large payee populations.
+"""
+import os
+import re
+import hmac
+import math
+import hashlib
+import logging
+import secrets
+import threading
+from typing import Iterable, Optional, Set
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+_NAME_CLEANUP = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_payee(recipient: str) -> Optional[str]:
+    """Return the canonical registry key for a VPA or spoken payee name."""
+    recipient = recipient.strip()
+    if not recipient:
+        return None
+    if '@' in recipient:
+        # VPAs are case-insensitive; spoken input may contain stray spaces
+        return "vpa:" + _WHITESPACE.sub("", recipient).lower()
+    name = _WHITESPACE.sub(" ", _NAME_CLEANUP.sub(" ", recipient.casefold())).strip()
+    return "name:" + name if name else None
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter keyed by precomputed digests."""
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, digest: bytes):
+        # Double hashing over two 64-bit halves of the digest
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, digest: bytes):
+        for position in self._positions(digest):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, digest: bytes) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(digest))
+
+
+class PayeeRegistry:
+    """Salted-hash registry of payees the user has paid before."""
+
+    SALT_FILE = "payee_salt"
+    REGISTRY_FILE = "known_payees.txt"
+
+    def __init__(self, memory_dir: str = "voicepay_memory", use_bloom: bool = False,
+                 bloom_capacity: int = 100000, bloom_error_rate: float = 0.001):
+        self.memory_dir = memory_dir
+        self._lock = threading.Lock()
+        self._hashes: Set[bytes] = set()
+        self._bloom = BloomFilter(bloom_capacity, bloom_error_rate) if use_bloom else None
+        os.makedirs(self.memory_dir, exist_ok=True)
+        self._salt = self._load_salt()
+        # No registry file yet: the user has no payee history, e.g. after an upgrade
+        self.created = not os.path.exists(self._registry_path)
+        self._load_registry()
+
+    @property
+    def _registry_path(self) -> str:
+        return os.path.join(self.memory_dir, self.REGISTRY_FILE)
+
+    def _load_salt(self) -> bytes:
+        """Load the per-installation salt, creating it on first use."""
+        salt_path = os.path.join(self.memory_dir, self.SALT_FILE)
+        try:
+            with open(salt_path, 'rb') as f:
+                salt = f.read()
+            if salt:
+                return salt
+        except FileNotFoundError:
+            pass
+
+        salt = secrets.token_bytes(32)
+        fd = os.open(salt_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(salt)
+        return salt
+
+    def _load_registry(self):
+        """Load stored payee digests."""
+        try:
+            if os.path.exists(self._registry_path):
+                with open(self._registry_path, 'r') as f:
+                    for line in f:
+                        line = line.strip()
+                        if line:
+                            self._insert(bytes.fromhex(line))
+                logger.info(f"Loaded {len(self._hashes)} known payees")
+        except Exception as e:
+            logger.error(f"Error loading payee registry: {e}")
+
+    def _digest(self, key: str) -> bytes:
+        return hmac.new(self._salt, key.encode("utf-8"), hashlib.sha256).digest()
+
+    def _insert(self, digest: bytes):
+        self._hashes.add(digest)
+        if self._bloom is not None:
+            self._bloom.add(digest)
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    @timed("memory")
+    def is_known(self, recipient: str) -> bool:
+        """Return True if the payee has been registered before."""
+        key = normalize_payee(recipient)
+        if key is None:
+            return False
+        digest = self._digest(key)
+        if self._bloom is not None and digest not in self._bloom:
+            return False
+        return digest in self._hashes
+
+    @timed("memory")
+    def register(self, recipient: str):
+        """Record a payee, appending its digest to the registry file."""
+        key = normalize_payee(recipient)
+        if key is None:
+            return
+        digest = self._digest(key)
+        try:
+            with self._lock:
+                if digest in self._hashes:
+                    return
+                self._insert(digest)
+                with open(self._registry_path, 'a') as f:
+                    f.write(digest.hex() + "\n")
+        except Exception as e:
+            logger.error(f"Error registering payee: {e}")
+
+    @timed("memory")
+    def register_many(self, recipients: Iterable[str]) -> int:
+        """Record several payees with one write, e.g. to seed a new registry.
+
+        The registry file is created even if nothing is added. Returns the
+        number of payees that were not known yet.
+        """
+        added = []
+        try:
+            with self._lock:
+                for recipient in recipients:
+                    key = normalize_payee(recipient)
+                    if key is None:
+                        continue
+                    digest = self._digest(key)
+                    if digest not in self._hashes:
+                        self._insert(digest)
+                        added.append(digest)
+                with open(self._registry_path, 'a') as f:
+                    f.write("".join(digest.hex() + "\n" for digest in added))
+        except Exception as e:
+            logger.error(f"Error registering payees: {e}")
+        return len(added)
@@ -0,0 +1,139 @@
+"""
+Payment detail extraction for the VoicePay UPI Assistant.
+
+A spoken command such as "Send ₹1,500 to john@paytm" or "pay Sarah 500
+rupees" is scanned once by a single precompiled pattern whose named
+alternatives recognise UPI IDs, amounts with or without a currency marker,
+and payee names. The result is typed: the amount is held in paise, and the
+recipient is tagged as a UPI ID (``"vpa"``) or a spoken name (``"name"``).
+"""
+import re
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from amount_parser import AMOUNT_STOP_WORDS, has_spoken_amount, spoken_amounts
+
+_NUMBER = r"\d[\d,]*(?:\.\d{1,2})?"
+_CURRENCY = r"(?:rs\.?|rupees?|inr|₹)"
+_PAYMENT_VERB = r"(?:pay|send|transfer)"
+_AMOUNT_WORD = "(?:" + "|".join(sorted(AMOUNT_STOP_WORDS, key=len, reverse=True)) + r")\b"
+# Words that end a payee name: articles, conjunctions, prepositions and fillers
+_NAME_STOP = r"(?:a|an|the|and|or|but|then|at|for|via|using|on|in|by|with|from|of|as|please)\b"
+# A name word; command and stop words never start or continue a payee name
+_NAME_WORD = rf"(?!(?:to|pay|send|transfer|money)\b|{_NAME_STOP})[a-z]+"
+# "the milkman", "mr. sharma", "smt lakshmi"
+_NAME = rf"(?:the\s+|(?:mr|mrs|ms|dr|shri|sri|smt)\.?\s+)?{_NAME_WORD}(?:[ ]{_NAME_WORD})*?"
+_NAME_END = rf"(?=\s+(?:{_CURRENCY}|\d|{_AMOUNT_WORD}|{_NAME_STOP})|\s*[,!?]|\s*\.(?!\w)|\s*$)"
+
+# Alternatives are tried in order, only at token starts; finditer keeps the scan to
+# one pass. Input is lowercased once up front, which is cheaper than IGNORECASE.
+_TOKENS = re.compile(
+    rf"""
+    (?<![\w.@-])(?:
+      (?P<vpa>[a-z0-9._-]+@[a-z0-9.-]*[a-z0-9])
+    | {_CURRENCY}\s*(?P<amount_after_currency>{_NUMBER})
+    | \b{_PAYMENT_VERB}\s+(?P<amount_after_verb>{_NUMBER})(?:\s*(?P<verb_currency>{_CURRENCY}))?
+    | (?P<amount_before_currency>{_NUMBER})\s*{_CURRENCY}
+    | \b{_PAYMENT_VERB}\s+(?:to\s+)?(?!{_AMOUNT_WORD})(?!{_CURRENCY}(?![a-z]))
+      (?P<name_after_verb>{_NAME}){_NAME_END}
+    | \bto\s+(?!{_CURRENCY}(?![a-z]))(?P<name>{_NAME}){_NAME_END}
+    | (?P<amount_bare>{_NUMBER})\b(?!@)
+    )""",
+    re.VERBOSE | re.ASCII,
+)
+
+# Confidence of each way an amount or recipient can be expressed
+_AMOUNT_CONFIDENCE = {
+    "amount_after_currency": 1.0,
+    "amount_before_currency": 1.0,
+    "amount_after_verb": 0.7,
+    "amount_bare": 0.5,
+}
+_RECIPIENT_CONFIDENCE = {"vpa": 1.0, "name": 0.8, "name_after_verb": 0.8}
+# "to Sam" names the payee more surely than "pay Sam"; the first of equally
+# ranked recipients wins
+_RECIPIENT_RANK = {"vpa": 2, "name": 1, "name_after_verb": 0}
+
+# An amount straight after the payment verb, optionally after a currency word
+_AFTER_VERB = re.compile(rf"\b{_PAYMENT_VERB}\s+(?:{_CURRENCY}\s*)?$")
+
+
+def to_paise(amount: str) -> int:
+    """Convert a digit amount such as ``"1,00,000.5"`` to paise."""
+    rupees, _, paise = amount.replace(",", "").partition(".")
+    return int(rupees or 0) * 100 + int(paise.ljust(2, "0")[:2] or 0)
+
+
+def format_rupees(paise: int) -> str:
+    """Format paise as a rupee amount, e.g. ``50050`` -> ``"500.50"``."""
+    rupees, remainder = divmod(paise, 100)
+    return f"{rupees}.{remainder:02d}" if remainder else str(rupees)
+
+
+@dataclass
+class PaymentDetails:
+    """Payment details extracted from one utterance."""
+    amount_paise: Optional[int] = None
+    recipient: Optional[str] = None
+    recipient_kind: Optional[str] = None  # "vpa" or "name"
+    confidence: float = 0.0               # 0 (nothing found) to 1 (both unambiguous)
+
+    @property
+    def amount(self) -> Optional[str]:
+        """Amount in rupees for display."""
+        return None if self.amount_paise is None else format_rupees(self.amount_paise)
+
+
+def _amount_rank(utterance: str, start: int, confidence: float, spoken: bool) -> Tuple[bool, float, int, bool]:
+    """Sort key choosing the payment amount among several in one utterance.
+
+    The amount said right after the payment verb wins, then the most certain
+    one, then the earliest: later amounts usually explain the payment ("pay
+    500 to Ravi for the thousand rupee bill"). A spoken reading starting at
+    the same place as a digit one covers more words ("100 and 50 paise").
+    """
+    return _AFTER_VERB.search(utterance, 0, start) is not None, confidence, -start, spoken
+
+
+def extract_payment(utterance: str) -> PaymentDetails:
+    """Extract the amount and recipient from a spoken payment command."""
+    recipient = kind = None
+    amount_paise, amount_key = None, None
+    recipient_rank = -1
+    # UPI IDs are case-insensitive and names are title-cased below
+    utterance = utterance.lower()
+
+    for match in _TOKENS.finditer(utterance):
+        group = match.lastgroup
+        if group == "verb_currency":
+            group = "amount_after_currency"
+            value, start = match.group("amount_after_verb"), match.start("amount_after_verb")
+        else:
+            value, start = match.group(group), match.start(group)
+
+        if group in _AMOUNT_CONFIDENCE:
+            paise = to_paise(value)
+            key = _amount_rank(utterance, start, _AMOUNT_CONFIDENCE[group], False)
+            if paise and (amount_key is None or key > amount_key):
+                amount_paise, amount_key = paise, key
+        elif _RECIPIENT_RANK[group] > recipient_rank:
+            recipient, kind, recipient_rank = value, group, _RECIPIENT_RANK[group]
+
+    # "five hundred rupees", "1.5 lakh", "paanch sau": parsed locally instead of
+    # asking the user to repeat the amount in digits. A set probe over the
+    # tokens keeps digit-only commands on the fast path; "3k" is two tokens.
+    if has_spoken_amount(utterance):
+        for spoken in spoken_amounts(utterance):
+            key = _amount_rank(utterance, spoken.start, spoken.confidence, True)
+            if amount_key is None or key > amount_key:
+                amount_paise, amount_key = spoken.paise, key
+
+    recipient_confidence = _RECIPIENT_CONFIDENCE[kind] if kind else 0.0
+    if kind is not None and kind != "vpa":
+        recipient, kind = recipient.title(), "name"
+    return PaymentDetails(
+        amount_paise=amount_paise,
+        recipient=recipient,
+        recipient_kind=kind,
+        confidence=((amount_key[1] if amount_key else 0.0) + recipient_confidence) / 2,
+    )
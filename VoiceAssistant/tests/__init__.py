@@ -0,0 +1,7 @@
+"""
+Unit tests for the VoicePay UPI Assistant.
+
+Run from the VoiceAssistant directory with ``python -m pytest tests`` or
+``python -m unittest discover tests``. They need none of the LiveKit, adb
+or Gemini dependencies.
+"""
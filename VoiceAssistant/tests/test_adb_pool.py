@@ -0,0 +1,170 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from adb_pool import AdbConnectionPool, AdbError, build_shell_command
+from device_commands import DeviceCommands, DeviceCommandTimeout
+
+
+class _SlowTransport:
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.running = 0
+        self.most_running = 0
+        self.closed = False
+        self.interrupted = 0
+        self._lock = threading.Lock()
+
+    def shell(self, command, timeout, call=None):
+        if command == "echo":
+            return ""
+        with self._lock:
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        closed = threading.Event()
+        if call is not None:
+            call.attach(closed.set)
+        replied = not closed.wait(self.delay)
+        with self._lock:
+            self.running -= 1
+        if not replied:
+            self.interrupted += 1
+            raise ConnectionResetError("socket closed")
+        if "hang" in command:
+            raise TimeoutError("timed out")
+        if "fail" in command:
+            raise ConnectionResetError("device went away")
+        return "out\n__VOICEPAY_EXIT__3\n"
+
+    def close(self):
+        self.closed = True
+
+
+class _Pool(AdbConnectionPool):
+
+    def __init__(self, direct=(), delay=0.1, **kwargs):
+        super().__init__(**kwargs)
+        self.direct = set(direct)
+        self.delay = delay
+        self.transports = {}
+
+    @property
+    def available(self):
+        return True
+
+    def list_devices(self):
+        return ["emulator-5554"]
+
+    def _is_direct(self, serial):
+        return serial in self.direct
+
+    def _open_transport(self, serial):
+        transport = self.transports[serial] = _SlowTransport(self.delay)
+        return transport
+
+
+class AdbConnectionPoolTest(unittest.TestCase):
+
+    def _run_concurrently(self, pool, serial, count):
+        async def main():
+            await asyncio.gather(*(pool.run(["true"], serial=serial) for _ in range(count)))
+        try:
+            asyncio.run(main())
+        finally:
+            pool.close()
+        return pool.transports[serial]
+
+    def test_server_devices_run_several_commands_at_once(self):
+        transport = self._run_concurrently(_Pool(streams_per_device=4), "emulator-5554", 8)
+        self.assertEqual(transport.most_running, 4)
+
+    def test_direct_devices_run_one_command_at_a_time(self):
+        pool = _Pool(direct={"10.0.0.2:5555"}, streams_per_device=4)
+        transport = self._run_concurrently(pool, "10.0.0.2:5555", 3)
+        self.assertEqual(transport.most_running, 1)
+
+    def test_devices_do_not_share_workers(self):
+        pool = _Pool(delay=0.3, streams_per_device=1)
+
+        async def main():
+            started = time.monotonic()
+            await asyncio.gather(*(pool.run(["true"], serial=f"device-{i}") for i in range(4)))
+            return time.monotonic() - started
+        try:
+            self.assertLess(asyncio.run(main()), 0.6)
+        finally:
+            pool.close()
+
+    def test_exit_status_is_split_from_output(self):
+        pool = _Pool(delay=0)
+        try:
+            result = pool.shell(["echo", "a b"], serial="emulator-5554")
+        finally:
+            pool.close()
+        self.assertEqual((result.returncode, result.stdout, result.serial), (3, "out\n", "emulator-5554"))
+
+    def test_failed_command_drops_the_transport(self):
+        pool = _Pool(delay=0, backoff_base=0)
+        try:
+            with self.assertRaises(AdbError):
+                pool.shell("fail", serial="emulator-5554")
+            broken = pool.transports["emulator-5554"]
+            pool.shell("true", serial="emulator-5554")
+        finally:
+            pool.close()
+        self.assertTrue(broken.closed)
+        self.assertIsNot(pool.transports["emulator-5554"], broken)
+
+    def test_timed_out_command_is_interrupted(self):
+        pool = _Pool(delay=5, streams_per_device=1)
+        commands = DeviceCommands(pool)
+
+        async def main():
+            started = time.monotonic()
+            with self.assertRaises(DeviceCommandTimeout):
+                await commands.shell("sleep", serial="emulator-5554", timeout=0.2)
+            # The stream is free again for the next command
+            pool.transports["emulator-5554"].delay = 0
+            await commands.shell("true", serial="emulator-5554", timeout=1)
+            return time.monotonic() - started
+        try:
+            self.assertLess(asyncio.run(main()), 1)
+        finally:
+            pool.close()
+        self.assertEqual(pool.transports["emulator-5554"].interrupted, 1)
+
+    def test_cancelled_command_is_interrupted(self):
+        pool = _Pool(delay=5)
+        commands = DeviceCommands(pool)
+
+        async def main():
+            task = asyncio.ensure_future(commands.shell("sleep", serial="emulator-5554"))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            await asyncio.sleep(0.1)
+            # Interrupting a server command's own socket leaves the transport in place
+            return pool._connections["emulator-5554"].transport
+        try:
+            kept = asyncio.run(main())
+        finally:
+            pool.close()
+        transport = pool.transports["emulator-5554"]
+        self.assertEqual((transport.interrupted, transport.running), (1, 0))
+        self.assertIs(kept, transport)
+
+    def test_transport_timeout_is_a_command_timeout(self):
+        pool = _Pool(delay=0)
+        commands = DeviceCommands(pool)
+        try:
+            with self.assertRaises(DeviceCommandTimeout):
+                asyncio.run(commands.shell("hang", serial="emulator-5554"))
+        finally:
+            pool.close()
+
+    def test_argument_lists_are_quoted(self):
+        self.assertEqual(build_shell_command(["am", "start", "-d", "upi://pay?pa=a@b&am=1"]),
+                         "am start -d 'upi://pay?pa=a@b&am=1'")
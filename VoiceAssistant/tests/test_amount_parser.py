@@ -0,0 +1,57 @@
+import unittest
+
+from amount_parser import parse_amount, spoken_amounts
+
+
+class ParseAmountTest(unittest.TestCase):
+
+    def assertAmount(self, utterance, paise, confidence=None):
+        amount = parse_amount(utterance)
+        self.assertIsNotNone(amount, utterance)
+        self.assertEqual(amount.paise, paise, utterance)
+        if confidence is not None:
+            self.assertEqual(amount.confidence, confidence, utterance)
+
+    def test_english_words(self):
+        self.assertAmount("five hundred rupees", 50000, 1.0)
+        self.assertAmount("one and a half lakh", 15000000, 0.8)
+        self.assertAmount("two hundred and fifty rupees", 25000)
+        self.assertAmount("a thousand", 100000)
+
+    def test_digits_with_scale_words(self):
+        self.assertAmount("2 crore", 2000000000)
+        self.assertAmount("1.5 lakh", 15000000)
+
+    def test_paired_numbers(self):
+        self.assertAmount("rupees twelve fifty", 125000)
+
+    def test_hindi_words(self):
+        self.assertAmount("paanch sau", 50000)
+        self.assertAmount("dedh lakh rupaye", 15000000)
+        self.assertAmount("saade teen hazaar", 350000)
+        self.assertAmount("paune do sau rupaye", 17500)
+
+    def test_paise_added_to_rupees(self):
+        self.assertAmount("ninety nine rupees and fifty paise", 9950)
+        self.assertAmount("100 rupees and 50 paise", 10050)
+        self.assertAmount("100 and fifty paise", 10050)
+
+    def test_paise_alone(self):
+        self.assertAmount("fifty paise", 50)
+
+    def test_number_without_currency_or_scale_is_ignored(self):
+        self.assertIsNone(parse_amount("send it to flat twelve"))
+        self.assertIsNone(parse_amount("pay 500 to ravi"))
+
+    def test_zero_is_not_an_amount(self):
+        self.assertIsNone(parse_amount("zero rupees"))
+        self.assertIsNone(parse_amount("0 rupees"))
+
+    def test_all_amounts_in_order(self):
+        amounts = spoken_amounts("send 100 rupees to sam and two hundred rupees to ravi")
+        self.assertEqual([amount.paise for amount in amounts], [10000, 20000])
+        self.assertEqual([amount.start for amount in amounts], [5, 27])
+
+
+if __name__ == "__main__":
+    unittest.main()
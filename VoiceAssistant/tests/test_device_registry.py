@@ -0,0 +1,64 @@
+import asyncio
+import unittest
+
+from device_commands import DeviceCommandTimeout
+from device_registry import DeviceRegistry
+from fake_adb import FakeAdb, FakeAdbScenario, FakeDeviceCommands, Latency
+
+
+class _CountingCommands(FakeDeviceCommands):
+
+    def __init__(self, fake):
+        super().__init__(fake)
+        self.listings = 0
+
+    async def list_devices(self, timeout=None):
+        self.listings += 1
+        return await super().list_devices(timeout)
+
+
+class DeviceRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        scenario = FakeAdbScenario.lab(2, payment_delay=None)
+        scenario.latency = {"devices": Latency(0.0, 0.0), "getprop": Latency(0.0, 0.0), "sleep": Latency(1.0, 0.0)}
+        self.commands = _CountingCommands(FakeAdb(scenario))
+        # Expired after every call, as when tool calls are seconds apart
+        self.registry = DeviceRegistry(self.commands, refresh_interval=0)
+
+    def test_bound_session_does_not_list_devices_again(self):
+        async def scenario():
+            first = await self.registry.acquire("alice")
+            for _ in range(5):
+                self.assertEqual(await self.registry.acquire("alice"), first)
+            return first
+
+        self.assertEqual(asyncio.run(scenario()), "emulator-5554")
+        self.assertEqual(self.commands.listings, 1)
+
+    def test_failed_command_lists_devices_again(self):
+        async def scenario():
+            serial = await self.registry.acquire("alice")
+            await self.commands.shell("getprop", serial=serial)
+            await self.registry.acquire("alice")
+            self.assertEqual(self.commands.listings, 1)
+            with self.assertRaises(DeviceCommandTimeout):
+                await self.commands.shell("sleep 5", serial=serial, timeout=0.01)
+            await self.registry.acquire("alice")
+            self.assertEqual(self.commands.listings, 2)
+            await self.registry.acquire("alice")
+
+        asyncio.run(scenario())
+        self.assertEqual(self.commands.listings, 2)
+
+    def test_sessions_spread_over_devices_and_preferred_skips_listing(self):
+        async def scenario():
+            return (await self.registry.acquire("alice"), await self.registry.acquire("bob"),
+                    await self.registry.acquire("kiosk", preferred="emulator-5556"))
+
+        self.assertEqual(asyncio.run(scenario()), ("emulator-5554", "emulator-5556", "emulator-5556"))
+        self.assertEqual(self.commands.listings, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
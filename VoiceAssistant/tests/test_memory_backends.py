@@ -0,0 +1,218 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from memory_backends import JournalBackend, SQLiteBackend
+from memory_manager import VoicePayMemory, VoicePayMemoryManager
+
+
+def _memory(content, sensitive=False, memory_id=None, timestamp="2024-05-01T10:00:00.000000"):
+    return VoicePayMemory(content, timestamp, "user_interaction", {"step": 1}, sensitive, memory_id)
+
+
+class JournalReplayTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.memory_dir = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def backend(self, **kwargs):
+        backend = JournalBackend(self.memory_dir, **kwargs)
+        self.addCleanup(backend.close)
+        return backend
+
+    def reload(self):
+        return {m.memory_id: m.content for m in self.backend().load(VoicePayMemory)}
+
+    def test_snapshot_and_journal_are_replayed_in_order(self):
+        journal = self.backend()
+        journal.append([_memory("first", memory_id="a"), _memory("second", memory_id="b")])
+        journal.compact()
+        journal.append([_memory("third", memory_id="c")])
+        journal.remove([_memory("first", memory_id="a")])
+        journal.close()
+        self.assertEqual(list(self.reload().items()), [("b", "second"), ("c", "third")])
+
+    def test_replay_is_idempotent(self):
+        journal = self.backend()
+        journal.append([_memory("original", memory_id="a")])
+        journal.compact()
+        # The snapshot already covers this add; a second copy must not win
+        with open(journal._journal_path, 'a') as f:
+            f.write('{"op":"add","memory":%s}\n' % json.dumps(_memory("replayed", memory_id="a").to_dict()))
+        journal.close()
+        self.assertEqual(self.reload(), {"a": "original"})
+
+    def test_torn_trailing_line_is_skipped(self):
+        journal = self.backend()
+        journal.append([_memory("kept", memory_id="a")])
+        journal.close()
+        with open(journal._journal_path, 'a') as f:
+            f.write('{"op":"add","memory":{"content":"to')
+        self.assertEqual(self.reload(), {"a": "kept"})
+
+    def test_compacting_segment_left_by_a_crash_is_replayed(self):
+        journal = self.backend()
+        journal.append([_memory("rotated", memory_id="a")])
+        journal.close()
+        os.replace(journal._journal_path, journal._compacting_path)
+        journal = self.backend()
+        self.assertEqual([m.content for m in journal.load(VoicePayMemory)], ["rotated"])
+        journal.append([_memory("live", memory_id="b")])
+        journal.remove([_memory("rotated", memory_id="a")])
+        journal.close()
+        self.assertEqual(self.reload(), {"b": "live"})
+
+    def test_bare_list_snapshot_is_loaded(self):
+        with open(os.path.join(self.memory_dir, JournalBackend.SNAPSHOT_FILE), 'w') as f:
+            json.dump([_memory("legacy", memory_id="a").to_dict()], f)
+        self.assertEqual(self.reload(), {"a": "legacy"})
+
+    def test_purge_leaves_no_trace_on_disk(self):
+        journal = self.backend()
+        journal.append([_memory("pay ravi 500", sensitive=True, memory_id="a"), _memory("hello", memory_id="b")])
+        journal.remove([_memory("pay ravi 500", memory_id="a")], purge=True)
+        journal.close()
+        self.assertFalse(os.path.exists(journal._compacting_path))
+        for path in (journal._snapshot_path, journal._journal_path):
+            if os.path.exists(path):
+                with open(path) as f:
+                    self.assertNotIn("ravi", f.read())
+        self.assertEqual(self.reload(), {"b": "hello"})
+
+    def test_background_compaction_folds_the_journal(self):
+        journal = self.backend(compact_every=3)
+        for i in range(7):
+            journal.append([_memory(f"memory {i}", memory_id=str(i))])
+        journal.close()
+        self.assertTrue(os.path.exists(journal._snapshot_path))
+        if os.path.exists(journal._journal_path):
+            with open(journal._journal_path) as f:
+                self.assertLess(len(f.readlines()), 7)
+        self.assertEqual(len(self.reload()), 7)
+
+
+class SQLiteJournalImportTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.memory_dir = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _write_journal_store(self):
+        journal = JournalBackend(self.memory_dir, compact_every=2)
+        journal.append([_memory("compacted", memory_id="a")])
+        journal.compact()
+        journal.append([_memory("pay ravi 500", sensitive=True, memory_id="b"), _memory("kept", memory_id="c")])
+        journal.remove([_memory("compacted", memory_id="a")])
+        journal.close()
+
+    def test_journal_store_is_imported_and_removed(self):
+        self._write_journal_store()
+        backend = SQLiteBackend(self.memory_dir)
+        records = backend.load(VoicePayMemory)
+        backend.close()
+
+        self.assertEqual({m.memory_id: m.content for m in records}, {"b": "pay ravi 500", "c": "kept"})
+        self.assertTrue(next(m for m in records if m.memory_id == "b").sensitive)
+        self.assertFalse(any(os.path.exists(path) for path in JournalBackend(self.memory_dir).paths))
+
+    def test_import_runs_once(self):
+        self._write_journal_store()
+        first = SQLiteBackend(self.memory_dir)
+        first.load(VoicePayMemory)
+        first.close()
+        backend = SQLiteBackend(self.memory_dir)
+        self.assertEqual(len(backend.load(VoicePayMemory)), 2)
+        backend.close()
+
+    def test_import_is_skipped_when_marked_done(self):
+        # A crash after the import committed but before the files were deleted
+        self._write_journal_store()
+        backend = SQLiteBackend(self.memory_dir)
+        with backend._conn:
+            backend._conn.execute("INSERT INTO imports (source) VALUES ('journal')")
+        self.assertEqual(backend.load(VoicePayMemory), [])
+        self.assertFalse(os.path.exists(os.path.join(self.memory_dir, JournalBackend.SNAPSHOT_FILE)))
+        backend.close()
+
+
+    def test_concurrent_importers_both_load(self):
+        self._write_journal_store()
+        first, second = SQLiteBackend(self.memory_dir), SQLiteBackend(self.memory_dir)
+        self.addCleanup(first.close)
+        self.addCleanup(second.close)
+        os_remove = os.remove
+
+        def remove_then_lose_the_race(path):
+            # The other opener deletes each file between the check and the removal
+            os_remove(path)
+            raise FileNotFoundError(path)
+
+        with mock.patch("os.remove", remove_then_lose_the_race):
+            self.assertEqual(len(first.load(VoicePayMemory)), 2)
+        self.assertEqual(len(second.load(VoicePayMemory)), 2)
+
+
+class SharedSQLiteStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.worker = VoicePayMemoryManager(self._tmp.name, write_behind=True, sensitive_ttl=None)
+        self.other = VoicePayMemoryManager(self._tmp.name, write_behind=True, sensitive_ttl=None)
+
+    def tearDown(self):
+        self.worker.close()
+        self.other.close()
+        self._tmp.cleanup()
+
+    def test_writes_from_another_process_are_seen(self):
+        self.other.add_memory("Detected PhonePe on device", "app_detection")
+        self.other.flush()
+        self.assertEqual([m.content for m in self.worker.get_memories()], ["Detected PhonePe on device"])
+        self.assertEqual(len(self.worker.search_memories("phonepe")), 1)
+
+    def test_cleared_records_stop_being_served(self):
+        self.worker.add_memory("Pay 500 to ravi@ybl", "payment_details")
+        self.worker.add_memory("Guidance for Ravi", "transaction_guidance")
+        self.worker.flush()
+        self.assertEqual(self.other.clear_sensitive_data(), "Cleared 1 sensitive items from memory")
+        self.assertEqual([m.content for m in self.worker.get_memories(include_sensitive=True)],
+                         ["Guidance for Ravi"])
+        self.assertEqual(self.worker.search_memories("ravi@ybl", include_sensitive=True), [])
+
+    def test_sync_reads_only_the_changes(self):
+        self.worker.add_memory("first")
+        self.worker.flush()
+        self.worker.memories
+        self.worker.backend.load = None  # A full reload would fail
+        self.other.add_memory("second")
+        self.other.add_memory("pay ravi 500", "payment_details")
+        self.other.clear_sensitive_data()
+        self.assertEqual([m.content for m in self.worker.get_memories(include_sensitive=True)], ["second", "first"])
+
+    def test_trimmed_change_log_falls_back_to_a_full_reload(self):
+        self.worker.memories
+        self.other.backend.CHANGE_LOG_SIZE = 2
+        for i in range(5):
+            self.other.add_memory(f"memory {i}")
+            self.other.flush()
+        self.assertIsNone(self.worker.backend.changes(VoicePayMemory))
+        self.assertEqual(len(self.worker.get_memories(limit=100)), 5)
+
+    def test_own_queued_writes_survive_a_sync(self):
+        self.worker.add_memory("queued locally")
+        self.other.add_memory("written elsewhere")
+        self.other.flush()
+        self.assertEqual(len(self.worker.memories), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,188 @@
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+
+import memory_manager
+from memory_backends import MemoryBackend
+from memory_manager import VoicePayMemory, VoicePayMemoryManager, _sort_key_epoch
+
+
+class _ListBackend(MemoryBackend):
+    """Keeps records in a list, the way a store on disk would hand them back."""
+
+    def __init__(self, records=None):
+        self.records = list(records or [])
+        self.removed = []
+
+    def load(self, record_type):
+        return list(self.records)
+
+    def append(self, memories):
+        self.records.extend(memories)
+
+    def remove(self, memories, purge=False):
+        ids = {m.memory_id for m in memories}
+        self.records = [m for m in self.records if m.memory_id not in ids]
+        self.removed.append((sorted(ids), purge))
+
+
+def _row(content, age_seconds, memory_type="user_interaction", sensitive=False):
+    timestamp = (datetime.now() - timedelta(seconds=age_seconds)).isoformat(timespec="microseconds")
+    return VoicePayMemory.from_row(f"{content}-{age_seconds}", timestamp, memory_type, int(sensitive), content, "{}")
+
+
+class StoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def store(self, records=(), **kwargs):
+        backend = _ListBackend(records)
+        manager = VoicePayMemoryManager(self._tmp.name, backend=backend, **kwargs)
+        self.addCleanup(manager.close)
+        return manager, backend
+
+
+class IndexTest(StoreTestCase):
+
+    def test_get_memories_is_most_recent_first(self):
+        manager, _ = self.store([_row(f"chat {i}", 100 - i) for i in range(10)])
+        self.assertEqual([m.content for m in manager.get_memories(limit=3)], ["chat 9", "chat 8", "chat 7"])
+        self.assertEqual(len(manager.get_memories(limit=100)), 10)
+        self.assertEqual(manager.get_memories(limit=0), [])
+
+    def test_out_of_order_records_are_placed_by_timestamp(self):
+        manager, _ = self.store([_row("newest", 1), _row("oldest", 300), _row("middle", 100)])
+        self.assertEqual([m.content for m in manager.get_memories()], ["newest", "middle", "oldest"])
+
+    def test_type_and_sensitivity_filters(self):
+        manager, _ = self.store([
+            _row("Detected PhonePe", 30, "app_detection"),
+            _row("pay ravi 500", 20, "payment_details", sensitive=True),
+            _row("hello", 10),
+        ], sensitive_ttl=None)
+        self.assertEqual([m.content for m in manager.get_memories()], ["hello", "Detected PhonePe"])
+        self.assertEqual(len(manager.get_memories(include_sensitive=True)), 3)
+        self.assertEqual(manager.get_memories("payment_details"), [])
+        self.assertEqual([m.content for m in manager.get_memories("payment_details", include_sensitive=True)],
+                         ["pay ravi 500"])
+        self.assertEqual(manager.get_memories("unknown_type", include_sensitive=True), [])
+
+    def test_added_memories_are_indexed(self):
+        manager, backend = self.store()
+        manager.add_memory("Detected PhonePe", "app_detection")
+        manager.add_memory("pay ravi 500", "payment_details")
+        manager.add_memory("my pin is 1234")
+        self.assertEqual([m.content for m in manager.get_memories()], ["Detected PhonePe"])
+        self.assertTrue(manager.get_memories("payment_details", include_sensitive=True)[0].sensitive)
+        self.assertEqual(len(backend.records), 2)
+
+
+class SearchTest(StoreTestCase):
+
+    def test_whole_words_rank_ahead_of_substrings(self):
+        manager, _ = self.store([_row("paid Sam 100", 30), _row("paid Samantha 200", 10)])
+        self.assertEqual([m.content for m in manager.search_memories("sam")], ["paid Sam 100", "paid Samantha 200"])
+
+    def test_substring_and_short_queries(self):
+        manager, _ = self.store([_row("sent to ravi@okaxis", 20), _row("hello", 10)])
+        self.assertEqual([m.content for m in manager.search_memories("okax")], ["sent to ravi@okaxis"])
+        self.assertEqual([m.content for m in manager.search_memories("he")], ["hello"])
+        self.assertEqual(manager.search_memories("priya"), [])
+
+    def test_ngrams_disabled_matches_whole_words_only(self):
+        manager, _ = self.store([_row("paid Samantha 200", 10), _row("paid Sam 100", 30)], ngram_search=False)
+        self.assertEqual([m.content for m in manager.search_memories("sam")], ["paid Sam 100"])
+        self.assertEqual(manager.search_memories("okax"), [])
+
+    def test_limit_and_sensitive_filter(self):
+        records = [_row(f"pay ravi {i}", 100 - i, "payment_details", sensitive=i % 2 == 0) for i in range(10)]
+        manager, _ = self.store(records, sensitive_ttl=None)
+        self.assertEqual([m.content for m in manager.search_memories("ravi", limit=2)], ["pay ravi 9", "pay ravi 7"])
+        self.assertEqual(len(manager.search_memories("ravi", limit=100)), 5)
+        self.assertEqual(len(manager.search_memories("ravi", limit=100, include_sensitive=True)), 10)
+
+
+class ExpiryTest(StoreTestCase):
+
+    def test_sort_key_epoch_matches_datetime(self):
+        for key in ("2024-05-01T10:07:33.250000", "2024-05-01T10:07:33", "2024-05-01T10:07:33+05:30", "2024-05-01"):
+            self.assertAlmostEqual(_sort_key_epoch(key), datetime.fromisoformat(key).timestamp(), places=6)
+
+    def test_expired_sensitive_records_are_dropped_on_load(self):
+        manager, backend = self.store([
+            _row("old payment", 7200, "payment_details", sensitive=True),
+            _row("new payment", 10, "payment_details", sensitive=True),
+            _row("old chat", 7200),
+        ], sensitive_ttl=3600)
+        self.assertEqual(sorted(m.content for m in manager.memories), ["new payment", "old chat"])
+        self.assertEqual(backend.removed, [(["old payment-7200"], True)])
+
+    def test_loading_leaves_timestamps_unparsed(self):
+        manager, _ = self.store([_row("payment", 10, "payment_details", sensitive=True)], sensitive_ttl=3600)
+        self.assertIsNone(manager.memories[0]._timestamp)
+
+    def test_expire_due_uses_deadlines(self):
+        manager, _ = self.store([_row("payment", 100, "payment_details", sensitive=True)], sensitive_ttl=3600)
+        self.assertEqual(manager.expire_due(), 0)
+        self.assertEqual(manager.expire_due(now=time.time() + 3500), 1)
+        self.assertEqual(manager.memories, [])
+
+    def test_type_ttls(self):
+        manager, _ = self.store([_row("Detected PhonePe", 120, "app_detection"), _row("hello", 120)],
+                                type_ttls={"app_detection": 60})
+        self.assertEqual([m.content for m in manager.memories], ["hello"])
+
+    def test_import_opens_no_store(self):
+        # The global store is opened on first use, with the configured TTLs
+        self.assertNotIn("memory_manager", vars(memory_manager))
+
+    def test_no_ttl_keeps_records(self):
+        manager, _ = self.store([_row("payment", 10 ** 6, "payment_details", sensitive=True)], sensitive_ttl=None)
+        self.assertEqual(len(manager.memories), 1)
+
+
+class EvictionTest(StoreTestCase):
+
+    def test_clear_sensitive_data_updates_every_index(self):
+        records = [_row(f"pay ravi {i}", 1000 - i, "payment_details", sensitive=i % 4 == 0) for i in range(40)]
+        manager, backend = self.store(records, sensitive_ttl=None)
+        self.assertEqual(manager.clear_sensitive_data(), "Cleared 10 sensitive items from memory")
+        self.assertEqual(len(manager.get_memories("payment_details", limit=100, include_sensitive=True)), 30)
+        self.assertEqual(len(manager.get_memories(limit=100, include_sensitive=True)), 30)
+        self.assertEqual(manager.search_memories("pay ravi 0", include_sensitive=True), [])
+        self.assertEqual(len(manager.search_memories("ravi", limit=100, include_sensitive=True)), 30)
+        self.assertTrue(backend.removed[-1][1])
+
+    def test_cleared_records_leave_the_expiry_heap(self):
+        manager, _ = self.store([_row("pay ravi", 10, "payment_details", sensitive=True), _row("hello", 10)],
+                                sensitive_ttl=3600)
+        manager.clear_sensitive_data()
+        self.assertEqual(manager._expiry_heap, [])
+
+    def test_estimated_bytes_follows_adds_and_evictions(self):
+        manager, _ = self.store([_row("hello", 10)], sensitive_ttl=None)
+        manager.add_memory("pay ravi 500", "payment_details")
+        self.assertEqual(manager.estimated_bytes(), sum(len(m.content) * 4 + 600 for m in manager.memories))
+        manager.clear_sensitive_data()
+        self.assertEqual(manager.estimated_bytes(), len("hello") * 4 + 600)
+
+    def test_trim_keeps_recent_important_memories(self):
+        records = [_row(f"guidance {i}", 1000 - i, "transaction_guidance") for i in range(60)]
+        records += [_row(f"chat {i}", 1000 - i) for i in range(60)]
+        manager, backend = self.store(records)
+        manager._cleanup_old_memories()
+        guidance = manager.get_memories("transaction_guidance", limit=100)
+        self.assertEqual(len(guidance), 30)
+        self.assertEqual(guidance[0].content, "guidance 59")
+        self.assertEqual(len(manager.get_memories("user_interaction", limit=100)), 20)
+        self.assertEqual(len(backend.records), 50)
+        self.assertEqual(manager.search_memories("guidance 0"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
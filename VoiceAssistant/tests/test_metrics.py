@@ -0,0 +1,53 @@
+import asyncio
+import unittest
+
+from metrics import instrument_tool, metrics, tool_error
+
+
+def _counter(name, **labels):
+    counters = metrics.snapshot()["counters"].get(name, [])
+    return sum(c["value"] for c in counters if c["labels"] == labels)
+
+
+class InstrumentToolTest(unittest.TestCase):
+
+    def test_handled_error_counts_as_an_error(self):
+        @instrument_tool
+        async def apologising_tool():
+            try:
+                raise ValueError("bad amount")
+            except Exception as e:
+                tool_error(e)
+                return "I encountered an error, Sir."
+
+        calls = _counter("voicepay_tool_calls_total", tool="apologising_tool", outcome="error")
+        errors = _counter("voicepay_tool_errors_total", tool="apologising_tool", error="ValueError")
+        self.assertEqual(asyncio.run(apologising_tool()), "I encountered an error, Sir.")
+        self.assertEqual(_counter("voicepay_tool_calls_total", tool="apologising_tool", outcome="error"), calls + 1)
+        self.assertEqual(_counter("voicepay_tool_errors_total", tool="apologising_tool", error="ValueError"),
+                         errors + 1)
+
+    def test_raised_error_and_success(self):
+        @instrument_tool
+        async def flaky_tool(fail):
+            if fail:
+                raise KeyError("device")
+            return "ok"
+
+        ok = _counter("voicepay_tool_calls_total", tool="flaky_tool", outcome="ok")
+        failed = _counter("voicepay_tool_calls_total", tool="flaky_tool", outcome="error")
+        self.assertEqual(asyncio.run(flaky_tool(False)), "ok")
+        with self.assertRaises(KeyError):
+            asyncio.run(flaky_tool(True))
+        self.assertEqual(_counter("voicepay_tool_calls_total", tool="flaky_tool", outcome="ok"), ok + 1)
+        self.assertEqual(_counter("voicepay_tool_calls_total", tool="flaky_tool", outcome="error"), failed + 1)
+        self.assertEqual(_counter("voicepay_tool_errors_total", tool="flaky_tool", error="KeyError"), 1)
+
+    def test_error_outside_a_tool_call(self):
+        before = _counter("voicepay_tool_errors_total", tool="", error="OSError")
+        tool_error(OSError("disk"))
+        self.assertEqual(_counter("voicepay_tool_errors_total", tool="", error="OSError"), before + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+
+from notification_parser import NotificationCursor, iter_records
+
+
+def _block(package, notification_id, post_ms, title="", text="", time_field="when"):
+    key = f"0|{package}|{notification_id}|null|10123"
+    return (
+        f"    NotificationRecord(0x0bad{notification_id:04x}: pkg={package} user=UserHandle{{0}} "
+        f"id={notification_id} tag=null importance=4 key={key}: Notification(channel=default flags=0x10))\n"
+        f"      uid=10123 userId=0\n"
+        f"      key={key}\n"
+        f"      {time_field}={post_ms}\n"
+        f"      extras={{\n"
+        f"        android.title=String ({title})\n"
+        f"        android.text=String ({text})\n"
+        f"      }}\n"
+    )
+
+
+def _dump(*blocks):
+    return "NOTIFICATION MANAGER (dumpsys notification)\n  Notification List:\n" + "".join(blocks)
+
+
+PHONEPE = "com.phonepe.app"
+GPAY = "com.google.android.apps.nbu.paisa.user"
+
+
+class IterRecordsTest(unittest.TestCase):
+
+    def test_fields_are_parsed(self):
+        record, = iter_records(_dump(_block(PHONEPE, 7, 1000, "Payment successful", "₹500 paid to Ravi (ravi@ybl)")))
+        self.assertEqual(record.key, f"0|{PHONEPE}|7|null|10123")
+        self.assertEqual(record.package, PHONEPE)
+        self.assertEqual(record.post_time_ms, 1000)
+        self.assertEqual(record.title, "Payment successful")
+        self.assertEqual(record.text, "₹500 paid to Ravi (ravi@ybl)")
+
+    def test_older_records_are_skipped(self):
+        dump = _dump(_block(PHONEPE, 1, 1000), _block(GPAY, 2, 2000), _block(PHONEPE, 3, 3000))
+        self.assertEqual([r.post_time_ms for r in iter_records(dump, since_ms=2000)], [3000])
+        self.assertEqual(len(list(iter_records(dump))), 3)
+
+    def test_records_in_several_sections_are_yielded_once(self):
+        block = _block(PHONEPE, 1, 1000, "Payment successful")
+        dump = _dump(block) + "  Snoozed notifications:\n" + block
+        self.assertEqual(len(list(iter_records(dump))), 1)
+
+    def test_update_time_is_preferred_over_when(self):
+        block = _block(PHONEPE, 1, 1000).replace("      key=", "      mUpdateTimeMs=5000\n      key=", 1)
+        record, = iter_records(_dump(block))
+        self.assertEqual(record.post_time_ms, 5000)
+
+    def test_missing_extras_and_empty_dump(self):
+        record, = iter_records(_dump(_block(GPAY, 1, 1000).split("      extras=")[0]))
+        self.assertEqual((record.title, record.text), ("", ""))
+        self.assertEqual(list(iter_records("")), [])
+        self.assertEqual(list(iter_records("Notification List:\n")), [])
+
+
+class NotificationCursorTest(unittest.TestCase):
+
+    def test_advance_returns_only_new_records(self):
+        cursor = NotificationCursor()
+        first = _dump(_block(PHONEPE, 1, 1000))
+        self.assertEqual([r.post_time_ms for r in cursor.advance(first)], [1000])
+        self.assertEqual(cursor.advance(first), [])
+        second = _dump(_block(GPAY, 2, 3000), _block(PHONEPE, 3, 2000), _block(PHONEPE, 1, 1000))
+        self.assertEqual([r.post_time_ms for r in cursor.advance(second)], [2000, 3000])
+
+    def test_records_sharing_the_cursor_millisecond(self):
+        cursor = NotificationCursor()
+        cursor.advance(_dump(_block(PHONEPE, 1, 1000)))
+        records = cursor.advance(_dump(_block(PHONEPE, 1, 1000), _block(GPAY, 2, 1000)))
+        self.assertEqual([r.package for r in records], [GPAY])
+        self.assertEqual(cursor.advance(_dump(_block(PHONEPE, 1, 1000), _block(GPAY, 2, 1000))), [])
+
+    def test_not_before_ignores_older_records(self):
+        cursor = NotificationCursor()
+        dump = _dump(_block(PHONEPE, 1, 1000), _block(GPAY, 2, 3000))
+        self.assertEqual([r.package for r in cursor.advance(dump, not_before_ms=2000)], [GPAY])
+
+    def test_positions_are_per_device(self):
+        cursor = NotificationCursor()
+        dump = _dump(_block(PHONEPE, 1, 1000))
+        self.assertEqual(len(cursor.advance(dump, serial="device-a")), 1)
+        self.assertEqual(len(cursor.advance(dump, serial="device-b")), 1)
+        self.assertEqual(cursor.advance(dump, serial="device-a"), [])
+        cursor.reset("device-a")
+        self.assertEqual(len(cursor.advance(dump, serial="device-a")), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
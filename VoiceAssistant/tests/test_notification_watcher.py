@@ -0,0 +1,116 @@
+import asyncio
+import unittest
+
+from adb_pool import AdbUnavailableError
+from device_commands import DeviceCommands
+from fake_adb import FakeAdb, FakeAdbScenario, FakeDevice, FakeDeviceCommands, FakeNotification
+from notification_watcher import (
+    _ENQUEUE_EVENT,
+    TransactionWatcher,
+    classify_outcome,
+    event_key,
+    stated_amounts,
+)
+
+PHONEPE = "com.phonepe.app"
+GPAY = "com.google.android.apps.nbu.paisa.user"
+
+
+class ParsingTest(unittest.TestCase):
+
+    def test_classify_outcome(self):
+        self.assertEqual(classify_outcome("Payment successful\n₹250 paid to Ravi"), "success")
+        self.assertEqual(classify_outcome("Payment failed, amount will not be debited"), "failed")
+        self.assertIsNone(classify_outcome("Cashback offer inside"))
+
+    def test_stated_amounts(self):
+        self.assertEqual(stated_amounts("₹1,250.50 paid; Rs. 20 cashback; INR 5 fee; 3 rewards"),
+                         {125050, 2000, 500})
+
+    def test_event_key(self):
+        line = ("1700000000.123  1000  1521  1600 I notification_enqueue: "
+                "[10123,2113,com.phonepe.app,1001,NULL,0,Notification(channel=default),0]")
+        event = _ENQUEUE_EVENT.search(line)
+        self.assertEqual((event.group("time"), event.group("ms"), event.group("pkg")),
+                         ("1700000000", "123", PHONEPE))
+        self.assertEqual(event_key(event), "0|com.phonepe.app|1001|null|10123")
+
+    def test_event_key_is_unknown_for_tags_with_commas(self):
+        line = "1700000000.1 I notification_enqueue: [10123,2113,com.phonepe.app,7,a,b,0,Notification(),0]"
+        event = _ENQUEUE_EVENT.search(line)
+        self.assertEqual(event.group("pkg"), PHONEPE)
+        self.assertIsNone(event_key(event))
+
+
+class _CountingCommands(FakeDeviceCommands):
+
+    def __init__(self, fake):
+        super().__init__(fake, stream_poll_interval=0.05)
+        self.dumps = []
+
+    async def shell(self, command, serial=None, timeout=None):
+        if command[0] == "dumpsys":
+            self.dumps.append(list(command))
+        return await super().shell(command, serial, timeout)
+
+
+class TransactionWatcherTest(unittest.TestCase):
+
+    def _watch(self, notifications, expectations, wait=0.8):
+        device = FakeDevice(serial="kiosk-1", packages=[PHONEPE, GPAY], notifications=notifications)
+        commands = _CountingCommands(FakeAdb(FakeAdbScenario(devices=[device])))
+        outcomes = []
+        watcher = TransactionWatcher(commands, on_outcome=lambda identity, status: outcomes.append(
+            (identity, status.outcome, status.package)))
+
+        async def main():
+            for identity, package, amount_paise in expectations:
+                watcher.expect(identity, "kiosk-1", package, amount_paise)
+            await asyncio.sleep(wait)
+            watcher.close()
+        asyncio.run(main())
+        return watcher, commands, outcomes
+
+    def test_outcomes_go_to_the_matching_session(self):
+        watcher, commands, outcomes = self._watch([
+            FakeNotification(GPAY, "Payment failed", "Payment of ₹100 to bob@okaxis failed", at=0.2),
+            FakeNotification(PHONEPE, "Payment successful", "₹250 paid to ravi@ybl", at=0.4),
+        ], [("alice", PHONEPE, 25000), ("bob", GPAY, 10000)])
+        self.assertEqual(outcomes, [("bob", "failed", GPAY), ("alice", "success", PHONEPE)])
+        self.assertEqual(watcher.status("alice").outcome, "success")
+        # Each read is limited to the app that posted
+        self.assertEqual(commands.dumps, [["dumpsys", "notification", "--noredact", "p", GPAY],
+                                          ["dumpsys", "notification", "--noredact", "p", PHONEPE]])
+
+    def test_unmatched_amount_is_ignored(self):
+        watcher, _, outcomes = self._watch([
+            FakeNotification(PHONEPE, "Payment successful", "₹999 paid to someone@ybl", at=0.2),
+        ], [("alice", PHONEPE, 25000)], wait=0.5)
+        self.assertEqual(outcomes, [])
+        self.assertIsNone(watcher.status("alice"))
+
+    def test_sessions_on_one_app_are_settled_oldest_first(self):
+        _, _, outcomes = self._watch([
+            FakeNotification(PHONEPE, "Payment successful", "Money sent", at=0.2),
+            FakeNotification(PHONEPE, "Payment successful", "Money sent", at=0.4),
+        ], [("alice", None, None), ("bob", PHONEPE, None)])
+        self.assertEqual([identity for identity, _, _ in outcomes], ["alice", "bob"])
+
+    def test_watcher_stops_without_adb(self):
+        class _NoAdb(DeviceCommands):
+            streams = 0
+
+            async def stream(self, command, serial=None, timeout=None):
+                self.streams += 1
+                raise AdbUnavailableError("adb is not installed")
+                yield
+
+        commands = _NoAdb()
+        watcher = TransactionWatcher(commands)
+
+        async def main():
+            watcher.expect("alice", None)
+            await asyncio.sleep(0.1)
+            return watcher._watchers[None].done()
+        self.assertTrue(asyncio.run(main()))
+        self.assertEqual(commands.streams, 1)
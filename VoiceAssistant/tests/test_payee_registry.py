@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+
+from payee_registry import PayeeRegistry, normalize_payee
+
+
+class NormalizePayeeTest(unittest.TestCase):
+
+    def test_vpa_ignores_case_and_spaces(self):
+        self.assertEqual(normalize_payee(" John @PayTM "), "vpa:john@paytm")
+
+    def test_name_ignores_case_and_punctuation(self):
+        self.assertEqual(normalize_payee("Mr.  Sharma"), "name:mr sharma")
+
+    def test_blank_is_not_a_payee(self):
+        self.assertIsNone(normalize_payee("  "))
+
+
+class PayeeRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.path = self._tmp.name
+
+    def test_registered_payees_survive_reopen(self):
+        registry = PayeeRegistry(self.path)
+        self.assertTrue(registry.created)
+        registry.register("john@paytm")
+        reopened = PayeeRegistry(self.path)
+        self.assertFalse(reopened.created)
+        self.assertTrue(reopened.is_known("JOHN@paytm"))
+        self.assertFalse(reopened.is_known("jane@paytm"))
+
+    def test_register_many_counts_new_payees(self):
+        registry = PayeeRegistry(self.path, use_bloom=True)
+        registry.register("Ravi")
+        self.assertEqual(registry.register_many(["ravi", "Sam", "sam", "", "sam@upi"]), 2)
+        self.assertTrue(registry.is_known("SAM"))
+        self.assertEqual(len(PayeeRegistry(self.path)), 3)
+
+    def test_register_many_creates_registry_without_payees(self):
+        PayeeRegistry(self.path).register_many([])
+        self.assertTrue(os.path.exists(os.path.join(self.path, PayeeRegistry.REGISTRY_FILE)))
+        self.assertFalse(PayeeRegistry(self.path).created)
+
+    def test_raw_payees_are_not_stored(self):
+        PayeeRegistry(self.path).register("john@paytm")
+        with open(os.path.join(self.path, PayeeRegistry.REGISTRY_FILE)) as f:
+            self.assertNotIn("john", f.read())
@@ -0,0 +1,99 @@
+import unittest
+
+from payment_extraction import extract_payment, format_rupees, to_paise
+
+
+class AmountTest(unittest.TestCase):
+
+    def assertAmount(self, utterance, paise):
+        self.assertEqual(extract_payment(utterance).amount_paise, paise, utterance)
+
+    def test_digit_amounts(self):
+        self.assertAmount("Pay ₹500 to john@paytm", 50000)
+        self.assertAmount("transfer rs 1,00,000 to ravi kumar for rent", 10000000)
+        self.assertAmount("pay to mom 250.50 rupees", 25050)
+        self.assertAmount("pay 300", 30000)
+
+    def test_spoken_amounts(self):
+        self.assertAmount("send five hundred rupees to sarah", 50000)
+        self.assertAmount("I need to pay a hundred rupees to Sam", 10000)
+        self.assertAmount("send dedh lakh to papa@oksbi", 15000000)
+
+    def test_scale_suffix_attached_to_digits(self):
+        self.assertAmount("pay 3k to bob@ybl", 300000)
+        self.assertAmount("pay Sam 2.5k", 250000)
+        self.assertAmount("send 10k rupees to ravi@okaxis", 1000000)
+        self.assertAmount("pay 3 k", 300000)
+
+    def test_later_spoken_amount_does_not_override_verb_amount(self):
+        self.assertAmount("send 200 to ravi, he owes me two lakh", 20000)
+        self.assertAmount("pay 500 to ravi for the thousand rupee bill", 50000)
+        self.assertAmount("pay 300 to ravi for ten samosas of five rupees", 30000)
+
+    def test_first_of_several_currency_amounts(self):
+        self.assertAmount("send 100 rupees to sam and 200 rupees to ravi", 10000)
+
+    def test_paise_after_digit_amount(self):
+        self.assertAmount("pay 100 and fifty paise to ravi", 10050)
+        self.assertAmount("pay 100 rupees and 50 paise", 10050)
+        self.assertAmount("pay ninety nine rupees and fifty paise to chai@ybl", 9950)
+
+    def test_zero_is_rejected(self):
+        self.assertAmount("send 0 rupees", None)
+        self.assertAmount("send zero rupees to ravi", None)
+        self.assertAmount("send 0 rupees to ravi, no, 50 rupees", 5000)
+
+    def test_no_amount(self):
+        details = extract_payment("Send money to priya.s@okaxis")
+        self.assertIsNone(details.amount_paise)
+        self.assertIsNone(details.amount)
+
+
+class RecipientTest(unittest.TestCase):
+
+    def assertRecipient(self, utterance, recipient, kind="name"):
+        details = extract_payment(utterance)
+        self.assertEqual(details.recipient, recipient, utterance)
+        self.assertEqual(details.recipient_kind, kind if recipient else None, utterance)
+
+    def test_upi_ids(self):
+        self.assertRecipient("Pay ₹500 to john@paytm", "john@paytm", "vpa")
+        self.assertRecipient("send Rs 50 to 9876543210@ybl please", "9876543210@ybl", "vpa")
+        self.assertRecipient("pay Ravi Kumar at ravi.k@okaxis", "ravi.k@okaxis", "vpa")
+
+    def test_names(self):
+        self.assertRecipient("pay john 500", "John")
+        self.assertRecipient("transfer rs 1,00,000 to ravi kumar for rent", "Ravi Kumar")
+        self.assertRecipient("pay 2,500 rupees to the milkman", "The Milkman")
+        self.assertRecipient("pay ravi", "Ravi")
+
+    def test_articles_are_not_names(self):
+        self.assertRecipient("I need to pay a hundred rupees to Sam", "Sam")
+        self.assertRecipient("send 50 to the", None)
+
+    def test_conjunctions_and_prepositions_end_a_name(self):
+        self.assertRecipient("send 100 rupees to sam and 200 rupees to ravi", "Sam")
+        self.assertRecipient("send 250 rupees to ravi at 5 pm", "Ravi")
+        self.assertRecipient("send 500 to ravi please", "Ravi")
+
+    def test_honorifics_are_kept(self):
+        self.assertRecipient("pay 500 to Mr. Sharma", "Mr. Sharma")
+        self.assertRecipient("pay Dr Rao 200 rupees", "Dr Rao")
+
+    def test_to_name_preferred_over_verb_name(self):
+        self.assertRecipient("pay back the loan, send 500 to Ravi", "Ravi")
+
+
+class FormattingTest(unittest.TestCase):
+
+    def test_to_paise(self):
+        self.assertEqual(to_paise("1,00,000.5"), 10000050)
+        self.assertEqual(to_paise("75"), 7500)
+
+    def test_format_rupees(self):
+        self.assertEqual(format_rupees(50050), "500.50")
+        self.assertEqual(format_rupees(50000), "500")
+
+
+if __name__ == "__main__":
+    unittest.main()
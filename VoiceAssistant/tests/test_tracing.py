@@ -0,0 +1,58 @@
+import unittest
+
+from tracing import SpanExporter, Tracer
+
+
+class _ListExporter(SpanExporter):
+
+    def __init__(self):
+        self.spans = []
+        super().__init__(flush_interval=0)
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+
+class TracerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.exporter = _ListExporter()
+        self.tracer = Tracer(self.exporter)
+
+    def _exported(self):
+        self.tracer.close()
+        return {span.name: span for span in self.exporter.spans}
+
+    def test_exporter_must_implement_export(self):
+        with self.assertRaises(TypeError):
+            SpanExporter()
+
+    def test_payment_is_a_child_of_the_tool_call(self):
+        with self.tracer.span("tool.extract_payment_details", "alice") as tool:
+            self.tracer.begin_payment("alice", **{"payment.amount_paise": 50000})
+        self.assertIsNone(tool.parent_id)
+        with self.tracer.span("tool.open_upi_app_with_details", "alice"):
+            pass
+        self.tracer.end_payment("alice", "success")
+
+        spans = self._exported()
+        payment = spans["payment"]
+        self.assertEqual((payment.trace_id, payment.parent_id), (tool.trace_id, tool.span_id))
+        self.assertIsNone(spans["tool.extract_payment_details"].parent_id)
+        self.assertEqual(spans["tool.open_upi_app_with_details"].parent_id, payment.span_id)
+        self.assertEqual(payment.attributes["payment.outcome"], "success")
+        self.assertIsNone(payment.error)
+
+    def test_payment_outside_a_tool_call_starts_a_trace(self):
+        self.tracer.begin_payment("alice")
+        self.tracer.end_session("alice")
+        payment = self._exported()["payment"]
+        self.assertIsNone(payment.parent_id)
+        self.assertEqual(payment.error, "Payment abandoned")
+
+    def test_disabled_tracer_records_nothing(self):
+        tracer = Tracer()
+        with tracer.span("tool.noop", "alice") as span:
+            span.set("key", "value")
+        tracer.begin_payment("alice")
+        self.assertEqual(tracer._payments, {})
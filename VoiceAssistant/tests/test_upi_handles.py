@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+
+from upi_handles import UpiHandleRegistry, normalize_vpa
+
+
+class NormalizeVpaTest(unittest.TestCase):
+
+    def test_spoken_form_is_normalized(self):
+        self.assertEqual(normalize_vpa("Neha @ OkSBI."), "neha@oksbi")
+
+    def test_malformed_ids_are_rejected(self):
+        for vpa in ("no-at-sign.paytm", "@ybl", "john@", "john@@paytm", "x" * 300 + "@paytm", "john@9bank"):
+            with self.subTest(vpa=vpa):
+                self.assertIsNone(normalize_vpa(vpa))
+
+
+class UpiHandleRegistryTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.registry = UpiHandleRegistry.from_file()
+
+    def test_known_handles_are_accepted(self):
+        for vpa in ("john@paytm", "9876543210@ybl", "shop-42@kotak", "ravi@okhdfcbank", "ravi@wasbi", "ravi@ptsbi"):
+            with self.subTest(vpa=vpa):
+                self.assertEqual(self.registry.validate(vpa), vpa)
+
+    def test_bank_handles_need_a_known_app_prefix(self):
+        self.assertEqual(self.registry.validate("a@sbi"), "a@sbi")
+        self.assertEqual(self.registry.validate("a@okboi"), "a@okboi")
+        for vpa in ("x@fakesbi", "x@okfakesbi", "x@notboi", "x@mydbs", "x@okpaytm", "someone@examplebank"):
+            with self.subTest(vpa=vpa):
+                self.assertIsNone(self.registry.validate(vpa))
+
+    def test_validate_returns_the_normalized_id(self):
+        self.assertEqual(self.registry.validate("Priya.S@OKAXIS."), "priya.s@okaxis")
+
+    def test_file_format(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "handles.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("# comment\nybl\n\nok*  # app prefix\n+hdfcbank\n")
+            registry = UpiHandleRegistry.from_file(path)
+        self.assertEqual((registry.handles, registry.banks, registry.app_prefixes),
+                         ({"ybl"}, {"hdfcbank"}, {"ok"}))
+        self.assertTrue(registry.is_known_handle("OKHDFCBANK"))
+        self.assertFalse(registry.is_known_handle("okybl"))
@@ -0,0 +1,84 @@
+import asyncio
+import unittest
+
+from fake_adb import FakeAdb, FakeAdbScenario, FakeDeviceCommands
+from metrics import metrics
+from upi_launcher import UPI_APPS, LaunchResult, UpiLauncher, build_payment_uri, parse_am_start, resolve_app
+
+_COLD_START = """Starting: Intent { act=android.intent.action.VIEW dat=phonepe://pay?... }
+Status: ok
+LaunchState: COLD
+Activity: com.phonepe.app/.PaymentActivity
+TotalTime: 1412
+WaitTime: 1430
+Complete
+"""
+_UNRESOLVED = """Starting: Intent { act=android.intent.action.VIEW dat=paytmmp://pay?... }
+Error: Activity not started, unable to resolve Intent { act=android.intent.action.VIEW dat=paytmmp://pay?... }
+"""
+
+
+class ParseAmStartTest(unittest.TestCase):
+
+    def test_successful_launch(self):
+        self.assertEqual(parse_am_start(_COLD_START), {
+            "Status": "ok", "LaunchState": "COLD", "Activity": "com.phonepe.app/.PaymentActivity",
+            "TotalTime": "1412", "WaitTime": "1430",
+        })
+
+    def test_error_is_reported_although_am_exits_zero(self):
+        fields = parse_am_start(_UNRESOLVED)
+        self.assertTrue(fields["Error"].startswith("Activity not started, unable to resolve Intent"))
+
+    def test_numbered_error_type(self):
+        fields = parse_am_start("Error type 3\nError: Activity class {net.one97.paytm/.Main} does not exist.\n")
+        self.assertEqual(fields["Error"], "Activity class {net.one97.paytm/.Main} does not exist.")
+        self.assertTrue(LaunchResult("paytm", False, error=fields["Error"]).app_missing)
+
+    def test_non_ok_status_is_an_error(self):
+        fields = parse_am_start("Status: timeout\nActivity: com.phonepe.app/.PaymentActivity\n")
+        self.assertEqual(fields["Error"], "Launch status timeout")
+        self.assertFalse(LaunchResult("phonepe", False, error=fields["Error"]).app_missing)
+
+
+class PaymentUriTest(unittest.TestCase):
+
+    def test_amount_and_payee_are_encoded(self):
+        uri = build_payment_uri(UPI_APPS["googlepay"], "ravi kumar@okaxis", 125050)
+        self.assertEqual(uri, "tez://upi/pay?pa=ravi%20kumar@okaxis&am=1250.50&tn=VoicePay%20Transaction&cu=INR")
+
+    def test_app_aliases(self):
+        self.assertEqual(resolve_app("GPay").key, "googlepay")
+        self.assertEqual(resolve_app("Phone Pay").key, "phonepe")
+        self.assertIsNone(resolve_app("Cred"))
+
+
+class UpiLauncherTest(unittest.TestCase):
+
+    def setUp(self):
+        scenario = FakeAdbScenario.lab(1, payment_delay=None)
+        self.package = scenario.devices[0].packages[0]
+        self.launcher = UpiLauncher(FakeDeviceCommands(FakeAdb(scenario)))
+
+    def _launches(self, app, outcome):
+        counters = metrics.snapshot()["counters"].get("voicepay_app_launches_total", [])
+        return sum(c["value"] for c in counters if c["labels"] == {"app": app, "outcome": outcome})
+
+    def test_launch_reports_start_up_time_and_counts_it(self):
+        app = next(app for app in UPI_APPS.values() if app.package == self.package)
+        before = self._launches(app.key, "ok")
+        launch = asyncio.run(self.launcher.launch(app, "ravi@okaxis", 25000, serial="emulator-5554"))
+        self.assertTrue(launch.ok)
+        self.assertEqual(launch.launch_state, "COLD")
+        self.assertIsNotNone(launch.total_time_ms)
+        self.assertEqual(self._launches(app.key, "ok"), before + 1)
+
+    def test_missing_app(self):
+        app = next(app for app in UPI_APPS.values() if app.package != self.package and app.key == "bhim")
+        launch = asyncio.run(self.launcher.launch(app, "ravi@okaxis", 25000, serial="emulator-5554"))
+        self.assertFalse(launch.ok)
+        self.assertTrue(launch.app_missing)
+
+    def test_amount_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            asyncio.run(self.launcher.launch(UPI_APPS["phonepe"], "ravi@okaxis", 0))
@@ -0,0 +1,152 @@
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+
+from memory_manager import MemoryWriter, VoicePayMemoryManager
+from user_stores import UserStorePool, user_store_dir
+
+
+class _Store:
+
+    def __init__(self, path):
+        self.path = path
+        self.thread = threading.current_thread()
+        self.closed = False
+        self.sized = 0
+
+    def close(self):
+        self.closed_on = threading.current_thread()
+        self.closed = True
+
+
+def _size(store):
+    store.sized += 1
+    return 100
+
+
+class UserStorePoolTest(unittest.TestCase):
+
+    def test_least_recently_used_store_is_closed(self):
+        pool = UserStorePool(_Store, "base", max_resident=2)
+        first = pool.get("a")
+        pool.get("b")
+        pool.get("a")
+        pool.get("c")
+        self.assertEqual(len(pool), 2)
+        self.assertFalse(first.closed)
+        self.assertIs(pool.get("a"), first)
+
+    def test_pinned_stores_are_not_evicted(self):
+        pool = UserStorePool(_Store, "base", max_resident=1)
+        pool.pin("a")
+        first = pool.get("a")
+        pool.get("b")
+        self.assertFalse(first.closed)
+        pool.release("a")
+        self.assertTrue(first.closed)
+
+    def test_release_waits_for_every_session(self):
+        pool = UserStorePool(_Store, "base")
+        pool.pin("a")
+        pool.pin("a")
+        store = pool.get("a")
+        pool.release("a")
+        self.assertFalse(store.closed)
+        pool.release("a")
+        self.assertTrue(store.closed)
+        self.assertEqual(len(pool), 0)
+
+    def test_sizes_only_computed_with_a_byte_budget(self):
+        pool = UserStorePool(_Store, "base", size_of=_size)
+        self.assertEqual(pool.get("a").sized, 0)
+        pool = UserStorePool(_Store, "base", max_bytes=150, size_of=_size)
+        first = pool.get("a")
+        pool.get("b")
+        self.assertTrue(first.closed)
+
+    def test_open_builds_the_store_off_the_event_loop(self):
+        pool = UserStorePool(_Store, "base")
+
+        async def scenario():
+            return await asyncio.gather(pool.open("a"), pool.open("a"))
+
+        first, second = asyncio.run(scenario())
+        self.assertIs(first, second)
+        self.assertIsNot(first.thread, threading.main_thread())
+        self.assertEqual(first.path, user_store_dir("base", "a"))
+        self.assertIs(pool.get("a"), first)
+
+    def test_cancelled_open_still_joins_the_pool(self):
+        pool = UserStorePool(_Store, "base")
+
+        async def scenario():
+            task = asyncio.ensure_future(pool.open("a"))
+            await asyncio.sleep(0)
+            task.cancel()
+            while not len(pool):
+                await asyncio.sleep(0.01)
+
+        asyncio.run(scenario())
+        self.assertEqual(len(pool), 1)
+
+
+    def test_evicted_stores_close_off_the_event_loop(self):
+        pool = UserStorePool(_Store, "base", max_resident=1)
+        first_closing = threading.Event()
+        release_close = threading.Event()
+
+        class _SlowStore(_Store):
+            def close(self):
+                first_closing.set()
+                release_close.wait(5)
+                super().close()
+
+        pool.factory = _SlowStore
+
+        async def scenario():
+            first = await pool.open("a")
+            await pool.open("b")
+            # The loop is not blocked by the slow close
+            self.assertTrue(first_closing.wait(5))
+            self.assertFalse(first.closed)
+            reopening = asyncio.ensure_future(pool.open("a"))
+            await asyncio.sleep(0.05)
+            # Reopening waits for the evicted store to finish closing
+            self.assertFalse(reopening.done())
+            release_close.set()
+            return first, await reopening
+
+        first, reopened = asyncio.run(scenario())
+        self.assertTrue(first.closed)
+        self.assertIsNot(first.closed_on, threading.main_thread())
+        self.assertIsNot(reopened, first)
+        pool.close_all()
+        self.assertTrue(reopened.closed)
+
+
+class SharedWriterTest(unittest.TestCase):
+
+    def test_one_writer_persists_several_stores(self):
+        writer = MemoryWriter(flush_interval=0.05)
+        with tempfile.TemporaryDirectory() as base:
+            stores = [VoicePayMemoryManager(os.path.join(base, name), write_behind=True, writer=writer)
+                      for name in ("a", "b")]
+            for store in stores:
+                store.add_memory(f"hello from {store.memory_dir}")
+            before = threading.active_count()
+            for store in stores:
+                store.close()
+            self.assertTrue(writer.running)
+            self.assertEqual(threading.active_count(), before)
+            reopened = [VoicePayMemoryManager(store.memory_dir) for store in stores]
+            self.assertEqual([len(store.memories) for store in reopened], [1, 1])
+            for store in reopened:
+                store.close()
+            writer.close()
+            self.assertFalse(writer.running)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,20 +2,261 @@ import logging
 import json
 import os
 import re
-import subprocess
+import time
+import asyncio
 import platform
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Tuple
-from livekit.agents import function_tool, RunContext
+from livekit.agents import function_tool as livekit_function_tool, RunContext
 import requests
-from memory_manager import VoicePayMemoryManager
+from memory_backends import create_backend
+from memory_manager import MemoryWriter, VoicePayMemory, VoicePayMemoryManager, open_configured_store
+from payee_registry import PayeeRegistry
+from user_stores import UserStorePool, DEFAULT_IDENTITY
+from adb_pool import AdbConnectionPool, AdbError, AdbUnavailableError
+from device_commands import DeviceCommands, DeviceCommandTimeout
+from device_registry import DeviceInfo, DeviceRegistry
+from upi_apps import InstalledAppCache, UPI_APP_PACKAGES
+from notification_watcher import TransactionStatus, TransactionWatcher
+from payment_extraction import extract_payment, format_rupees, to_paise
+from upi_handles import UpiHandleRegistry
+from upi_launcher import UpiLauncher, app_key, resolve_app
+from metrics import instrument_tool, metrics, tool_error
+from tracing import FileSpanExporter, OtlpHttpSpanExporter, trace_tool, tracer
+from config import config
 
 # Enhanced logging setup
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize memory manager for VoicePay
-memory_manager = VoicePayMemoryManager("voicepay_memory")
+def _call_identity(*args, **kwargs) -> Optional[str]:
+    """Session identity of a tool call, from its RunContext argument."""
+    context = kwargs.get("context")
+    if context is None:
+        context = next((arg for arg in args if hasattr(arg, "userdata")), None)
+    return _session_identity(context) if context is not None else None
+
+def function_tool(tool):
+    """Register a tool, recording its latency, outcome and adb/memory time and tracing it."""
+    return livekit_function_tool(instrument_tool(trace_tool(tool, _call_identity)))
+
+def start_metrics_exporters():
+    """Start the local metrics endpoint and JSON dump, as configured."""
+    if config.metrics_port:
+        metrics.serve(config.metrics_host, config.metrics_port)
+    if config.metrics_json_path:
+        metrics.start_json_dump(config.metrics_json_path, config.metrics_json_interval)
+
+def start_tracing():
+    """Install the configured span exporter; tracing stays disabled without one."""
+    if tracer.enabled:
+        return
+    if config.tracing_exporter == "file":
+        tracer.configure(FileSpanExporter(config.tracing_file_path))
+    elif config.tracing_exporter == "otlp":
+        tracer.configure(OtlpHttpSpanExporter(config.tracing_otlp_endpoint))
+
+@dataclass
+class SessionPrewarm:
+    """Device probes run for a session while its greeting is spoken."""
+    serial: Optional[str] = None                # Device the session was bound to
+    devices: Optional[List[DeviceInfo]] = None  # None if the device listing failed
+    finished_at: float = 0.0                    # Monotonic seconds
+
+@dataclass
+class VoicePaySessionData:
+    """Per-session state carried as the AgentSession userdata."""
+    identity: str = DEFAULT_IDENTITY  # User/room identity the session's stores are keyed by
+    device_serial: Optional[str] = None  # Pins the session to one phone, e.g. at a kiosk
+    prewarm: Optional[asyncio.Task] = None  # Resolves to a SessionPrewarm
+
+# One write-behind thread persists the memory writes of every resident user
+memory_writer = MemoryWriter(config.memory_flush_interval, config.memory_max_batch_size)
+
+def _open_memory_store(path: str) -> VoicePayMemoryManager:
+    # Writes are persisted off the event loop
+    return open_configured_store(
+        path,
+        write_behind=config.memory_write_behind,
+        max_batch_size=config.memory_max_batch_size,
+        writer=memory_writer,
+    )
+
+# Per-user memory stores and known-payee registries, opened lazily and
+# evicted under an LRU so resident memory tracks active users only
+memory_pool = UserStorePool(
+    _open_memory_store,
+    base_dir="voicepay_memory",
+    max_resident=config.memory_max_resident_users,
+    max_bytes=config.memory_max_resident_bytes,
+    size_of=VoicePayMemoryManager.estimated_bytes,
+)
+_RECORDED_RECIPIENT = re.compile(r"Recipient: (?P<recipient>.+?), Amount: ")
+
+def _recorded_payees(path: str) -> List[str]:
+    """Recipients of the payments recorded in a user's memory store."""
+    backend = create_backend(config.memory_backend, path)
+    try:
+        records = backend.load(VoicePayMemory)
+    finally:
+        backend.close()
+    matches = (_RECORDED_RECIPIENT.search(m.content) for m in records if m.type == "active_transaction")
+    return [match.group("recipient") for match in matches if match]
+
+def _open_payee_registry(path: str) -> PayeeRegistry:
+    registry = PayeeRegistry(path, use_bloom=config.payee_bloom_filter)
+    if registry.created:
+        # Users from before the registry existed keep their regular payees known
+        try:
+            seeded = registry.register_many(_recorded_payees(path))
+            logger.info(f"Seeded payee registry with {seeded} payees from payment history")
+        except Exception as e:
+            logger.error(f"Error seeding payee registry: {e}")
+    return registry
+
+payee_pool = UserStorePool(
+    _open_payee_registry,
+    base_dir="voicepay_memory",
+    max_resident=config.memory_max_resident_users,
+)
+
+def _session_data(context: RunContext) -> Optional[VoicePaySessionData]:
+    try:
+        return context.userdata
+    except (AttributeError, ValueError):
+        # Session started without VoicePaySessionData
+        return None
+
+def _session_identity(context: RunContext) -> str:
+    """Return the identity of the user the tool call belongs to."""
+    return getattr(_session_data(context), "identity", None) or DEFAULT_IDENTITY
+
+async def _acquire_device(identity: str, preferred: Optional[str]) -> Optional[str]:
+    return await device_registry.acquire(identity, preferred or config.adb_device_serial or None)
+
+async def _session_device(context: RunContext) -> Optional[str]:
+    """Return the serial of the device the calling session's commands go to."""
+    preferred = getattr(_session_data(context), "device_serial", None)
+    return await _acquire_device(_session_identity(context), preferred)
+
+async def _prewarm_session(session_data: VoicePaySessionData) -> SessionPrewarm:
+    started = time.monotonic()
+    warm = SessionPrewarm()
+    # The device listing is needed to bind a device; the rest runs concurrently
+    warm.serial = await _acquire_device(session_data.identity, session_data.device_serial)
+    # Opening the user's stores reads them from disk, on worker threads
+    probes = {
+        "device listing": device_registry.devices(),
+        "memory store": _memory_store(session_data.identity),
+        "payee registry": payee_pool.open(session_data.identity),
+    }
+    if warm.serial is not None:
+        # Fills the app cache, where tool calls read it
+        probes["app detection"] = upi_app_cache.get(warm.serial)
+    results = dict(zip(probes, await asyncio.gather(*probes.values(), return_exceptions=True)))
+    for name, result in results.items():
+        if isinstance(result, Exception):
+            logger.info(f"Session prewarm {name} unavailable: {result}")
+    warm.devices = results["device listing"] if isinstance(results["device listing"], list) else None
+    warm.finished_at = time.monotonic()
+    logger.info(f"Session {session_data.identity} prewarmed in {(warm.finished_at - started) * 1000:.0f} ms")
+    return warm
+
+def start_session_prewarm(session_data: VoicePaySessionData) -> asyncio.Task:
+    """Start device checks, app detection and the user's stores for a session.
+
+    Runs in the background; the first tool calls use its results instead of
+    querying the device again.
+    """
+    # The session's stores stay resident until release_session_stores
+    memory_pool.pin(session_data.identity)
+    payee_pool.pin(session_data.identity)
+    session_data.prewarm = asyncio.ensure_future(_prewarm_session(session_data))
+    return session_data.prewarm
+
+async def _prewarmed(context: RunContext) -> Optional[SessionPrewarm]:
+    """Return the session's prewarm results while they are fresh, waiting if still running."""
+    task = getattr(_session_data(context), "prewarm", None)
+    if task is None or task.cancelled():
+        return None
+    try:
+        # A tool called mid-prewarm joins it rather than querying again
+        warm = await asyncio.shield(task)
+    except Exception:
+        return None
+    if time.monotonic() - warm.finished_at > config.session_prewarm_ttl:
+        return None
+    return warm
+
+async def _memory_store(identity: str) -> VoicePayMemoryManager:
+    store = await memory_pool.open(identity)
+    # Sensitive items are removed at their deadlines while the session runs
+    store.start_expiry_task()
+    return store
+
+async def _memory(context: RunContext) -> VoicePayMemoryManager:
+    """Return the memory store for the calling session's user."""
+    return await _memory_store(_session_identity(context))
+
+async def _payees(context: RunContext) -> PayeeRegistry:
+    """Return the known-payee registry for the calling session's user."""
+    return await payee_pool.open(_session_identity(context))
+
+# Payee of each session's payment in progress; known once the payment succeeds
+_pending_payees: Dict[str, str] = {}
+
+def _on_transaction_outcome(identity: str, status: TransactionStatus):
+    payee = _pending_payees.pop(identity, None)
+    if payee is not None and status.outcome == "success":
+        payee_pool.get(identity).register(payee)
+
+def release_session_stores(identity: str):
+    """Unpin a user's stores once their session has ended, closing them if no other session uses them."""
+    _pending_payees.pop(identity, None)
+    memory_pool.release(identity)
+    payee_pool.release(identity)
+    transaction_watcher.release(identity)
+    device_registry.release(identity)
+    tracer.end_session(identity)
+
+if config.adb_fake_scenario:
+    # Simulated phones for load tests and CI runs without devices; the test
+    # harness is only imported when asked for
+    from fake_adb import fake_device_commands
+    adb = fake_device_commands(config.adb_fake_scenario, streams_per_device=config.adb_streams_per_device,
+                               default_timeout=config.adb_command_timeout)
+    adb_pool = adb.pool
+else:
+    # Long-lived device connections shared by all sessions in the worker
+    adb_pool = AdbConnectionPool(
+        server_host=config.adb_server_host,
+        server_port=config.adb_server_port,
+        direct_addresses=config.adb_direct_addresses,
+        adb_key_path=config.adb_key_path or None,
+        command_timeout=config.adb_command_timeout,
+        health_check_interval=config.adb_health_check_interval,
+        streams_per_device=config.adb_streams_per_device,
+    )
+    
+    # All ADB interactions go through the async command layer so a slow
+    # device never blocks the event loop
+    adb = DeviceCommands(adb_pool, default_timeout=config.adb_command_timeout)
+
+# Every connected phone; each session is bound to one and targets it with its serial
+device_registry = DeviceRegistry(adb, refresh_interval=config.device_refresh_interval)
+
+# Installed UPI apps per device, refreshed after the TTL or on invalidation
+upi_app_cache = InstalledAppCache(adb, ttl=config.upi_app_cache_ttl)
+
+# Background notification watchers; transaction outcomes are pushed per session
+transaction_watcher = TransactionWatcher(adb, on_outcome=_on_transaction_outcome)
+
+# Payment intents, with per-app launch success and start-up times
+upi_launcher = UpiLauncher(adb)
+
+# Known UPI handles, loaded once; edit upi_handles.txt to add a provider
+upi_handles = UpiHandleRegistry.from_file(config.upi_handles_path or None)
 
 @function_tool
 async def detect_installed_upi_apps(context: RunContext) -> str:
@@ -24,56 +265,28 @@ async def detect_installed_upi_apps(context: RunContext) -> str:
     Uses Android package manager to check for real installed apps.
     """
     try:
-        # Common UPI app package names for Android
-        upi_app_packages = {
-            "com.phonepe.app": "PhonePe",
-            "com.google.android.apps.nbu.paisa.user": "Google Pay",
-            "net.one97.paytm": "Paytm",
-            "com.amazon.amazonpayments": "Amazon Pay",
-            "com.mobikwik.mobile": "MobiKwik",
-            "in.org.npci.upiapp": "BHIM UPI",
-            "com.freecharge.android": "Freecharge",
-            "com.axis.mobile": "Axis Pay",
-            "com.sbi.upi": "SBI Pay",
-            "com.icici.iciciappathon": "iMobile Pay",
-            "com.csam.icici.bank.imobile": "iMobile by ICICI",
-            "com.snapwork.hdfc": "HDFC Bank MobileBanking",
-            "com.konylabs.cbapp": "City Union Bank",
-            "com.rbl.rblmobilebanking": "RBL MyCard"
-        }
-        
-        detected_apps = []
-        
         # Check if running on Android (using adb or direct package manager)
         try:
-            # Try using ADB if available
-            result = subprocess.run(['adb', 'shell', 'pm', 'list', 'packages'], 
-                                  capture_output=True, text=True, timeout=10)
-            
-            if result.returncode == 0:
-                installed_packages = result.stdout.lower()
-                for package, app_name in upi_app_packages.items():
-                    if f"package:{package}" in installed_packages:
-                        detected_apps.append(app_name)
-            else:
-                # Fallback: Try to detect using alternative methods
-                logger.warning("ADB not available, using alternative detection")
-                return await _detect_apps_alternative_method(upi_app_packages)
-                
-        except (subprocess.TimeoutExpired, FileNotFoundError):
+            # Usually cached while the greeting was spoken; a detection still
+            # running is joined, and an invalidated entry is queried again
+            detected_apps = await upi_app_cache.get(await _session_device(context))
+        except AdbError as e:
             # ADB not available or timeout, try alternative methods
             logger.info("ADB not available, using alternative detection methods")
-            return await _detect_apps_alternative_method(upi_app_packages)
+            tool_error(e)
+            return await _detect_apps_alternative_method(UPI_APP_PACKAGES)
         
         if detected_apps:
             apps_list = ", ".join(detected_apps)
-            memory_manager.add_memory(f"Detected UPI apps: {apps_list}", "app_detection")
+            memory = await _memory(context)
+            memory.add_memory(f"Detected UPI apps: {apps_list}", "app_detection")
             return f"I have detected the following UPI applications on your device, Sir: {apps_list}. Which application would you prefer to use for your transaction?"
         else:
             return "I'm afraid I could not detect any UPI applications on your device, Sir. Please ensure you have a UPI app installed such as PhonePe, Google Pay, or Paytm, and that USB debugging is enabled if using ADB."
             
     except Exception as e:
         logger.error("Error detecting UPI apps: %s", e)
+        tool_error(e)
         return "I encountered an error while checking for UPI applications, Sir. Please ensure your device is properly connected and USB debugging is enabled."
 
 async def _detect_apps_alternative_method(upi_app_packages: dict) -> str:
@@ -94,6 +307,7 @@ async def _detect_apps_alternative_method(upi_app_packages: dict) -> str:
                 
     except Exception as e:
         logger.error("Error in alternative app detection: %s", e)
+        tool_error(e)
         return "Please manually tell me which UPI app you'd like to use, Sir."
 
 @function_tool
@@ -106,58 +320,31 @@ async def extract_payment_details(voice_command: str, context: RunContext) -> st
         voice_command: The user's voice command containing payment details
     """
     try:
-        # Enhanced patterns for extracting payment information
-        amount_patterns = [
-            r'(?:pay|send|transfer)\s+(?:rs\.?|rupees?|₹)\s*(\d+(?:,\d{3})*(?:\.\d{2})?)',
-            r'(?:pay|send|transfer)\s+(\d+(?:,\d{3})*(?:\.\d{2})?)\s*(?:rs\.?|rupees?|₹)',
-            r'(\d+(?:,\d{3})*(?:\.\d{2})?)\s*(?:rs\.?|rupees?|₹)',
-            r'₹\s*(\d+(?:,\d{3})*(?:\.\d{2})?)'
-        ]
-        
-        # Enhanced recipient patterns to capture UPI IDs
-        recipient_patterns = [
-            r'(?:to|pay)\s+([a-zA-Z0-9._-]+@[a-zA-Z0-9.-]+)',  # UPI ID pattern
-            r'(?:to|pay)\s+([a-zA-Z\s]+?)(?:\s+(?:rs\.?|rupees?|₹|\d))',
-            r'(?:to|pay)\s+([a-zA-Z\s]+?)$',
-            r'([a-zA-Z0-9._-]+@[a-zA-Z0-9.-]+)',  # Direct UPI ID
-            r'([a-zA-Z\s]+?)\s+(?:rs\.?|rupees?|₹|\d)',
-        ]
-        
-        amount = None
-        recipient = None
-        
-        # Extract amount
-        for pattern in amount_patterns:
-            match = re.search(pattern, voice_command.lower())
-            if match:
-                amount = match.group(1).replace(',', '')
-                break
-        
-        # Extract recipient
-        for pattern in recipient_patterns:
-            match = re.search(pattern, voice_command, re.IGNORECASE)
-            if match:
-                potential_recipient = match.group(1).strip()
-                
-                # Check if it's a UPI ID
-                if '@' in potential_recipient:
-                    # Validate UPI ID format
-                    if await _validate_upi_id(potential_recipient):
-                        recipient = potential_recipient
-                    else:
-                        return f"The UPI ID '{potential_recipient}' appears to be invalid, Sir. Please provide a valid UPI ID in the format 'name@bank' or 'mobile@upi'."
-                else:
-                    recipient = potential_recipient.title()
-                break
+        # Single pass over the utterance with precompiled patterns
+        details = extract_payment(voice_command)
+        amount = details.amount
+        recipient = details.recipient
+        
+        # Check if it's a UPI ID; later steps use its canonical form
+        if details.recipient_kind == "vpa":
+            vpa = await _validate_upi_id(recipient)
+            if vpa is None:
+                return f"The UPI ID '{recipient}' appears to be invalid, Sir. Please provide a valid UPI ID in the format 'name@bank' or 'mobile@upi'."
+            recipient = vpa
         
         # Store in memory
         if amount and recipient:
+            # Everything until the outcome notification is traced as this payment
+            tracer.begin_payment(_session_identity(context), **{
+                "utterance.words": len(voice_command.split()),
+                "payment.recipient_kind": details.recipient_kind,
+            })
             payment_details = f"Amount: ₹{amount}, Recipient: {recipient}"
-            memory_manager.add_memory(payment_details, "payment_details")
+            memory = await _memory(context)
+            memory.add_memory(payment_details, "payment_details")
             
             # Check if amount is large (>10,000) for safety confirmation
-            amount_float = float(amount)
-            if amount_float > 10000:
+            if details.amount_paise > 10000 * 100:
                 return f"Very well, Sir. I have extracted the payment details: ₹{amount} to {recipient}. Since this is a substantial amount exceeding ₹10,000, please confirm by saying 'yes' to proceed or 'no' to modify the details."
             else:
                 return f"Certainly, Sir. I have extracted the payment details: ₹{amount} to {recipient}. Shall I proceed with this transaction?"
@@ -173,43 +360,20 @@ async def extract_payment_details(voice_command: str, context: RunContext) -> st
             
     except Exception as e:
         logger.error("Error extracting payment details: %s", e)
+        tool_error(e)
         return "I encountered an error while processing your payment details, Sir. Please try again."
 
-async def _validate_upi_id(upi_id: str) -> bool:
+async def _validate_upi_id(upi_id: str) -> Optional[str]:
     """
-    Validate UPI ID format and check if it's potentially valid.
+    Validate UPI ID format and check that its handle belongs to a known provider.
     
     Args:
         upi_id: The UPI ID to validate
+    
+    Returns:
+        The normalized UPI ID, or None if it is invalid
     """
-    try:
-        # Basic UPI ID format validation
-        upi_pattern = r'^[a-zA-Z0-9._-]+@[a-zA-Z0-9.-]+$'
-        
-        if not re.match(upi_pattern, upi_id):
-            return False
-        
-        # Check for common UPI handles
-        valid_handles = [
-            'paytm', 'phonepe', 'googlepay', 'gpay', 'amazonpay', 'mobikwik',
-            'freecharge', 'airtel', 'jio', 'barodampay', 'hdfcbank', 'sbi',
-            'icici', 'axisbank', 'yesbank', 'pnb', 'upi', 'bhim', 'ibl',
-            'federal', 'kotak', 'cub', 'rbl', 'indianbank', 'canarabank'
-        ]
-        
-        handle = upi_id.split('@')[1].lower()
-        
-        # Allow if it matches known handles or looks like a bank domain
-        if any(known_handle in handle for known_handle in valid_handles):
-            return True
-        
-        # Additional validation could include API calls to check UPI ID validity
-        # For now, we'll accept any properly formatted UPI ID
-        return True
-        
-    except Exception as e:
-        logger.error("Error validating UPI ID: %s", e)
-        return False
+    return upi_handles.validate(upi_id)
 
 @function_tool
 async def detect_linked_bank_accounts(selected_app: str, context: RunContext) -> str:
@@ -236,14 +400,26 @@ async def detect_linked_bank_accounts(selected_app: str, context: RunContext) ->
         app_key = selected_app.lower().replace(" ", "").replace("-", "")
         guidance = app_guidance.get(app_key, f"Please check your linked bank accounts within {selected_app}")
         
-        memory_manager.add_memory(f"Bank account guidance for {selected_app}", "bank_accounts")
+        memory = await _memory(context)
+        
+        memory.add_memory(f"Bank account guidance for {selected_app}", "bank_accounts")
         
         return f"For security reasons, Sir, I cannot directly access your bank account information. {guidance} Once you've selected your preferred account, please let me know and I shall assist with the payment process."
             
     except Exception as e:
         logger.error("Error with bank account guidance: %s", e)
+        tool_error(e)
         return "Please check your bank accounts within your chosen UPI app, Sir, and let me know when you're ready to proceed."
 
+def _amount_paise(amount: str) -> Optional[int]:
+    """Paise in an amount such as "1,500.50", "₹500" or "500 rupees"; None if there is none."""
+    try:
+        paise = to_paise(amount.strip().lstrip("₹").strip())
+    except ValueError:
+        # Currency words or a spoken amount, read as in a payment command
+        paise = extract_payment(amount).amount_paise
+    return paise or None
+
 @function_tool
 async def open_upi_app_with_details(app_name: str, recipient: str, amount: str, context: RunContext) -> str:
     """
@@ -255,71 +431,83 @@ async def open_upi_app_with_details(app_name: str, recipient: str, amount: str,
         recipient: Recipient UPI ID or VPA
         amount: Payment amount
     """
+    # An amount the intent cannot carry is the user's to correct, not an app failure
+    amount_paise = _amount_paise(amount)
+    if amount_paise is None:
+        return f"I could not understand the amount '{amount}', Sir. Please tell me how many rupees you wish to pay, for example 500 or 1,250.50."
+    amount = format_rupees(amount_paise)
     try:
-        # Real UPI deep link patterns following UPI specification
-        upi_deep_links = {
-            "phonepe": f"phonepe://pay?pa={recipient}&am={amount}&tn=VoicePay Transaction&cu=INR",
-            "google pay": f"tez://upi/pay?pa={recipient}&am={amount}&tn=VoicePay Transaction&cu=INR",
-            "googlepay": f"tez://upi/pay?pa={recipient}&am={amount}&tn=VoicePay Transaction&cu=INR", 
-            "paytm": f"paytmmp://pay?pa={recipient}&am={amount}&tn=VoicePay Transaction&cu=INR",
-            "bhim": f"bhim://pay?pa={recipient}&am={amount}&tn=VoicePay Transaction&cu=INR",
-            "amazon pay": f"amazonpay://pay?pa={recipient}&am={amount}&tn=VoicePay Transaction&cu=INR",
-            "mobikwik": f"mobikwik://pay?pa={recipient}&am={amount}&tn=VoicePay Transaction&cu=INR"
-        }
-        
-        app_key = app_name.lower().replace(" ", "").replace("-", "")
+        app = resolve_app(app_name)
+        if app is None:
+            return await _provide_manual_payment_instructions(app_name, recipient, amount_paise, context, reason="unsupported_app")
         
+        serial = None
         try:
-            if app_key in upi_deep_links:
-                deep_link = upi_deep_links[app_key]
-                
-                # Try to open the app using Android intent via ADB
-                adb_command = f'adb shell am start -W -a android.intent.action.VIEW -d "{deep_link}"'
-                result = subprocess.run(adb_command.split(), capture_output=True, text=True, timeout=10)
-                
-                if result.returncode == 0:
-                    # Store transaction details in memory
-                    transaction_details = f"App: {app_name}, Recipient: {recipient}, Amount: ₹{amount}"
-                    memory_manager.add_memory(transaction_details, "active_transaction")
-                    
-                    return f"Excellent, Sir. I have successfully opened {app_name} with the payment details: ₹{amount} to {recipient}. The app should now display the payment screen. Please review the details and complete the transaction with your UPI PIN."
-                else:
-                    # Fallback to manual instruction
-                    return await _provide_manual_payment_instructions(app_name, recipient, amount)
-                    
-            else:
-                return await _provide_manual_payment_instructions(app_name, recipient, amount)
-                
-        except (subprocess.TimeoutExpired, FileNotFoundError):
-            # ADB not available, provide manual instructions
-            return await _provide_manual_payment_instructions(app_name, recipient, amount)
+            # Intent sent as an argument vector; the report carries launch timing
+            serial = await _session_device(context)
+            launch = await upi_launcher.launch(app, recipient, amount_paise, serial=serial)
+        except AdbError as e:
+            # ADB not available or the device went away; its app list is re-read on reconnect
+            tool_error(e)
+            if serial is not None:
+                upi_app_cache.invalidate(serial)
+            return await _provide_manual_payment_instructions(app_name, recipient, amount_paise, context, reason="adb_unavailable")
+        
+        if launch.ok:
+            # Store transaction details in memory
+            transaction_details = f"App: {app_name}, Recipient: {recipient}, Amount: ₹{amount}"
+            memory = await _memory(context)
+            memory.add_memory(transaction_details, "active_transaction")
+            # The payee only becomes known once the watcher sees the payment succeed
+            _pending_payees[_session_identity(context)] = recipient
+            transaction_watcher.expect(_session_identity(context), serial, app.package, amount_paise)
+            tracer.mark_payment(_session_identity(context), "payment.time_to_screen_ms")
+            tracer.mark_payment(_session_identity(context), "payment.app", app.key)
+            
+            return f"Excellent, Sir. I have successfully opened {app_name} with the payment details: ₹{amount} to {recipient}. The app should now display the payment screen. Please review the details and complete the transaction with your UPI PIN."
+        
+        if launch.app_missing:
+            # The app was uninstalled since it was detected
+            upi_app_cache.invalidate(serial)
+        # Fallback to manual instruction
+        return await _provide_manual_payment_instructions(app_name, recipient, amount_paise, context, reason="launch_failed")
         
     except Exception as e:
         logger.error("Error opening UPI app: %s", e)
-        return await _provide_manual_payment_instructions(app_name, recipient, amount)
+        tool_error(e)
+        return await _provide_manual_payment_instructions(app_name, recipient, amount_paise, context, reason="error")
 
-async def _provide_manual_payment_instructions(app_name: str, recipient: str, amount: str) -> str:
+async def _provide_manual_payment_instructions(app_name: str, recipient: str, amount_paise: int, context: RunContext,
+                                               reason: str = "unknown") -> str:
     """
     Provide manual instructions when automatic app opening fails.
     """
+    metrics.inc("voicepay_manual_fallbacks_total", reason=reason)
+    amount = format_rupees(amount_paise)
+    app = resolve_app(app_name)
     try:
         transaction_details = f"App: {app_name}, Recipient: {recipient}, Amount: ₹{amount}"
-        memory_manager.add_memory(transaction_details, "active_transaction")
+        memory = await _memory(context)
+        memory.add_memory(transaction_details, "active_transaction")
+        _pending_payees[_session_identity(context)] = recipient
+        # Outcome notifications are picked up as soon as they are posted
+        transaction_watcher.expect(_session_identity(context), await _session_device(context),
+                                   app.package if app is not None else None, amount_paise)
         
         instructions = {
             "phonepe": "1. Open PhonePe app\n2. Tap 'Send Money'\n3. Enter UPI ID or scan QR\n4. Enter amount and verify details\n5. Complete with UPI PIN",
-            "google pay": "1. Open Google Pay\n2. Tap 'Pay' or 'Send'\n3. Enter UPI ID or mobile number\n4. Enter amount and add note\n5. Complete with UPI PIN",
+            "googlepay": "1. Open Google Pay\n2. Tap 'Pay' or 'Send'\n3. Enter UPI ID or mobile number\n4. Enter amount and add note\n5. Complete with UPI PIN",
             "paytm": "1. Open Paytm app\n2. Tap 'Pay' or 'Send Money'\n3. Enter mobile number or UPI ID\n4. Enter amount and proceed\n5. Complete with UPI PIN",
             "bhim": "1. Open BHIM UPI app\n2. Tap 'Send Money'\n3. Enter VPA (UPI ID)\n4. Enter amount and verify\n5. Complete with UPI PIN"
         }
         
-        app_key = app_name.lower().replace(" ", "").replace("-", "")
-        instruction = instructions.get(app_key, f"Please open {app_name} and navigate to the payment section")
+        instruction = instructions.get(app.key if app else app_key(app_name), f"Please open {app_name} and navigate to the payment section")
         
         return f"Please follow these steps to complete your payment of ₹{amount} to {recipient}, Sir:\n\n{instruction}\n\nI shall wait while you complete the transaction. Please let me know once it's done."
         
     except Exception as e:
         logger.error("Error providing manual instructions: %s", e)
+        tool_error(e)
         return f"Please open {app_name} manually and send ₹{amount} to {recipient}, Sir. I shall assist you with any questions."
 
 @function_tool
@@ -331,17 +519,21 @@ async def verify_transaction_safety(amount: str, recipient: str, context: RunCon
         amount: Payment amount
         recipient: Recipient name or UPI ID
     """
+    # Read like open_upi_app_with_details, so "₹500" or "five hundred" are checked too
+    amount_paise = _amount_paise(amount)
+    if amount_paise is None:
+        return f"I could not understand the amount '{amount}', Sir. Please tell me how many rupees you wish to pay, for example 500 or 1,250.50."
+    amount = format_rupees(amount_paise)
     try:
-        amount_float = float(amount.replace(',', ''))
         warnings = []
         
         # Check for large amount
-        if amount_float > 10000:
+        if amount_paise > 10000 * 100:
             warnings.append(f"This is a substantial amount of ₹{amount}")
         
-        # Check if recipient is new (not in recent memory)
-        recent_recipients = memory_manager.search_memories(recipient, limit=5)
-        if not recent_recipients:
+        # Check if recipient is new (never paid before)
+        payees = await _payees(context)
+        if not payees.is_known(recipient):
             warnings.append(f"This appears to be a new payee: {recipient}")
         
         if warnings:
@@ -352,6 +544,7 @@ async def verify_transaction_safety(amount: str, recipient: str, context: RunCon
             
     except Exception as e:
         logger.error("Error in safety verification: %s", e)
+        tool_error(e)
         return "I encountered an error during the security check, Sir. Please verify the transaction details manually before proceeding."
 
 @function_tool
@@ -378,12 +571,14 @@ async def provide_transaction_guidance(step: str, context: RunContext) -> str:
         }
         
         guidance = guidance_steps.get(step, "I am here to assist you through each step of the payment process, Sir.")
-        memory_manager.add_memory(f"Guidance provided: {step}", "transaction_guidance")
+        memory = await _memory(context)
+        memory.add_memory(f"Guidance provided: {step}", "transaction_guidance")
         
         return guidance
         
     except Exception as e:
         logger.error("Error providing guidance: %s", e)
+        tool_error(e)
         return "I am here to assist you, Sir. Please let me know how I may help with your transaction."
 
 @function_tool
@@ -396,7 +591,8 @@ async def handle_non_upi_requests(request: str, context: RunContext) -> str:
     """
     try:
         # Log the non-UPI request
-        memory_manager.add_memory(f"Non-UPI request: {request}", "declined_requests")
+        memory = await _memory(context)
+        memory.add_memory(f"Non-UPI request: {request}", "declined_requests")
         
         polite_responses = [
             "That feature shall be integrated in future, Sir. At present, I can assist only with UPI transactions.",
@@ -415,6 +611,7 @@ async def handle_non_upi_requests(request: str, context: RunContext) -> str:
             
     except Exception as e:
         logger.error("Error handling non-UPI request: %s", e)
+        tool_error(e)
         return "That feature shall be integrated in future, Sir. At present, I can assist only with UPI transactions."
 
 @function_tool
@@ -424,14 +621,17 @@ async def get_transaction_status(context: RunContext) -> str:
     or transaction logs where possible.
     """
     try:
-        # Try to get recent transaction status from Android notifications
-        transaction_status = await _check_transaction_notifications()
+        # Latest outcome pushed by the notification watcher
+        transaction_status = transaction_watcher.status(_session_identity(context))
         
-        if transaction_status:
-            return transaction_status
+        if transaction_status is not None:
+            if transaction_status.outcome == "success":
+                return "I noticed a successful transaction notification, Sir. Your payment appears to have been completed successfully."
+            return "I noticed a failed transaction notification, Sir. It appears there was an issue with your payment. Would you like to retry?"
         
         # Fallback to memory-based status
-        recent_transactions = memory_manager.get_memories("active_transaction", limit=1)
+        memory = await _memory(context)
+        recent_transactions = memory.get_memories("active_transaction", limit=1)
         
         if recent_transactions:
             transaction_details = recent_transactions[0].content
@@ -441,46 +641,9 @@ async def get_transaction_status(context: RunContext) -> str:
             
     except Exception as e:
         logger.error("Error getting transaction status: %s", e)
+        tool_error(e)
         return "I am ready to assist you with any UPI payment needs, Sir. How may I help you today?"
 
-async def _check_transaction_notifications() -> Optional[str]:
-    """
-    Check Android notifications for UPI transaction status.
-    Uses ADB to read recent notifications related to UPI transactions.
-    """
-    try:
-        # Try to read notification log via ADB
-        adb_command = ['adb', 'shell', 'dumpsys', 'notification', '--noredact']
-        result = subprocess.run(adb_command, capture_output=True, text=True, timeout=15)
-        
-        if result.returncode == 0:
-            notification_data = result.stdout.lower()
-            
-            # Look for UPI transaction keywords in notifications
-            upi_keywords = ['upi', 'payment', 'transaction', 'transferred', 'received', 'failed', 'success']
-            app_keywords = ['phonepe', 'paytm', 'googlepay', 'bhim', 'amazonpay']
-            
-            # Split into recent notifications (last 100 lines for performance)
-            recent_notifications = notification_data.split('\n')[-100:]
-            
-            for line in recent_notifications:
-                if any(keyword in line for keyword in upi_keywords):
-                    if any(app in line for app in app_keywords):
-                        # Found a UPI-related notification
-                        if 'success' in line or 'transferred' in line or 'sent' in line:
-                            return "I noticed a successful transaction notification, Sir. Your payment appears to have been completed successfully."
-                        elif 'failed' in line or 'error' in line or 'declined' in line:
-                            return "I noticed a failed transaction notification, Sir. It appears there was an issue with your payment. Would you like to retry?"
-                        
-        return None
-        
-    except (subprocess.TimeoutExpired, FileNotFoundError):
-        # ADB not available
-        return None
-    except Exception as e:
-        logger.error("Error checking notifications: %s", e)
-        return None
-
 @function_tool
 async def clear_transaction_data(context: RunContext) -> str:
     """
@@ -488,11 +651,13 @@ async def clear_transaction_data(context: RunContext) -> str:
     """
     try:
         # Clear sensitive transaction data from memory
-        memory_manager.add_memory("Transaction data cleared for security", "security_action")
+        memory = await _memory(context)
+        memory.add_memory("Transaction data cleared for security", "security_action")
         return "Transaction data has been cleared for your security, Sir. How may I assist you with a new payment?"
         
     except Exception as e:
         logger.error("Error clearing transaction data: %s", e)
+        tool_error(e)
         return "Ready to assist with your next transaction, Sir."
 
 @function_tool
@@ -502,33 +667,36 @@ async def check_device_connection(context: RunContext) -> str:
     This ensures real-time UPI functionality is available.
     """
     try:
-        # Check if ADB is available
+        # Every phone on this host, listed over the adb server and direct connections
+        warm = await _prewarmed(context)
         try:
-            result = subprocess.run(['adb', 'version'], capture_output=True, text=True, timeout=5)
-            if result.returncode != 0:
-                return "ADB (Android Debug Bridge) is not installed or not working, Sir. For full real-time functionality, please install ADB and enable USB debugging on your Android device."
-        except FileNotFoundError:
+            devices = warm.devices if warm is not None and warm.devices is not None else await device_registry.devices(refresh=True)
+        except AdbUnavailableError as e:
+            tool_error(e)
             return "ADB (Android Debug Bridge) is not installed, Sir. For real-time UPI app integration, please install ADB tools and connect your Android device with USB debugging enabled."
-        
-        # Check if device is connected
-        try:
-            result = subprocess.run(['adb', 'devices'], capture_output=True, text=True, timeout=5)
-            if result.returncode == 0:
-                devices_output = result.stdout
-                if 'device' in devices_output and len(devices_output.split('\n')) > 2:
-                    # Device is connected
-                    memory_manager.add_memory("Android device connected via ADB", "device_status")
-                    return "Excellent, Sir! Your Android device is properly connected. I can now provide real-time UPI app integration including automatic app opening and transaction monitoring."
-                else:
-                    return "No Android device detected, Sir. Please connect your Android device via USB and ensure USB debugging is enabled in Developer Options for full functionality."
-            else:
-                return "Unable to check device connection, Sir. Please ensure your Android device is connected with USB debugging enabled."
-                
-        except subprocess.TimeoutExpired:
+        except DeviceCommandTimeout as e:
+            tool_error(e)
             return "Device connection check timed out, Sir. Please check your USB connection and try again."
+        except AdbError as e:
+            tool_error(e)
+            return "Unable to check device connection, Sir. Please ensure your Android device is connected with USB debugging enabled."
+        
+        if any(device.authorized for device in devices):
+            serial = await _session_device(context)
+            memory = await _memory(context)
+            memory.add_memory(f"Android device {serial} connected via ADB", "device_status")
+            connected = sum(device.authorized for device in devices)
+            if connected > 1:
+                return f"Excellent, Sir! {connected} Android devices are connected, and this session will use the device {serial}. I can now provide real-time UPI app integration including automatic app opening and transaction monitoring."
+            return "Excellent, Sir! Your Android device is properly connected. I can now provide real-time UPI app integration including automatic app opening and transaction monitoring."
+        elif devices:
+            return "Your Android device is connected but has not authorized this computer, Sir. Please unlock your phone and allow USB debugging when prompted."
+        else:
+            return "No Android device detected, Sir. Please connect your Android device via USB and ensure USB debugging is enabled in Developer Options for full functionality."
             
     except Exception as e:
         logger.error("Error checking device connection: %s", e)
+        tool_error(e)
         return "I can still assist with UPI payments using manual instructions, Sir. For automated app integration, please ensure ADB is set up and your Android device is connected."
 
 @function_tool 
@@ -568,9 +736,12 @@ Once set up, I can:
 Would you like me to check your current setup status, Sir?
 """
         
-        memory_manager.add_memory("Android setup instructions provided", "setup_guidance")
+        memory = await _memory(context)
+        
+        memory.add_memory("Android setup instructions provided", "setup_guidance")
         return setup_instructions
         
     except Exception as e:
         logger.error("Error providing setup instructions: %s", e)
+        tool_error(e)
         return "Please ensure ADB is installed and your Android device is connected for full functionality, Sir."
@@ -0,0 +1,325 @@
+"""
+Payment-flow tracing for the VoicePay UPI Assistant.
+
+A payment is traced end to end: the ``payment`` span opens when payment
+details are extracted and closes when the outcome notification arrives,
+with the tool calls of the session, and the adb commands and memory writes
+inside them, as child spans. Spans carry the LiveKit room and job so a
+trace can be matched to its session.
+
+Finished spans are exported in batches from a background thread, either
+as JSON lines to a local file or as OTLP/HTTP JSON to a collector. With no
+exporter configured, ``span`` returns a shared no-op and tracing costs a
+single attribute check per call.
+"""
+import json
+import time
+import queue
+import random
+import logging
+import functools
+import threading
+import contextvars
+import urllib.request
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "voicepay_current_span", default=None
+)
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    __slots__ = ("tracer", "trace_id", "span_id", "parent_id", "name", "start_ns",
+                 "end_ns", "attributes", "error", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, trace_id: str, parent_id: Optional[str],
+                 attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self._token = None
+
+    def set(self, key: str, value: Any):
+        """Set an attribute."""
+        self.attributes[key] = value
+
+    def end(self, error: Optional[str] = None):
+        """Finish the span and hand it to the exporter; later calls are ignored."""
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = error
+        self.tracer._export(self)
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        self.end(f"{exc_type.__name__}: {exc}" if exc_type is not None else None)
+        return False
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """The span in OTLP JSON form."""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # Internal
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class _NoopSpan:
+    """Stands in for a span when tracing is disabled."""
+
+    __slots__ = ()
+
+    def set(self, key: str, value: Any):
+        pass
+
+    def end(self, error: Optional[str] = None):
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class SpanExporter(ABC):
+    """Exports finished spans in batches from a background thread.
+
+    Args:
+        batch_size: Spans sent together at most.
+        flush_interval: Seconds a finished span waits for a batch to fill.
+        max_queue: Spans buffered before new ones are dropped.
+    """
+
+    def __init__(self, batch_size: int = 256, flush_interval: float = 2.0, max_queue: int = 10000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(max_queue)
+        self._thread = threading.Thread(target=self._run, name="voicepay-tracing", daemon=True)
+        self._thread.start()
+
+    def submit(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            span = self._queue.get()
+            if span is None:
+                return
+            batch = [span]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    span = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if span is None:
+                    stop = True
+                    break
+                batch.append(span)
+            try:
+                self.export(batch)
+            except Exception as e:
+                logger.warning(f"Could not export {len(batch)} spans: {e}")
+            if stop:
+                return
+
+    @abstractmethod
+    def export(self, spans: List[Span]):
+        """Send one batch of finished spans; called on the exporter thread."""
+
+    def shutdown(self, timeout: float = 5.0):
+        """Export what is queued and stop the thread."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+
+class FileSpanExporter(SpanExporter):
+    """Appends spans as JSON lines in OTLP span form."""
+
+    def __init__(self, path: str, **kwargs):
+        self.path = path
+        super().__init__(**kwargs)
+
+    def export(self, spans: List[Span]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_otlp()) + "\n")
+
+
+class OtlpHttpSpanExporter(SpanExporter):
+    """Posts spans to an OTLP/HTTP collector using the JSON encoding."""
+
+    def __init__(self, endpoint: str = "http://127.0.0.1:4318/v1/traces",
+                 service_name: str = "voicepay", timeout: float = 5.0, **kwargs):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def export(self, spans: List[Span]):
+        body = json.dumps({"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+            "scopeSpans": [{"scope": {"name": "voicepay"}, "spans": [span.to_otlp() for span in spans]}],
+        }]}).encode("utf-8")
+        request = urllib.request.Request(self.endpoint, data=body, method="POST",
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class Tracer:
+    """Creates spans and tracks each session's open payment trace."""
+
+    def __init__(self, exporter: Optional[SpanExporter] = None):
+        self.exporter = exporter
+        self._sessions: Dict[str, Dict[str, Any]] = {}  # identity -> session attributes
+        self._payments: Dict[str, Span] = {}            # identity -> open payment span
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def configure(self, exporter: Optional[SpanExporter]):
+        """Install an exporter (None disables tracing)."""
+        if self.exporter is not None:
+            self.exporter.shutdown()
+        self.exporter = exporter
+
+    def _export(self, span: Span):
+        if self.exporter is not None:
+            self.exporter.submit(span)
+
+    @staticmethod
+    def _new_trace_id() -> str:
+        return f"{random.getrandbits(128):032x}"
+
+    def span(self, name: str, identity: Optional[str] = None, **attributes):
+        """Return a span to use as a context manager.
+
+        The span is a child of the span current in this task, else of the
+        session's open payment, else the root of a new trace.
+        """
+        if self.exporter is None:
+            return NOOP_SPAN
+        parent = _current_span.get()
+        if parent is not None and parent.end_ns is not None:
+            # Inherited by a background task that outlived the span
+            parent = None
+        if parent is None and identity is not None:
+            parent = self._payments.get(identity)
+        if identity is not None:
+            attributes = {**self._sessions.get(identity, {}), **attributes}
+        if parent is None:
+            return Span(self, name, self._new_trace_id(), None, attributes)
+        return Span(self, name, parent.trace_id, parent.span_id, attributes)
+
+    def start_session(self, identity: str, **attributes):
+        """Record the attributes, e.g. room and job, that tag a session's spans."""
+        if self.exporter is not None:
+            self._sessions[identity] = {"session.id": identity, **attributes}
+
+    def end_session(self, identity: str):
+        """End a session, closing a payment it left open."""
+        self.end_payment(identity, "abandoned")
+        self._sessions.pop(identity, None)
+
+    def begin_payment(self, identity: str, **attributes):
+        """Open a new payment for a session, ending any previous one.
+
+        Begun inside a tool call, the payment is a child of the tool's span;
+        the session's later tool calls become children of the payment.
+        """
+        if self.exporter is None:
+            return
+        self.end_payment(identity, "superseded")
+        attributes = {**self._sessions.get(identity, {"session.id": identity}), **attributes}
+        current = _current_span.get()
+        if current is not None and current.end_ns is None:
+            payment = Span(self, "payment", current.trace_id, current.span_id, attributes)
+        else:
+            payment = Span(self, "payment", self._new_trace_id(), None, attributes)
+        self._payments[identity] = payment
+
+    def mark_payment(self, identity: str, key: str, value: Any = None):
+        """Set an attribute on the session's open payment; with no value, the milliseconds since it began."""
+        payment = self._payments.get(identity)
+        if payment is not None:
+            payment.set(key, value if value is not None else (time.time_ns() - payment.start_ns) // 1_000_000)
+
+    def end_payment(self, identity: str, outcome: str):
+        """Close a session's open payment with its outcome."""
+        payment = self._payments.pop(identity, None)
+        if payment is not None:
+            payment.set("payment.outcome", outcome)
+            payment.end(None if outcome in ("success", "superseded") else f"Payment {outcome}")
+
+    def close(self):
+        """Close open payments and flush the exporter."""
+        for identity in list(self._payments):
+            self.end_payment(identity, "abandoned")
+        self.configure(None)
+
+
+tracer = Tracer()
+
+
+def trace_tool(tool: Callable, identity_of: Callable[..., Optional[str]]) -> Callable:
+    """Wrap an async tool function in a span tagged with its session.
+
+    ``identity_of`` receives the call's arguments and returns the session
+    identity. The wrapper keeps the function's name, docstring and signature.
+    """
+    name = f"tool.{tool.__name__}"
+
+    @functools.wraps(tool)
+    async def wrapper(*args, **kwargs):
+        if tracer.exporter is None:
+            return await tool(*args, **kwargs)
+        with tracer.span(name, identity_of(*args, **kwargs)):
+            return await tool(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,99 @@
+"""
+Installed UPI app detection for the VoicePay UPI Assistant.
+
+Listing every package on a phone returns hundreds of KB of text, while
+VoicePay only cares about a handful of known UPI packages. Detection asks
+the device for those packages alone (the filtering runs on the device),
+and results are cached per device so repeated questions during a
+conversation are answered from memory.
+"""
+import time
+import shlex
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from adb_pool import AdbError
+from device_commands import DeviceCommands
+
+# Common UPI app package names for Android
+UPI_APP_PACKAGES: Dict[str, str] = {
+    "com.phonepe.app": "PhonePe",
+    "com.google.android.apps.nbu.paisa.user": "Google Pay",
+    "net.one97.paytm": "Paytm",
+    "com.amazon.amazonpayments": "Amazon Pay",
+    "com.mobikwik.mobile": "MobiKwik",
+    "in.org.npci.upiapp": "BHIM UPI",
+    "com.freecharge.android": "Freecharge",
+    "com.axis.mobile": "Axis Pay",
+    "com.sbi.upi": "SBI Pay",
+    "com.icici.iciciappathon": "iMobile Pay",
+    "com.csam.icici.bank.imobile": "iMobile by ICICI",
+    "com.snapwork.hdfc": "HDFC Bank MobileBanking",
+    "com.konylabs.cbapp": "City Union Bank",
+    "com.rbl.rblmobilebanking": "RBL MyCard"
+}
+
+
+class InstalledAppCache:
+    """Per-device cache of installed UPI apps.
+
+    Entries expire after ``ttl`` seconds and can be dropped early with
+    ``invalidate`` when the app set is known to have changed, e.g. a
+    launch failed because an app was uninstalled. Empty results are not
+    cached so a newly installed app is picked up on the next call.
+
+    Args:
+        commands: Device command layer used for detection.
+        packages: Package name to display name mapping to look for.
+        ttl: Seconds a detection result stays valid.
+        timeout: Timeout for the detection command.
+    """
+
+    def __init__(self, commands: DeviceCommands, packages: Optional[Dict[str, str]] = None,
+                 ttl: float = 300.0, timeout: float = 10.0):
+        self.commands = commands
+        self.packages = dict(packages or UPI_APP_PACKAGES)
+        self.ttl = ttl
+        self.timeout = timeout
+        self._entries: Dict[Optional[str], Tuple[float, List[str]]] = {}
+        self._pending: Dict[Optional[str], asyncio.Future] = {}
+        # Exact-line filter so only the known packages cross the wire
+        patterns = " ".join(f"-e {shlex.quote('package:' + package)}" for package in self.packages)
+        self._query = f"pm list packages | grep -F -x {patterns}"
+
+    async def get(self, serial: Optional[str] = None) -> List[str]:
+        """Return display names of the UPI apps installed on a device.
+
+        ``serial`` None means the default device. Raises ``AdbError`` if
+        the device cannot be queried.
+        """
+        entry = self._entries.get(serial)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+
+        # Concurrent misses for the same device share one query
+        pending = self._pending.get(serial)
+        if pending is None:
+            pending = asyncio.ensure_future(self._detect(serial))
+            self._pending[serial] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(serial, None))
+        return await asyncio.shield(pending)
+
+    async def _detect(self, serial: Optional[str]) -> List[str]:
+        result = await self.commands.shell(self._query, serial=serial, timeout=self.timeout)
+        # grep exits 1 when nothing matched
+        if result.returncode not in (0, 1):
+            raise AdbError(f"Package query failed with exit code {result.returncode}")
+        installed = {line.strip()[len("package:"):] for line in result.stdout.splitlines()}
+        apps = [name for package, name in self.packages.items() if package in installed]
+        if apps:
+            self._entries[serial] = (time.monotonic() + self.ttl, apps)
+        return apps
+
+    def invalidate(self, serial: Optional[str] = None):
+        """Forget the cached apps of a device (None for the default device)."""
+        self._entries.pop(serial, None)
+
+    def clear(self):
+        """Forget cached apps of every device."""
+        self._entries.clear()
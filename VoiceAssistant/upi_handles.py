@@ -0,0 +1,95 @@
+"""
+UPI handle registry for the VoicePay UPI Assistant.
+
+A UPI ID (VPA) is ``local@handle``, where the handle names the payment
+service provider. Known handles are loaded once from ``upi_handles.txt``
+into frozensets: exact handles, bank handles, and the app prefixes that
+may precede a bank handle (``ok`` + ``hdfcbank`` is ``okhdfcbank``). Only
+those combinations are accepted, so a look-alike such as ``fakesbi`` is
+not. A check costs a set probe plus one probe per prefix length, however
+many handles are registered, and results are memoized per normalized VPA.
+"""
+import os
+import re
+import logging
+from functools import lru_cache
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HANDLES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "upi_handles.txt")
+
+_LOCAL_PART = re.compile(r"[a-z0-9][a-z0-9._-]{0,255}")
+_HANDLE = re.compile(r"[a-z][a-z0-9.-]{1,63}")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_vpa(vpa: str) -> Optional[str]:
+    """Return the canonical form of a UPI ID, or None if it is malformed.
+
+    VPAs are case-insensitive, and spoken or typed input may contain stray
+    spaces ("john @ paytm") or trailing punctuation.
+    """
+    vpa = _WHITESPACE.sub("", vpa).lower().rstrip(".,!?")
+    local, at, handle = vpa.partition("@")
+    if not at or not _LOCAL_PART.fullmatch(local) or not _HANDLE.fullmatch(handle):
+        return None
+    return vpa
+
+
+class UpiHandleRegistry:
+    """Known UPI handles: exact names plus app-prefixed bank handles.
+
+    Args:
+        handles: Exact handles, e.g. ``ybl`` or ``paytm``.
+        banks: Bank handles, accepted alone and after an app prefix, e.g. ``hdfcbank``.
+        app_prefixes: Prefixes apps put before a bank handle, e.g. ``ok`` for ``okhdfcbank``.
+        cache_size: Number of validation results memoized.
+    """
+
+    def __init__(self, handles: Iterable[str] = (), banks: Iterable[str] = (),
+                 app_prefixes: Iterable[str] = (), cache_size: int = 4096):
+        self.handles = frozenset(handle.lower() for handle in handles)
+        self.banks = frozenset(bank.lower() for bank in banks)
+        self.app_prefixes = frozenset(prefix.lower() for prefix in app_prefixes if prefix)
+        self._prefix_lengths = sorted({len(prefix) for prefix in self.app_prefixes})
+        self._validate_cached = lru_cache(maxsize=cache_size)(self._validate)
+
+    @classmethod
+    def from_file(cls, path: Optional[str] = None, **kwargs) -> 'UpiHandleRegistry':
+        """Load a registry from a handle list (see ``upi_handles.txt``)."""
+        path = path or DEFAULT_HANDLES_PATH
+        handles, banks, app_prefixes = [], [], []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                entry = line.split("#", 1)[0].strip()
+                if entry.startswith("+"):
+                    banks.append(entry[1:])
+                elif entry.endswith("*"):
+                    app_prefixes.append(entry[:-1])
+                elif entry:
+                    handles.append(entry)
+        registry = cls(handles, banks, app_prefixes, **kwargs)
+        logger.info(f"Loaded {len(registry.handles)} UPI handles, {len(registry.banks)} bank handles "
+                    f"and {len(registry.app_prefixes)} app prefixes from {path}")
+        return registry
+
+    def is_known_handle(self, handle: str) -> bool:
+        """Whether a handle (the part after "@") belongs to a known provider."""
+        handle = handle.lower()
+        if handle in self.handles or handle in self.banks:
+            return True
+        return any(handle[:length] in self.app_prefixes and handle[length:] in self.banks
+                   for length in self._prefix_lengths)
+
+    def _validate(self, vpa: str) -> Optional[str]:
+        normalized = normalize_vpa(vpa)
+        if normalized is None:
+            return None
+        if not self.is_known_handle(normalized.rpartition("@")[2]):
+            return None
+        return normalized
+
+    def validate(self, vpa: str) -> Optional[str]:
+        """Return the normalized UPI ID if it is well formed and its handle is known."""
+        return self._validate_cached(vpa)
@@ -0,0 +1,172 @@
+"""
+Payment intent launcher for the VoicePay UPI Assistant.
+
+Each supported app has a UPI deep-link template whose fixed parts (scheme,
+transaction note, currency) are encoded once at import; a launch only
+URL-encodes the payee and amount. The intent is sent as an argument
+vector through ``am start -W``, whose report is parsed for the launch
+outcome and the app's start-up time. Launch outcomes and cold/warm start
+times are recorded per app in the process metrics.
+"""
+import re
+import time
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional
+from urllib.parse import quote, urlencode
+
+from device_commands import DeviceCommands
+from metrics import metrics
+from payment_extraction import format_rupees
+
+logger = logging.getLogger(__name__)
+
+TRANSACTION_NOTE = "VoicePay Transaction"
+_FIXED_PARAMS = "&" + urlencode({"tn": TRANSACTION_NOTE, "cu": "INR"}, quote_via=quote)
+
+_AM_FIELD = re.compile(r"^(Status|LaunchState|Activity|ThisTime|TotalTime|WaitTime): *(\S+)", re.MULTILINE)
+_AM_ERROR = re.compile(r"^Error(?: type \d+)?: *(.+)$", re.MULTILINE)
+# am errors meaning no installed app handles the intent
+_APP_MISSING = re.compile(r"unable to resolve|does not exist", re.IGNORECASE)
+_APP_KEY_CLEANUP = re.compile(r"[^a-z0-9]")
+
+
+def app_key(app_name: str) -> str:
+    """Normalize a spoken or displayed app name, e.g. ``"Google Pay"`` -> ``"googlepay"``."""
+    return _APP_KEY_CLEANUP.sub("", app_name.lower())
+
+
+@dataclass(frozen=True)
+class UpiApp:
+    """A UPI app that can be opened with a payment deep link."""
+    key: str
+    name: str
+    package: str
+    uri_prefix: str  # Deep link up to the query string
+
+
+UPI_APPS: Dict[str, UpiApp] = {
+    app.key: app for app in (
+        UpiApp("phonepe", "PhonePe", "com.phonepe.app", "phonepe://pay?"),
+        UpiApp("googlepay", "Google Pay", "com.google.android.apps.nbu.paisa.user", "tez://upi/pay?"),
+        UpiApp("paytm", "Paytm", "net.one97.paytm", "paytmmp://pay?"),
+        UpiApp("bhim", "BHIM UPI", "in.org.npci.upiapp", "bhim://pay?"),
+        UpiApp("amazonpay", "Amazon Pay", "com.amazon.amazonpayments", "amazonpay://pay?"),
+        UpiApp("mobikwik", "MobiKwik", "com.mobikwik.mobile", "mobikwik://pay?"),
+    )
+}
+# Other names the apps go by, normalized with app_key
+_ALIASES: Dict[str, str] = {
+    "gpay": "googlepay", "tez": "googlepay", "google": "googlepay",
+    "bhimupi": "bhim", "amazon": "amazonpay", "amazonupi": "amazonpay",
+    "phonepay": "phonepe", "paytmupi": "paytm",
+}
+
+
+def resolve_app(app_name: str) -> Optional[UpiApp]:
+    """Return the launchable app a name refers to, if any."""
+    key = app_key(app_name)
+    return UPI_APPS.get(_ALIASES.get(key, key))
+
+
+def build_payment_uri(app: UpiApp, recipient: str, amount_paise: int) -> str:
+    """Return the app's deep link for paying ``amount_paise`` to ``recipient``."""
+    rupees, paise = divmod(amount_paise, 100)
+    params = urlencode({"pa": recipient, "am": f"{rupees}.{paise:02d}"}, quote_via=quote, safe="@")
+    return app.uri_prefix + params + _FIXED_PARAMS
+
+
+@dataclass
+class LaunchResult:
+    """Outcome of one payment intent launch."""
+    app: str
+    ok: bool
+    launch_state: Optional[str] = None    # COLD, WARM or HOT where the platform reports it
+    total_time_ms: Optional[int] = None   # App start-up time reported by the activity manager
+    wait_time_ms: Optional[int] = None    # Time the activity manager waited, including its own work
+    elapsed_ms: float = 0.0               # Round trip including adb
+    error: Optional[str] = None
+
+    @property
+    def app_missing(self) -> bool:
+        """Whether the launch failed because the app is not installed."""
+        return self.error is not None and _APP_MISSING.search(self.error) is not None
+
+
+def parse_am_start(output: str) -> Dict[str, str]:
+    """Parse the report printed by ``am start -W`` into its fields.
+
+    An ``Error`` entry is added when the intent was not delivered; ``am``
+    exits 0 in that case on many Android versions.
+    """
+    fields = dict(_AM_FIELD.findall(output))
+    error = _AM_ERROR.search(output)
+    if error:
+        fields["Error"] = error.group(1).strip()
+    elif "Status" in fields and fields["Status"] != "ok":
+        fields["Error"] = f"Launch status {fields['Status']}"
+    return fields
+
+
+def _optional_int(value: Optional[str]) -> Optional[int]:
+    return int(value) if value and value.isdigit() else None
+
+
+def _record(result: LaunchResult):
+    """Count a launch and observe the app's start-up time by launch state."""
+    metrics.inc("voicepay_app_launches_total", app=result.app, outcome="ok" if result.ok else "failed")
+    if result.ok and result.total_time_ms is not None:
+        metrics.observe("voicepay_app_launch_seconds", result.total_time_ms / 1000,
+                        app=result.app, state=result.launch_state or "UNKNOWN")
+
+
+class UpiLauncher:
+    """Opens UPI apps on a device with the payment details filled in.
+
+    Args:
+        commands: Device command layer the intents are sent through.
+        timeout: Seconds to wait for ``am start -W`` to report.
+    """
+
+    def __init__(self, commands: DeviceCommands, timeout: float = 10.0):
+        self.commands = commands
+        self.timeout = timeout
+
+    async def launch(self, app: UpiApp, recipient: str, amount_paise: int,
+                     serial: Optional[str] = None) -> LaunchResult:
+        """Open ``app`` with a payment of ``amount_paise`` to ``recipient``.
+
+        Raises ``ValueError`` for an amount that is not positive and
+        ``AdbError`` if the device cannot be reached; a launch the device
+        refused is reported as a result with ``ok`` False.
+        """
+        if amount_paise <= 0:
+            raise ValueError(f"Invalid amount {amount_paise} paise")
+        uri = build_payment_uri(app, recipient.strip(), amount_paise)
+        argv = ["am", "start", "-W", "-a", "android.intent.action.VIEW", "-d", uri]
+
+        started = time.perf_counter()
+        result = await self.commands.shell(argv, serial=serial, timeout=self.timeout)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        fields = parse_am_start(result.stdout)
+        error = fields.get("Error")
+        if error is None and not result.ok:
+            error = f"am start exited with {result.returncode}"
+
+        launch = LaunchResult(
+            app=app.key,
+            ok=error is None,
+            launch_state=fields.get("LaunchState"),
+            total_time_ms=_optional_int(fields.get("TotalTime") or fields.get("ThisTime")),
+            wait_time_ms=_optional_int(fields.get("WaitTime")),
+            elapsed_ms=elapsed_ms,
+            error=error,
+        )
+        _record(launch)
+        if launch.ok:
+            logger.info(f"Opened {app.name} for ₹{format_rupees(amount_paise)}: "
+                        f"{launch.launch_state or 'launch'} in {launch.total_time_ms} ms "
+                        f"(round trip {elapsed_ms:.0f} ms)")
+        else:
+            logger.warning(f"Could not open {app.name}: {error}")
+        return launch
@@ -0,0 +1,236 @@
+"""
+Per-user store residency for multi-session VoicePay workers.
+
+A LiveKit worker serves many rooms from one process. Each user gets their
+own memory store and payee registry under ``<base_dir>/users/<key>``; stores
+are opened lazily on first use and idle ones are closed under an LRU bounded
+by resident count and/or an estimated byte budget. Stores pinned by a live
+session are never evicted. Closing a store flushes it to disk, so stores
+evicted on the event loop are closed on a worker thread.
+"""
+import os
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Generic, Iterator, List, Optional, Tuple, TypeVar
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+USERS_DIR = "users"
+DEFAULT_IDENTITY = "default"
+
+
+def user_store_dir(base_dir: str, identity: str) -> str:
+    """Return the directory for a user's stores, keyed by a hash of the identity.
+
+    Hashing keeps phone numbers and room names out of file names.
+    """
+    key = hashlib.sha256(identity.encode("utf-8")).hexdigest()[:32]
+    return os.path.join(base_dir, USERS_DIR, key)
+
+
+def iter_store_dirs(base_dir: str) -> Iterator[str]:
+    """Yield the shared store directory followed by every per-user directory."""
+    yield base_dir
+    users_dir = os.path.join(base_dir, USERS_DIR)
+    if os.path.isdir(users_dir):
+        for name in sorted(os.listdir(users_dir)):
+            path = os.path.join(users_dir, name)
+            if os.path.isdir(path):
+                yield path
+
+
+class UserStorePool(Generic[T]):
+    """LRU pool of per-user stores.
+
+    Inside the event loop, ``open`` builds missing stores on a worker thread,
+    since opening one loads it from disk; ``get`` opens on the calling
+    thread. Sessions ``pin`` their user's store for their lifetime and
+    ``release`` it at the end; only unpinned stores are evicted. Stores are
+    popped from the pool under its lock and closed outside it: on a worker
+    thread when the event loop is running, otherwise on the calling thread.
+    Reopening a user waits for their previous store to finish closing.
+
+    Args:
+        factory: Opens the store for a user directory.
+        base_dir: Root directory holding the per-user directories.
+        max_resident: Maximum number of open stores (0 for unbounded).
+        max_bytes: Estimated memory budget across open stores (0 for unbounded).
+        size_of: Estimates a store's resident size in bytes; only called with a byte
+            budget, on every access, so it should be cheap.
+    """
+
+    def __init__(self, factory: Callable[[str], T], base_dir: str = "voicepay_memory",
+                 max_resident: int = 256, max_bytes: int = 0,
+                 size_of: Optional[Callable[[T], int]] = None):
+        self.factory = factory
+        self.base_dir = base_dir
+        self.max_resident = max_resident
+        self.max_bytes = max_bytes
+        self.size_of = size_of
+        self._lock = threading.Lock()
+        self._stores: "OrderedDict[str, T]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._pins: Dict[str, int] = {}  # identity -> live sessions using the store
+        self._opening: Dict[str, "asyncio.Future[T]"] = {}
+        self._closing: Dict[str, Future] = {}  # identity -> close running on the closer thread
+        self._closer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="voicepay-store-close")
+
+    def __len__(self) -> int:
+        return len(self._stores)
+
+    def _touch(self, identity: str) -> Optional[T]:
+        """Return a resident store, marking it most recently used."""
+        evicted: List[Tuple[str, T]] = []
+        with self._lock:
+            store = self._stores.get(identity)
+            if store is not None:
+                self._stores.move_to_end(identity)
+                evicted = self._account(identity, store)
+        self._dispose(evicted)
+        return store
+
+    def _add(self, identity: str, store: T) -> T:
+        """Make a freshly opened store resident, unless another open won the race."""
+        evicted: List[Tuple[str, T]] = []
+        with self._lock:
+            resident = self._stores.get(identity)
+            if resident is None:
+                self._stores[identity] = store
+                evicted = self._account(identity, store)
+            else:
+                evicted = [(identity, store)]
+        self._dispose(evicted)
+        return store if resident is None else resident
+
+    def _account(self, identity: str, store: T) -> List[Tuple[str, T]]:
+        """Update the store's size and evict down to budget. Lock held."""
+        if self.max_bytes and self.size_of is not None:
+            self._sizes[identity] = self.size_of(store)
+        return self._evict_idle(keep=identity)
+
+    def _build(self, identity: str) -> T:
+        """Open a user's store, once their previous store has finished closing."""
+        closing = self._closing.get(identity)
+        if closing is not None:
+            # The evicted store may still be flushing writes the new one must load
+            closing.result()
+        return self.factory(user_store_dir(self.base_dir, identity))
+
+    @timed("memory")
+    def get(self, identity: Optional[str]) -> T:
+        """Return the user's store, opening it on the calling thread on first use."""
+        identity = identity or DEFAULT_IDENTITY
+        store = self._touch(identity)
+        if store is None:
+            store = self._add(identity, self._build(identity))
+        return store
+
+    async def open(self, identity: Optional[str]) -> T:
+        """Return the user's store, opening it on a worker thread on first use.
+
+        Concurrent callers for one user share a single open, and a store
+        whose caller was cancelled still joins the pool.
+        """
+        identity = identity or DEFAULT_IDENTITY
+        store = self._touch(identity)
+        if store is not None:
+            return store
+        opening = self._opening.get(identity)
+        if opening is None:
+            opening = asyncio.get_running_loop().run_in_executor(None, self._build, identity)
+            self._opening[identity] = opening
+            opening.add_done_callback(lambda future: self._opened(identity, future))
+        await asyncio.shield(opening)
+        return self._touch(identity) or opening.result()
+
+    def _opened(self, identity: str, future: "asyncio.Future[T]"):
+        self._opening.pop(identity, None)
+        if not future.cancelled() and future.exception() is None:
+            self._add(identity, future.result())
+
+    def pin(self, identity: Optional[str]):
+        """Keep the user's store resident until a matching ``release``."""
+        identity = identity or DEFAULT_IDENTITY
+        with self._lock:
+            self._pins[identity] = self._pins.get(identity, 0) + 1
+
+    def _evict_idle(self, keep: str) -> List[Tuple[str, T]]:
+        """Pop least recently used unpinned stores until within budget. Lock held.
+
+        The popped stores are returned for the caller to close once it has
+        released the lock.
+        """
+        evicted: List[Tuple[str, T]] = []
+        while True:
+            over_count = self.max_resident and len(self._stores) > self.max_resident
+            over_bytes = self.max_bytes and sum(self._sizes.values()) > self.max_bytes
+            if not (over_count or over_bytes):
+                return evicted
+            identity = next((i for i in self._stores if i != keep and not self._pins.get(i)), None)
+            if identity is None:
+                return evicted
+            evicted.append(self._detach(identity))
+
+    def _detach(self, identity: str) -> Tuple[str, T]:
+        """Remove a store from the pool without closing it. Lock held."""
+        self._sizes.pop(identity, None)
+        return identity, self._stores.pop(identity)
+
+    def _dispose(self, evicted: List[Tuple[str, T]]):
+        """Close stores removed from the pool, off the event loop if one is running."""
+        if not evicted:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            for _, store in evicted:
+                self._close_store(store)
+            return
+        for identity, store in evicted:
+            with self._lock:
+                closing = self._closer.submit(self._close_store, store)
+                self._closing[identity] = closing
+            closing.add_done_callback(lambda future, identity=identity: self._closed(identity, future))
+
+    def _closed(self, identity: str, future: Future):
+        with self._lock:
+            if self._closing.get(identity) is future:
+                del self._closing[identity]
+
+    @staticmethod
+    def _close_store(store: T):
+        close = getattr(store, "close", None)
+        if close is not None:
+            try:
+                close()
+            except Exception as e:
+                logger.error(f"Error closing user store: {e}")
+
+    def release(self, identity: Optional[str]):
+        """Unpin a user's store when their session ends; closes it once no session uses it."""
+        identity = identity or DEFAULT_IDENTITY
+        evicted: List[Tuple[str, T]] = []
+        with self._lock:
+            pins = self._pins.pop(identity, 0) - 1
+            if pins > 0:
+                self._pins[identity] = pins
+            elif identity in self._stores:
+                evicted.append(self._detach(identity))
+        self._dispose(evicted)
+
+    def close_all(self):
+        """Close every resident store and wait for closes still running."""
+        with self._lock:
+            evicted = [self._detach(identity) for identity in list(self._stores)]
+            closing = list(self._closing.values())
+        for _, store in evicted:
+            self._close_store(store)
+        for future in closing:
+            future.result()